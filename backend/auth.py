@@ -1,10 +1,17 @@
 from fastapi import Depends, FastAPI, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+from collections import OrderedDict
+from contextlib import closing
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from pydantic import BaseModel
+import os
+import sqlite3
+import threading
+import time
 
 # Security configuration
 SECRET_KEY = "your-secret-key-here"  # In production, use a proper secret key
@@ -33,16 +40,141 @@ class User(BaseModel):
 class UserInDB(User):
     hashed_password: str
 
-# Demo user - In production, use a database
-def get_user(username: str):
-    if username == "admin@kmrl.co.in":
+class UserStore:
+    """
+    Interface for user lookups. Implementations return users with
+    precomputed password hashes; hashing only happens when users are added.
+    """
+
+    def get_user(self, username: str) -> Optional[UserInDB]:
+        """Look up a user by username or email"""
+        raise NotImplementedError
+
+    def add_user(self, username: str, email: str, password: str, disabled: bool = False):
+        """Create or replace a user, hashing the password once"""
+        raise NotImplementedError
+
+class SQLiteUserStore(UserStore):
+    """
+    Users in a SQLite database (USER_DB_PATH). An empty database is seeded
+    with the demo admin account from ADMIN_EMAIL / ADMIN_PASSWORD.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                " username TEXT PRIMARY KEY,"
+                " email TEXT UNIQUE NOT NULL,"
+                " hashed_password TEXT NOT NULL,"
+                " disabled INTEGER NOT NULL DEFAULT 0)"
+            )
+            empty = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 0
+        if empty:
+            self.add_user(
+                username=os.getenv("ADMIN_USERNAME", "admin"),
+                email=os.getenv("ADMIN_EMAIL", "admin@kmrl.co.in"),
+                password=os.getenv("ADMIN_PASSWORD", "admin@123")
+            )
+
+    def _connect(self):
+        # Short-lived connections: lookups are rare thanks to PrincipalCache
+        return closing(sqlite3.connect(self.path, timeout=30))
+
+    def get_user(self, username: str) -> Optional[UserInDB]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT username, email, hashed_password, disabled FROM users"
+                " WHERE username = ? OR email = ?",
+                (username, username)
+            ).fetchone()
+        if row is None:
+            return None
         return UserInDB(
-            username="admin",
-            email="admin@kmrl.co.in",
-            hashed_password=pwd_context.hash("admin@123"),  # Updated password
-            disabled=False
+            username=row[0],
+            email=row[1],
+            hashed_password=row[2],
+            disabled=bool(row[3])
         )
 
+    def add_user(self, username: str, email: str, password: str, disabled: bool = False):
+        hashed_password = get_password_hash(password)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO users (username, email, hashed_password, disabled)"
+                " VALUES (?, ?, ?, ?)",
+                (username, email, hashed_password, int(disabled))
+            )
+            conn.commit()
+        # REPLACE also drops another user that had this email
+        _principal_cache.invalidate(username, email)
+
+_user_store: Optional[UserStore] = None
+_user_store_lock = threading.Lock()
+
+def get_user_store() -> UserStore:
+    global _user_store
+    with _user_store_lock:
+        if _user_store is None:
+            _user_store = SQLiteUserStore(os.getenv("USER_DB_PATH", "users.db"))
+        return _user_store
+
+def set_user_store(store: UserStore):
+    """Swap the user store (e.g. for another backend or in tests)"""
+    global _user_store
+    with _user_store_lock:
+        _user_store = store
+    _principal_cache.clear()
+
+def get_user(username: str):
+    return get_user_store().get_user(username)
+
+class PrincipalCache:
+    """
+    In-memory token -> user cache. Entries expire with the token, so a user
+    is looked up once per token instead of on every request.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple[UserInDB, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[UserInDB]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user
+
+    def put(self, token: str, user: UserInDB, expires_at: float):
+        with self._lock:
+            self._entries[token] = (user, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *names: str):
+        """Drop cached tokens of the users with these usernames or emails"""
+        with self._lock:
+            stale = [token for token, (user, _) in self._entries.items()
+                     if user.username in names or user.email in names]
+            for token in stale:
+                del self._entries[token]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_principal_cache = PrincipalCache()
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -51,8 +183,9 @@ def get_password_hash(password):
 
 def authenticate_user(username: str, password: str):
     # Allow login with email
+    # (bcrypt is slow: call this from a thread pool, not the event loop)
     user = get_user(username)
-    if not user:
+    if not user or user.disabled:
         return False
     if not verify_password(password, user.hashed_password):
         return False
@@ -82,7 +215,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = get_user(username=token_data.username)
+    user = _principal_cache.get(token)
     if user is None:
-        raise credentials_exception
+        user = await run_in_threadpool(get_user, token_data.username)
+        if user is None or user.disabled:
+            raise credentials_exception
+        expires_at = payload.get("exp") or time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        _principal_cache.put(token, user, float(expires_at))
     return user
\ No newline at end of file
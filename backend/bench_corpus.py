@@ -0,0 +1,181 @@
+"""
+Deterministic synthetic PDF corpus for benchmarks.
+
+Builds a PDF with a fixed mix of page kinds, each in English and Malayalam:
+- 'text':  native text layer (extracted directly)
+- 'scan':  the same kind of page rasterized with noise and a slight skew,
+           with no text layer (goes through OCR)
+- 'mixed': a text-layer header with a scanned block below it
+
+The same arguments always produce byte-identical PDFs. Malayalam needs a
+font with Malayalam glyphs: pass --font, or one of FONT_CANDIDATES is used
+if installed (e.g. fonts-noto-core).
+
+Usage:
+    python bench_corpus.py corpus.pdf --pages-per-kind 4
+"""
+import argparse
+import os
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+import pymupdf
+
+PAGE_KINDS = ('text', 'scan', 'mixed')
+LANGUAGES = ('en', 'ml')
+
+FONT_CANDIDATES = (
+    '/usr/share/fonts/truetype/noto/NotoSansMalayalam-Regular.ttf',
+    '/usr/share/fonts/opentype/noto/NotoSansMalayalam-Regular.ttf',
+    '/usr/share/fonts/noto/NotoSansMalayalam-Regular.ttf',
+    '/usr/share/fonts/truetype/malayalam/Meera.ttf',
+)
+
+SENTENCES = {
+    'en': [
+        "The Kochi Metro Rail Limited board approved the revised maintenance schedule.",
+        "All station managers must submit the incident report by 15.08.2024.",
+        "Contact the control room at +91 484 2846700 for operational queries.",
+        "The safety audit covered signalling, rolling stock and platform screen doors.",
+        "Procurement of spare parts for the trainsets will follow the tender process.",
+        "Passenger footfall increased by twelve percent compared to the last quarter.",
+        "The invoice amount of Rs. 4,52,000 is payable within thirty days.",
+        "Track inspection teams reported minor wear near the Aluva depot.",
+    ],
+    'ml': [
+        "കൊച്ചി മെട്രോ റെയിൽ ലിമിറ്റഡ് ബോർഡ് പുതുക്കിയ അറ്റകുറ്റപ്പണി ഷെഡ്യൂൾ അംഗീകരിച്ചു.",
+        "എല്ലാ സ്റ്റേഷൻ മാനേജർമാരും സംഭവ റിപ്പോർട്ട് സമർപ്പിക്കണം.",
+        "പ്രവർത്തന സംബന്ധമായ സംശയങ്ങൾക്ക് കൺട്രോൾ റൂമുമായി ബന്ധപ്പെടുക.",
+        "സുരക്ഷാ ഓഡിറ്റ് സിഗ്നലിംഗ്, റോളിംഗ് സ്റ്റോക്ക് എന്നിവ ഉൾക്കൊള്ളുന്നു.",
+        "ട്രെയിനുകളുടെ സ്പെയർ പാർട്സ് വാങ്ങുന്നത് ടെൻഡർ നടപടിക്രമം അനുസരിച്ചായിരിക്കും.",
+        "കഴിഞ്ഞ പാദത്തെ അപേക്ഷിച്ച് യാത്രക്കാരുടെ എണ്ണം പന്ത്രണ്ട് ശതമാനം വർദ്ധിച്ചു.",
+        "ഇൻവോയ്സ് തുക മുപ്പത് ദിവസത്തിനകം അടയ്ക്കേണ്ടതാണ്.",
+        "ആലുവ ഡിപ്പോയ്ക്ക് സമീപം ട്രാക്കിൽ ചെറിയ തേയ്മാനം കണ്ടെത്തി.",
+    ],
+}
+
+PAGE_RECT = pymupdf.paper_rect('a4')
+MARGIN = 54
+SCAN_DPI = 150
+
+
+def find_font(path: Optional[str] = None) -> Optional[str]:
+    """Font file used for Malayalam pages, or None if none is available"""
+    if path:
+        return path
+    return next((p for p in FONT_CANDIDATES if os.path.exists(p)), None)
+
+
+def page_text(language: str, rng: np.random.Generator, sentences: int = 18) -> str:
+    """Paragraphs of sample sentences in a seeded order"""
+    pool = SENTENCES[language]
+    picks = rng.integers(0, len(pool), size=sentences)
+    paragraphs = [" ".join(pool[i] for i in picks[start:start + 3]) for start in range(0, sentences, 3)]
+    return "\n\n".join(paragraphs)
+
+
+def write_text(page, rect, text: str, language: str, font_path: Optional[str]):
+    """Write text into a rect, with the Malayalam font when there is one"""
+    if language == 'ml' and font_path:
+        page.insert_font(fontname='mlfont', fontfile=font_path)
+        page.insert_textbox(rect, text, fontname='mlfont', fontsize=11)
+    else:
+        page.insert_textbox(rect, text, fontname='helv', fontsize=11)
+
+
+def rasterize(text: str, language: str, font_path: Optional[str], rng: np.random.Generator,
+              size: Tuple[float, float]) -> pymupdf.Pixmap:
+    """
+    Render text on a scratch page and degrade it like a scan: gaussian noise,
+    salt-and-pepper specks and a small rotation
+    """
+    scratch = pymupdf.open()
+    page = scratch.new_page(width=size[0], height=size[1])
+    write_text(page, pymupdf.Rect(0, 0, *size) + (MARGIN, 10, -MARGIN, -10), text, language, font_path)
+    pix = page.get_pixmap(dpi=SCAN_DPI, colorspace=pymupdf.csGRAY)
+    scratch.close()
+
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width).astype(np.float32)
+    img += rng.normal(0, 18, img.shape)
+    specks = rng.random(img.shape)
+    img[specks < 0.004] = 0
+    img[specks > 0.996] = 255
+    img = np.clip(img, 0, 255).astype(np.uint8)
+
+    # Skew by up to 1.5 degrees, as from a sheet fed slightly crooked
+    angle = rng.uniform(-1.5, 1.5)
+    center = (img.shape[1] / 2, img.shape[0] / 2)
+    matrix = cv2.getRotationMatrix2D(center, angle, 1.0)
+    img = cv2.warpAffine(img, matrix, (img.shape[1], img.shape[0]), borderValue=255)
+
+    return pymupdf.Pixmap(pymupdf.csGRAY, pix.width, pix.height, img.tobytes(), 0)
+
+
+def add_page(doc, kind: str, language: str, font_path: Optional[str], rng: np.random.Generator):
+    page = doc.new_page(width=PAGE_RECT.width, height=PAGE_RECT.height)
+    body = PAGE_RECT + (MARGIN, MARGIN, -MARGIN, -MARGIN)
+    if kind == 'text':
+        write_text(page, body, page_text(language, rng), language, font_path)
+    elif kind == 'scan':
+        pix = rasterize(page_text(language, rng), language, font_path, rng, (PAGE_RECT.width, PAGE_RECT.height))
+        page.insert_image(PAGE_RECT, pixmap=pix)
+    else:
+        split = PAGE_RECT.height / 3
+        header = pymupdf.Rect(body.x0, body.y0, body.x1, split)
+        write_text(page, header, page_text(language, rng, sentences=6), language, font_path)
+        scan_rect = pymupdf.Rect(body.x0, split, body.x1, body.y1)
+        pix = rasterize(page_text(language, rng, sentences=9), language, font_path, rng,
+                        (scan_rect.width, scan_rect.height))
+        page.insert_image(scan_rect, pixmap=pix)
+
+
+def build_corpus(path: str, pages_per_kind: int = 2, seed: int = 0,
+                 font_path: Optional[str] = None) -> List[Tuple[str, str]]:
+    """
+    Write the benchmark PDF
+
+    Args:
+        path: Output PDF path
+        pages_per_kind: Pages for each (kind, language) pair
+        seed: RNG seed for text order and noise
+        font_path: Malayalam font (default: first installed FONT_CANDIDATES)
+
+    Returns:
+        (kind, language) of each page, in page order. Malayalam pages are
+        skipped (with a warning) if no Malayalam font is available.
+    """
+    rng = np.random.default_rng(seed)
+    font_path = find_font(font_path)
+    languages = LANGUAGES if font_path else ('en',)
+    if not font_path:
+        print("No Malayalam font found (pass --font), generating English pages only")
+
+    layout = []
+    doc = pymupdf.open()
+    for _ in range(pages_per_kind):
+        for kind in PAGE_KINDS:
+            for language in languages:
+                add_page(doc, kind, language, font_path, rng)
+                layout.append((kind, language))
+    # Fixed metadata and no random file ID keep the output byte-identical
+    doc.set_metadata({'title': 'OCR benchmark corpus', 'creationDate': '', 'modDate': ''})
+    doc.save(path, garbage=3, deflate=True, no_new_id=True)
+    doc.close()
+    return layout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("output", help="PDF path to write")
+    parser.add_argument("--pages-per-kind", type=int, default=2, help="Pages per (kind, language) pair")
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed")
+    parser.add_argument("--font", help="Font file with Malayalam glyphs")
+    args = parser.parse_args()
+
+    layout = build_corpus(args.output, args.pages_per_kind, args.seed, args.font)
+    print(f"Wrote {len(layout)} pages to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Compare OCR backends on the same preprocessed page images: pytesseract
+(a tesseract process per page) against tesserocr (models loaded once).
+
+Usage:
+    python bench_ocr_engines.py MALAYALAM.pdf --pages 10 --langs mal+eng
+
+Measured on one Xeon core with tesserocr 2.11 (libtesseract 5.5.1) and the
+tessdata_fast English model only; the tesseract binary (pytesseract) and
+Malayalam models were not available there, so the subprocess path is not
+timed:
+
+    MALAYALAM.pdf       2 pages  tesserocr  2013 ms/page
+    IshpreetResume.pdf  1 page   tesserocr  3089 ms/page
+
+Loading the English model (PyTessBaseAPI init) took 76-117 ms, which the
+persistent engine pays once per thread rather than once per page.
+"""
+import argparse
+import time
+
+import pymupdf
+import pytesseract
+
+from ocr import DocumentOCR, pixmap_to_array
+from ocr_engines import PytesseractEngine, TesserocrEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdf", help="PDF file whose pages are rendered and OCR'd")
+    parser.add_argument("--pages", type=int, default=5, help="Number of pages to OCR")
+    parser.add_argument("--langs", default="mal+eng", help="Tesseract languages")
+    parser.add_argument("--dpi", type=int, default=300, help="Render DPI")
+    args = parser.parse_args()
+
+    ocr = DocumentOCR(tesseract_langs=args.langs, workers=1, dpi=args.dpi)
+    doc = pymupdf.open(args.pdf)
+    images = []
+    for page_index in range(min(args.pages, len(doc))):
+        pix = ocr._render_page(doc[page_index])
+        processed, _ = ocr._prepare_for_ocr(pixmap_to_array(pix), rgb=True)
+        # Without preprocessing the array is a view into the pixmap, freed once `pix` is rebound
+        images.append(processed.copy())
+    doc.close()
+    print(f"Rendered and preprocessed {len(images)} pages at {args.dpi} DPI")
+
+    engines = []
+    try:
+        pytesseract.get_tesseract_version()
+        engines.append(PytesseractEngine(args.langs))
+    except pytesseract.TesseractNotFoundError:
+        print("tesseract binary not found, not timing pytesseract")
+    try:
+        engines.append(TesserocrEngine(args.langs))
+    except ImportError:
+        print("tesserocr is not installed, not timing it")
+    if not engines:
+        return
+
+    results = {}
+    for engine in engines:
+        texts = []
+        start = time.perf_counter()
+        for image in images:
+            texts.append(engine.image_to_string(image))
+        elapsed = time.perf_counter() - start
+        engine.close()
+        results[engine.name] = texts
+        print(f"{engine.name:>12}: {elapsed:.2f}s total, {elapsed / len(images) * 1000:.0f} ms/page")
+
+    if len(results) == 2:
+        same = sum(a == b for a, b in zip(results['pytesseract'], results['tesserocr']))
+        print(f"Identical output on {same}/{len(images)} pages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+End-to-end benchmark of the extraction and summarization pipeline on a
+deterministic synthetic corpus (see bench_corpus.py).
+
+Reports time per stage (text layer, render, preprocess, Tesseract, language
+detection, save), end-to-end pages/sec through DocumentOCR, the LLM stage
+against a local mock server (mock_llm_server.py), the tokens it was sent
+(after the extractive pre-summary, with --extractive) and peak RSS.
+
+Results are compared against a stored baseline; metrics that got worse by
+more than --tolerance are flagged and the exit code is 1. Baselines are only
+comparable on the same machine and corpus settings.
+
+Usage:
+    python bench_pipeline.py --save                   # record bench_baseline.json
+    python bench_pipeline.py                          # compare against it
+    python bench_pipeline.py --pages-per-kind 4 --repeat 3 --engine tesserocr
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import pymupdf
+
+from bench_corpus import build_corpus
+from ocr import DocumentOCR, pixmap_to_array
+from page_store import open_page_store
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+STAGES = ('text_layer', 'render', 'preprocess', 'tesseract', 'language', 'save')
+
+# Time differences below this are treated as noise when flagging regressions
+MIN_DELTA_MS = 5.0
+
+
+def _ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Peak resident set size of this process and of its reaped children (tesseract)"""
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024  # bytes on macOS, KiB on Linux
+    return {
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        'children_peak_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def bench_stages(ocr: DocumentOCR, pdf_path: str, output_dir: str, run_ocr: bool) -> Dict[str, float]:
+    """
+    Run each page through the same steps as DocumentOCR's page mode, timing
+    every stage separately
+
+    Returns:
+        Total milliseconds per stage, plus the number of OCR'd pages
+    """
+    totals = defaultdict(float)
+    doc = pymupdf.open(pdf_path)
+    store = open_page_store(ocr.page_store, output_dir)
+    for page_num, page in enumerate(doc, start=1):
+        step = time.perf_counter()
+        text = page.get_text()
+        totals['text_layer'] += _ms(step)
+
+        method = 'direct'
+        if len(text.strip()) < 50:
+            method = 'ocr'
+            totals['ocr_pages'] += 1
+            step = time.perf_counter()
+            pix = ocr._render_page(page)
+            img = pixmap_to_array(pix)
+            totals['render'] += _ms(step)
+
+            step = time.perf_counter()
+            processed, _ = ocr._prepare_for_ocr(img, rgb=True)
+            totals['preprocess'] += _ms(step)
+
+            if run_ocr:
+                step = time.perf_counter()
+                text = ocr.engine.image_to_string(processed)
+                totals['tesseract'] += _ms(step)
+
+        step = time.perf_counter()
+        language = ocr._detect_language(text)
+        totals['language'] += _ms(step)
+
+        step = time.perf_counter()
+        store.write_page(ocr._page_info(page_num, text, language, method))
+        totals['save'] += _ms(step)
+    step = time.perf_counter()
+    store.close()
+    totals['save'] += _ms(step)
+    doc.close()
+    return dict(totals)
+
+
+def bench_end_to_end(ocr: DocumentOCR, pdf_path: str, output_dir: str):
+    """Full extract_text_from_pdf run; returns (page_texts, pages/sec)"""
+    start = time.perf_counter()
+    page_texts = ocr.extract_text_from_pdf(pdf_path, output_dir)
+    elapsed = time.perf_counter() - start
+    return page_texts, len(page_texts) / elapsed if elapsed else 0.0
+
+
+def bench_llm(ocr: DocumentOCR, page_texts: Dict[int, Dict], output_dir: str,
+              latency: float, chunk_tokens: int, extractive: bool = False) -> Dict[str, float]:
+    """
+    Summarize the extracted pages against a local mock LLM server, with or
+    without the extractive pre-summary (tokens sent vs. document tokens)
+    """
+    from mock_llm_server import start_mock_server
+
+    server = start_mock_server(latency=latency)
+    os.environ.update({
+        'LLM_BACKEND': 'openai',
+        'GITHUB_TOKEN': 'mock',
+        'GITHUB_MODELS_ENDPOINT': server.base_url,
+        'LLM_REQUESTS_PER_MINUTE': '0',
+        'MAX_CHUNK_TOKENS': str(chunk_tokens),
+        'EXTRACTIVE_PRESUMMARY': 'true' if extractive else 'false',
+    })
+    # Measure the requests, not cache lookups
+    os.environ.pop('SUMMARY_CACHE_DIR', None)
+    from llm_summarizer import create_document_summary
+
+    try:
+        start = time.perf_counter()
+        summary = create_document_summary(page_texts, ocr.combine_page_texts(page_texts), output_dir)
+        elapsed = _ms(start)
+    finally:
+        server.shutdown()
+        server.server_close()
+    if 'error' in summary:
+        raise RuntimeError(f"Summary failed: {summary['error']}")
+    metadata = summary['metadata']
+    sent = metadata['extractive']['output_tokens'] if 'extractive' in metadata else metadata['estimated_tokens']
+    return {'llm_ms': elapsed, 'llm_requests': server.stats['requests'],
+            'llm_input_tokens': metadata['estimated_tokens'], 'llm_sent_tokens': sent}
+
+
+def run_once(args, pdf_path: str) -> Dict[str, float]:
+    ocr = DocumentOCR(tesseract_langs=args.langs, workers=args.workers, engine=args.engine)
+    ocr.cache = None  # Always measure real work
+
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        stages = bench_stages(ocr, pdf_path, os.path.join(tmp, 'stages'), not args.no_ocr)
+        metrics['ocr_pages'] = stages.pop('ocr_pages', 0)
+        for stage in STAGES:
+            metrics[f'{stage}_ms'] = stages.get(stage, 0.0)
+
+        if not args.no_ocr:
+            page_texts, rate = bench_end_to_end(ocr, pdf_path, os.path.join(tmp, 'e2e'))
+            metrics['pages_per_sec'] = rate
+            if not args.no_llm:
+                metrics.update(bench_llm(ocr, page_texts, tmp, args.llm_latency, args.llm_chunk_tokens,
+                                         args.extractive))
+    return metrics
+
+
+def aggregate(runs: List[Dict[str, float]]) -> Dict[str, float]:
+    """Median of each metric over runs (maximum for memory)"""
+    metrics = {}
+    for key in runs[0]:
+        values = [run[key] for run in runs]
+        metrics[key] = max(values) if key.endswith('rss_mb') else statistics.median(values)
+    return metrics
+
+
+def find_regressions(current: Dict[str, float], baseline: Dict[str, float], tolerance: float) -> List[str]:
+    """
+    Metrics worse than the baseline by more than `tolerance` (a fraction).
+    Rates (*_per_sec) should not drop; times and memory should not grow.
+    """
+    regressions = []
+    for key, old in baseline.items():
+        new = current.get(key)
+        if new is None or not old or key in ('ocr_pages', 'llm_requests', 'llm_input_tokens'):
+            continue
+        if key.endswith('_per_sec'):
+            worse = new < old * (1 - tolerance)
+        else:
+            worse = new > old * (1 + tolerance)
+            if key.endswith('_ms'):
+                worse = worse and new - old > MIN_DELTA_MS
+        if worse:
+            regressions.append(f"{key}: {old:.2f} -> {new:.2f} ({(new - old) / old * 100:+.1f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages-per-kind", type=int, default=2, help="Corpus pages per (kind, language) pair")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus RNG seed")
+    parser.add_argument("--font", help="Font file with Malayalam glyphs for the corpus")
+    parser.add_argument("--langs", default="mal+eng", help="Tesseract languages")
+    parser.add_argument("--workers", type=int, default=1, help="Page workers for the end-to-end run")
+    parser.add_argument("--engine", default=None, help="OCR engine (default: OCR_ENGINE env var or 'auto')")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs to take the median over")
+    parser.add_argument("--no-ocr", action="store_true", help="Skip Tesseract and the end-to-end/LLM runs (render and preprocess are still timed)")
+    parser.add_argument("--no-llm", action="store_true", help="Skip the LLM stage")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Mock LLM seconds per request")
+    parser.add_argument("--llm-chunk-tokens", type=int, default=1000,
+                        help="MAX_CHUNK_TOKENS for the LLM stage (small values exercise map-reduce)")
+    parser.add_argument("--extractive", action="store_true",
+                        help="Reduce the document locally before the LLM (EXTRACTIVE_PRESUMMARY=true)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown before flagging (fraction)")
+    args = parser.parse_args()
+
+    config = {
+        'pages_per_kind': args.pages_per_kind,
+        'seed': args.seed,
+        'langs': args.langs,
+        'workers': args.workers,
+        'engine': args.engine or os.getenv("OCR_ENGINE", "auto"),
+        'ocr': not args.no_ocr,
+        'llm': not (args.no_ocr or args.no_llm),
+        'llm_chunk_tokens': args.llm_chunk_tokens,
+        'llm_latency': args.llm_latency,
+        'llm_extractive': args.extractive,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, 'corpus.pdf')
+        layout = build_corpus(pdf_path, args.pages_per_kind, args.seed, args.font)
+        config['pages'] = len(layout)
+        print(f"Corpus: {len(layout)} pages ({', '.join(sorted({f'{k}-{l}' for k, l in layout}))})")
+        runs = [run_once(args, pdf_path) for _ in range(args.repeat)]
+
+    metrics = aggregate(runs)
+    metrics.update(peak_rss_mb())
+
+    print(f"\n{'metric':<24}{'value':>12}")
+    for key, value in metrics.items():
+        print(f"{key:<24}{value:>12.2f}")
+
+    if args.save:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'config': config,
+                'metrics': metrics,
+                'platform': platform.platform(),
+                'created_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+            }, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}, run with --save to create one")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('config') != config:
+        print(f"\nBaseline was recorded with different settings, not comparing: {baseline.get('config')}")
+        return 0
+
+    regressions = find_regressions(metrics, baseline['metrics'], args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\n✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""
+Duplicate detection for processed documents.
+
+- Exact duplicates are found by file SHA-256 before any work is done.
+- Near duplicates (re-scans, forwarded copies with a different header) are
+  found after text extraction: each document gets a MinHash signature of
+  its word 3-gram shingles, and signatures are bucketed by LSH bands so a
+  lookup only compares against documents sharing at least one band.
+  Candidates are kept if their estimated Jaccard similarity reaches the
+  threshold (DEDUP_THRESHOLD, default 0.9).
+
+Matches are limited to the uploader's own documents, so a result (its
+output directory, page list and search index entries) is never served to
+another user.
+"""
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 128
+LSH_BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 similarity almost always share a band
+SHINGLE_SIZE = 3
+# Too little text to tell documents apart (blank scans would all "match")
+MIN_SHINGLES = 20
+# Shingles permuted at once (a NUM_PERM x SIGNATURE_BLOCK uint64 matrix, 16 MB)
+SIGNATURE_BLOCK = 16384
+
+# Universal hashing (a * x + b) mod P over 32-bit shingle hashes; a < 2^31
+# keeps a * x + b inside uint64
+_PRIME = np.uint64((1 << 32) + 15)
+_rng = np.random.default_rng(20240901)
+_A = _rng.integers(1, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+
+WORD_RE = re.compile(r'\w+')
+PAGE_MARKER_RE = re.compile(r'^\[p\d+\]$', re.MULTILINE)
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the distinct word n-grams of normalized text"""
+    text = PAGE_MARKER_RE.sub(' ', unicodedata.normalize('NFC', text)).lower()
+    words = WORD_RE.findall(text)
+    grams = {' '.join(words[i:i + size]) for i in range(max(0, len(words) - size + 1))}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(g.encode('utf-8'), digest_size=4).digest(), 'little') for g in grams),
+        dtype=np.uint64, count=len(grams)
+    )
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """
+    MinHash signature of a document's text
+
+    Returns:
+        NUM_PERM uint64 values, or None if the text is too short to compare
+    """
+    hashes = shingle_hashes(text)
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    # Permute the shingles a block at a time, keeping a running minimum per
+    # permutation, so memory stays at NUM_PERM x SIGNATURE_BLOCK whatever the
+    # document size
+    signature = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for start in range(0, len(hashes), SIGNATURE_BLOCK):
+        block = hashes[start:start + SIGNATURE_BLOCK]
+        permuted = (np.outer(_A, block) + _B[:, None]) % _PRIME
+        np.minimum(signature, permuted.min(axis=1), out=signature)
+    return signature
+
+
+def estimate_similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+def band_keys(signature: np.ndarray) -> List[str]:
+    rows = NUM_PERM // LSH_BANDS
+    return [
+        hashlib.blake2b(signature[band * rows:(band + 1) * rows].tobytes(), digest_size=8).hexdigest()
+        for band in range(LSH_BANDS)
+    ]
+
+
+class DuplicateIndex:
+    """
+    Persistent registry of processed documents, their signatures and the
+    duplicates linked to them. Each thread gets its own connection.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.9):
+        """
+        Args:
+            path: SQLite database file
+            threshold: Minimum estimated similarity for a near-duplicate
+        """
+        self.path = path
+        self.threshold = threshold
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls) -> 'DuplicateIndex':
+        """Build an index from DEDUP_DB_PATH (default dedup.db) / DEDUP_THRESHOLD"""
+        return cls(os.getenv("DEDUP_DB_PATH", "dedup.db"), float(os.getenv("DEDUP_THRESHOLD", "0.9")))
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if getattr(self._local, 'conn', None) is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " doc_id TEXT PRIMARY KEY,"
+                " owner TEXT,"
+                " filename TEXT,"
+                " file_hash TEXT,"
+                " result TEXT NOT NULL,"
+                " signature BLOB,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS documents_hash ON documents (file_hash)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS lsh_buckets ("
+                " band INTEGER NOT NULL,"
+                " bucket TEXT NOT NULL,"
+                " doc_id TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS lsh_buckets_key ON lsh_buckets (band, bucket)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS duplicates ("
+                " doc_id TEXT PRIMARY KEY,"
+                " canonical_id TEXT NOT NULL,"
+                " owner TEXT,"
+                " filename TEXT,"
+                " file_hash TEXT,"
+                " kind TEXT NOT NULL,"
+                " similarity REAL NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS duplicates_hash ON duplicates (file_hash)")
+            conn.execute("CREATE INDEX IF NOT EXISTS duplicates_canonical ON duplicates (canonical_id)")
+            self._local.conn = conn
+        return self._local.conn
+
+    def _document(self, doc_id: str) -> Optional[Dict]:
+        row = self.conn.execute(
+            "SELECT doc_id, owner, filename, file_hash, result FROM documents WHERE doc_id = ?", (doc_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'doc_id': row[0], 'owner': row[1], 'filename': row[2], 'file_hash': row[3],
+                'result': json.loads(row[4])}
+
+    def find_exact(self, file_hash: str, owner: Optional[str]) -> Optional[Dict]:
+        """
+        Processed document of the same owner with the same content hash
+        (directly, or via a duplicate already linked to one)
+
+        Returns:
+            Canonical document record (doc_id, owner, filename, file_hash, result), or None
+        """
+        row = self.conn.execute(
+            "SELECT doc_id FROM documents WHERE file_hash = ? AND owner IS ?"
+            " UNION ALL SELECT canonical_id FROM duplicates WHERE file_hash = ? AND owner IS ?"
+            " LIMIT 1",
+            (file_hash, owner, file_hash, owner)
+        ).fetchone()
+        return self._document(row[0]) if row else None
+
+    def find_similar(self, signature: Optional[np.ndarray], owner: Optional[str]) -> Optional[Tuple[Dict, float]]:
+        """
+        Most similar processed document of the same owner at or above the threshold
+
+        Returns:
+            Tuple of (canonical document record, estimated similarity), or None
+        """
+        if signature is None:
+            return None
+        keys = band_keys(signature)
+        clauses = " OR ".join(["(b.band = ? AND b.bucket = ?)"] * len(keys))
+        params = [value for band, key in enumerate(keys) for value in (band, key)]
+        rows = self.conn.execute(
+            "SELECT DISTINCT d.doc_id, d.signature FROM lsh_buckets b"
+            " JOIN documents d ON d.doc_id = b.doc_id"
+            f" WHERE ({clauses}) AND d.owner IS ?",
+            params + [owner]
+        ).fetchall()
+
+        best, best_similarity = None, 0.0
+        for doc_id, blob in rows:
+            similarity = estimate_similarity(signature, np.frombuffer(blob, dtype=np.uint64))
+            if similarity >= self.threshold and similarity > best_similarity:
+                best, best_similarity = doc_id, similarity
+        if best is None:
+            return None
+        return self._document(best), best_similarity
+
+    def add_document(self, doc_id: str, owner: Optional[str], filename: Optional[str],
+                     file_hash: Optional[str], result: Dict, signature: Optional[np.ndarray]):
+        """Register a processed (non-duplicate) document"""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO documents"
+                " (doc_id, owner, filename, file_hash, result, signature, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (doc_id, owner, filename, file_hash, json.dumps(result, ensure_ascii=False),
+                 signature.tobytes() if signature is not None else None, time.time())
+            )
+            conn.execute("DELETE FROM lsh_buckets WHERE doc_id = ?", (doc_id,))
+            if signature is not None:
+                conn.executemany(
+                    "INSERT INTO lsh_buckets (band, bucket, doc_id) VALUES (?, ?, ?)",
+                    [(band, key, doc_id) for band, key in enumerate(band_keys(signature))]
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def link_duplicate(self, doc_id: str, canonical_id: str, owner: Optional[str], filename: Optional[str],
+                       file_hash: Optional[str], kind: str, similarity: float):
+        """Record that `doc_id` was served from `canonical_id`'s results"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO duplicates"
+            " (doc_id, canonical_id, owner, filename, file_hash, kind, similarity, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (doc_id, canonical_id, owner, filename, file_hash, kind, similarity, time.time())
+        )
+
+    def clusters(self, owner: Optional[str] = None) -> List[Dict]:
+        """
+        Documents that have duplicates, each with its linked duplicates
+
+        Args:
+            owner: Only clusters of this user's documents or with a duplicate
+                uploaded by them (None = all)
+        """
+        sql = (
+            "SELECT d.canonical_id, c.filename, c.owner, d.doc_id, d.filename, d.owner, d.kind,"
+            " d.similarity, d.created_at"
+            " FROM duplicates d JOIN documents c ON c.doc_id = d.canonical_id"
+        )
+        params = []
+        if owner is not None:
+            sql += " WHERE c.owner = ? OR d.canonical_id IN (SELECT canonical_id FROM duplicates WHERE owner = ?)"
+            params += [owner, owner]
+        sql += " ORDER BY d.canonical_id, d.created_at"
+
+        clusters: Dict[str, Dict] = {}
+        for canonical_id, canonical_name, canonical_owner, doc_id, filename, dup_owner, kind, similarity, created_at \
+                in self.conn.execute(sql, params):
+            shared = owner is not None and canonical_owner not in (owner, None)
+            cluster = clusters.setdefault(canonical_id, {
+                'doc_id': canonical_id,
+                'filename': None if shared else canonical_name,
+                'duplicates': []
+            })
+            # Other users' filenames stay private; their uploads only count
+            if owner is not None and dup_owner != owner:
+                cluster.setdefault('other_users', 0)
+                cluster['other_users'] += 1
+                continue
+            cluster['duplicates'].append({
+                'doc_id': doc_id,
+                'filename': filename,
+                'kind': kind,
+                'similarity': similarity,
+                'created_at': created_at
+            })
+        return list(clusters.values())
+
+
+_duplicate_index: Optional[DuplicateIndex] = None
+_duplicate_index_lock = threading.Lock()
+
+
+def get_duplicate_index() -> Optional[DuplicateIndex]:
+    """Process-wide duplicate index, or None if DEDUP_ENABLED is false"""
+    global _duplicate_index
+    if os.getenv("DEDUP_ENABLED", "true").lower() not in ('1', 'true', 'yes'):
+        return None
+    with _duplicate_index_lock:
+        if _duplicate_index is None:
+            _duplicate_index = DuplicateIndex.from_env()
+        return _duplicate_index
@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Reads are recorded (hit/miss counters, LRU timestamps) in batches, written
+# every FLUSH_READS lookups or FLUSH_SECONDS, whichever comes first
+FLUSH_READS = 64
+FLUSH_SECONDS = 5.0
+
+# Least recently used entries deleted per eviction query
+EVICT_BATCH = 64
+
+
+class DiskCache:
+    """
+    Persistent, content-addressed key/value cache of JSON results
+
+    Entries live in a single SQLite database inside `cache_dir`. When the stored
+    payload grows past `max_bytes` the least recently used entries are evicted.
+    The payload size and entry count are kept as running totals in the
+    counters table, updated in the same transaction as each write, so puts
+    and stats never scan the entries. Hit/miss/eviction counters are persisted
+    alongside the entries so they add up across worker processes and
+    restarts. Reads only write in batches (see FLUSH_READS): until a batch is
+    flushed, LRU order and hit/miss counts lag slightly behind. Each thread
+    gets its own connection, so one instance can be shared by a thread pool.
+
+    Subclasses set the database name and the environment variables used by
+    from_env.
+    """
+
+    DB_NAME = 'cache.sqlite3'
+    DIR_ENV = 'CACHE_DIR'
+    MAX_MB_ENV = 'CACHE_MAX_MB'
+    DEFAULT_MAX_MB = 512
+
+    def __init__(self, cache_dir: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Args:
+            cache_dir: Directory holding the cache database
+            max_bytes: Disk budget for cached payloads
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a cache from the DIR_ENV / MAX_MB_ENV variables, or None if caching is disabled
+        """
+        cache_dir = os.getenv(cls.DIR_ENV)
+        if not cache_dir:
+            return None
+        max_mb = int(os.getenv(cls.MAX_MB_ENV, str(cls.DEFAULT_MAX_MB)))
+        return cls(cache_dir, max_bytes=max_mb * 1024 * 1024)
+
+    # Connections can't cross process boundaries; workers reconnect lazily
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if getattr(self._local, 'conn', None) is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            conn = sqlite3.connect(
+                os.path.join(self.cache_dir, self.DB_NAME),
+                timeout=30,
+                isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters ("
+                " name TEXT PRIMARY KEY,"
+                " value INTEGER NOT NULL)"
+            )
+            # Running totals, computed once for databases created before they were kept
+            for name, aggregate in (('size_bytes', 'COALESCE(SUM(size), 0)'), ('entries', 'COUNT(*)')):
+                conn.execute(
+                    f"INSERT INTO counters (name, value) SELECT ?, (SELECT {aggregate} FROM entries)"
+                    " WHERE NOT EXISTS (SELECT 1 FROM counters WHERE name = ?)",
+                    (name, name)
+                )
+            self._local.conn = conn
+        return self._local.conn
+
+    @staticmethod
+    def make_key(file_hash: str, page_index: int, **params) -> str:
+        """
+        Build a cache key from a content hash, a position within that content
+        and every setting that affects the result
+
+        Args:
+            file_hash: Content hash of the source
+            page_index: Page/chunk index within the source
+            **params: Result-affecting settings
+
+        Returns:
+            Hex digest key
+        """
+        parts = [file_hash, str(page_index)]
+        parts += [f"{name}={params[name]}" for name in sorted(params)]
+        return hashlib.sha256("\x1f".join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """
+        Look up a cached result
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            Cached dictionary, or None on a miss
+        """
+        try:
+            row = self.conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            reads = self._reads()
+            if row is None:
+                reads['misses'] += 1
+            else:
+                reads['hits'] += 1
+                reads['touched'][key] = time.time()
+            if (reads['hits'] + reads['misses'] >= FLUSH_READS
+                    or time.monotonic() - reads['since'] >= FLUSH_SECONDS):
+                self.flush()
+            return json.loads(row[0]) if row is not None else None
+        except sqlite3.Error as e:
+            logger.warning(f"Cache lookup failed ({self.DB_NAME}): {str(e)}")
+            return None
+
+    def put(self, key: str, value: Dict):
+        """
+        Store a result and evict least recently used entries if over budget
+
+        Args:
+            key: Key from make_key
+            value: JSON-serializable dictionary
+        """
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        conn = self.conn
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_reads()
+                old = conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, payload, size, time.time())
+                )
+                self._bump('size_bytes', size - (old[0] if old else 0))
+                if old is None:
+                    self._bump('entries')
+                self._evict()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.warning(f"Cache store failed ({self.DB_NAME}): {str(e)}")
+
+    def flush(self):
+        """Write this thread's batched reads (counters and LRU timestamps)"""
+        reads = getattr(self._local, 'reads', None)
+        if not reads or not (reads['hits'] or reads['misses']):
+            return
+        conn = self.conn
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_reads()
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            logger.warning(f"Cache update failed ({self.DB_NAME}): {str(e)}")
+
+    def _reads(self) -> Dict:
+        """This thread's reads not yet written"""
+        reads = getattr(self._local, 'reads', None)
+        if reads is None:
+            reads = self._local.reads = {'hits': 0, 'misses': 0, 'touched': {}, 'since': time.monotonic()}
+        return reads
+
+    def _write_reads(self):
+        # Runs inside the caller's transaction
+        reads = getattr(self._local, 'reads', None)
+        if not reads:
+            return
+        self.conn.executemany(
+            "UPDATE entries SET last_access = MAX(last_access, ?) WHERE key = ?",
+            [(accessed, key) for key, accessed in reads['touched'].items()]
+        )
+        for name in ('hits', 'misses'):
+            if reads[name]:
+                self._bump(name, reads[name])
+        self._local.reads = None
+
+    def _evict(self):
+        # Runs inside the caller's transaction
+        total = self.conn.execute("SELECT value FROM counters WHERE name = 'size_bytes'").fetchone()[0]
+        evicted = 0
+        freed = 0
+        while total - freed > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_access LIMIT ?", (EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                break
+            victims = []
+            for key, size in rows:
+                if total - freed <= self.max_bytes:
+                    break
+                victims.append((key,))
+                freed += size
+            self.conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            evicted += len(victims)
+        if evicted:
+            self._bump('size_bytes', -freed)
+            self._bump('entries', -evicted)
+            self._bump('evictions', evicted)
+
+    def _bump(self, name: str, amount: int = 1):
+        self.conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters and current occupancy
+
+        Returns:
+            Dictionary with hits, misses, evictions, entries, size_bytes and max_bytes
+        """
+        self.flush()
+        counters = dict(self.conn.execute("SELECT name, value FROM counters").fetchall())
+        return {
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+            'evictions': counters.get('evictions', 0),
+            'entries': counters.get('entries', 0),
+            'size_bytes': counters.get('size_bytes', 0),
+            'max_bytes': self.max_bytes
+        }
+
+    def close(self):
+        """Write this thread's batched reads and close its connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self.flush()
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,185 @@
+"""
+Entity extraction over OCR text: e-mail addresses, phone numbers, dates,
+organizations and person names.
+
+Every pattern is compiled once into a single alternation of named groups,
+so a page is scanned in one pass (finditer) whatever the number of entity
+types; the group that matched gives the type. Only word starts are tried. Numbers may be written in
+ASCII or Malayalam digits (൦-൯). Matches are validated and normalized:
+
+- phones: Indian mobiles (+91 98470 12345, 098470-12345) and landlines
+  with an STD code (0471-2345678, +91 471 2345678), normalized to +91 and
+  ASCII digits
+- dates: day-first dd.mm.yyyy / dd-mm-yy / dd/mm/yyyy, ISO yyyy-mm-dd and
+  "12 March 2024" / "March 12, 2024", normalized to ISO; impossible dates
+  are dropped
+
+Each entity carries its page number and character offsets into that
+page's text.
+"""
+import re
+import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Key information categories, in the order reported
+KEY_CATEGORIES = ('names', 'dates', 'organizations', 'locations', 'contact_info')
+
+_D = '[0-9\u0D66-\u0D6F]'
+_NOT_DIGIT_AFTER = '(?![0-9\u0D66-\u0D6F])'
+_MOBILE_START = '[6-9\u0D6C-\u0D6F]'
+_MONTH = (r'(?i:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?'
+          r'|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\.?')
+_ORDINAL = '(?:st|nd|rd|th)?'
+_PHONE_PREFIX = r'(?:(?:\+|00)91[ -]?|0)'
+# A capitalized word can be the local part of an e-mail address ("Info@...")
+_NOT_EMAIL_AFTER = r'(?![\w.%+-]*@)'
+
+# Alternatives are tried in order at each position: earlier ones win overlaps.
+# Named groups only, since numbered backreferences would count across alternatives.
+_PATTERNS = [
+    ('email', r'(?<![A-Za-z0-9._%+-])[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}'),
+    ('date', '(?:'
+             rf'{_D}{{1,2}}(?P<date_sep>[./-]){_D}{{1,2}}(?P=date_sep)(?:{_D}{{4}}|{_D}{{2}})'
+             rf'|{_D}{{4}}-{_D}{{1,2}}-{_D}{{1,2}}'
+             rf'|{_D}{{1,2}}{_ORDINAL}[ \t]+{_MONTH},?[ \t]+{_D}{{4}}'
+             rf'|\b{_MONTH}[ \t]+{_D}{{1,2}}{_ORDINAL},?[ \t]+{_D}{{4}}'
+             ')' + _NOT_DIGIT_AFTER),
+    ('phone', '(?:'
+              rf'{_PHONE_PREFIX}?{_MOBILE_START}{_D}{{4}}[ -]?{_D}{{5}}'
+              rf'|{_PHONE_PREFIX}?{_MOBILE_START}{_D}{{2}}[-.]{_D}{{3}}[-.]{_D}{{4}}'
+              rf'|{_PHONE_PREFIX}{_D}{{2,4}}[ -]{_D}{{6,8}}'
+              ')' + _NOT_DIGIT_AFTER),
+    ('organization', r"\b(?:[A-Z][\w&.'-]*[ \t]+){1,5}"
+                     r'(?:Ltd\.?|Limited|Pvt\.?|Corporation|Board|Department|University|College|Bank|Society'
+                     r'|Panchayat|Municipality|Council|Authority|Institute|Company|Trust|Ministry)\b'
+                     + _NOT_EMAIL_AFTER),
+    ('name', r'\b[A-Z][a-z]+ [A-Z][a-z]+\b' + _NOT_EMAIL_AFTER),
+]
+# Entities start at a word start with a letter, digit or '+'. Checking that
+# first lets the scanner skip most positions without trying any alternative.
+_START = '(?=[A-Za-z0-9+\u0D66-\u0D6F])(?<![\w\u0D00-\u0D7F])'
+SCANNER = re.compile(_START + '(?:' + '|'.join(f'(?P<{name}>{pattern})' for name, pattern in _PATTERNS) + ')')
+
+# Which key information category each entity type is reported under
+CATEGORY = {'email': 'contact_info', 'phone': 'contact_info', 'date': 'dates',
+            'organization': 'organizations', 'name': 'names'}
+
+_ASCII_DIGITS = str.maketrans('\u0D66\u0D67\u0D68\u0D69\u0D6A\u0D6B\u0D6C\u0D6D\u0D6E\u0D6F', '0123456789')
+_NON_DIGIT_RE = re.compile(r'[^0-9]')
+_NUMBER_RE = re.compile(r'[0-9]+')
+_LETTERS_RE = re.compile(r'[A-Za-z]+')
+_MONTH_NUMBERS = {name: number for number, name in enumerate(
+    ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'), start=1)}
+
+
+def _normalize_phone(text: str) -> Optional[str]:
+    """+91 followed by the 10-digit national number, or None if it has the wrong length"""
+    digits = _NON_DIGIT_RE.sub('', text.translate(_ASCII_DIGITS))
+    if text.startswith('+'):
+        digits = digits[2:]
+    elif digits.startswith('0091'):
+        digits = digits[4:]
+    elif digits.startswith('0'):
+        digits = digits[1:]
+    if len(digits) != 10:
+        return None
+    return '+91' + digits
+
+
+def _normalize_date(text: str) -> Optional[str]:
+    """ISO date (day-first for numeric dates), or None if there is no such day"""
+    text = text.translate(_ASCII_DIGITS)
+    numbers = _NUMBER_RE.findall(text)
+    months = [_MONTH_NUMBERS[word[:3].lower()] for word in _LETTERS_RE.findall(text)
+              if word[:3].lower() in _MONTH_NUMBERS]
+    if months:
+        (day, year), month = map(int, numbers), months[0]
+    elif len(numbers[0]) == 4:
+        year, month, day = map(int, numbers)
+    else:
+        day, month, year = map(int, numbers)
+        if len(numbers[2]) == 2:
+            year += 2000 if year < 50 else 1900
+    try:
+        return datetime.date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+
+_NORMALIZERS = {
+    'phone': _normalize_phone,
+    'date': _normalize_date,
+    'email': str.lower,
+}
+
+
+def scan_text(text: str, page: Optional[int] = None) -> List[Dict]:
+    """
+    Entities in one text, in order of appearance
+
+    Args:
+        text: Page text (or any text, e.g. a summary)
+        page: Page number recorded on each entity
+
+    Returns:
+        List of entities: type, text (as written), value (normalized),
+        page, start and end (character offsets into `text`)
+    """
+    entities = []
+    for match in SCANNER.finditer(text):
+        kind = match.lastgroup
+        raw = match.group(kind)
+        normalize = _NORMALIZERS.get(kind)
+        value = normalize(raw) if normalize else ' '.join(raw.split())
+        if value is None:
+            continue
+        entities.append({'type': kind, 'text': raw, 'value': value, 'page': page,
+                         'start': match.start(), 'end': match.end()})
+    return entities
+
+
+def iter_entities(pages: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    Entities of a document, page by page
+
+    Args:
+        pages: Page info dictionaries ('page_num', 'text') in page order
+
+    Returns:
+        Iterator of entities (see scan_text)
+    """
+    for page_info in pages:
+        yield from scan_text(page_info['text'], page_info['page_num'])
+
+
+class KeyInformation:
+    """
+    Distinct entity values by key information category, in first-seen
+    order, keeping at most `limit` values per category so a long document
+    can be scanned without its entities piling up
+    """
+
+    def __init__(self, limit: Optional[int] = None):
+        self.limit = limit
+        self._values: Dict[str, Dict[str, None]] = {category: {} for category in KEY_CATEGORIES}
+
+    def add(self, entities: Iterable[Dict]) -> 'KeyInformation':
+        for entity in entities:
+            self.add_value(CATEGORY[entity['type']], entity['value'])
+        return self
+
+    def add_value(self, category: str, value: str):
+        values = self._values[category]
+        if self.limit is None or len(values) < self.limit:
+            values.setdefault(value, None)
+
+    def as_dict(self) -> Dict[str, List[str]]:
+        return {category: list(values) for category, values in self._values.items()}
+
+
+def key_information(entities: Iterable[Dict], limit: Optional[int] = None) -> Dict[str, List[str]]:
+    """
+    Distinct entity values by key information category, in first-seen order
+    (at most `limit` per category)
+    """
+    return KeyInformation(limit).add(entities).as_dict()
@@ -0,0 +1,214 @@
+"""
+Local extractive summarization, run before the LLM to shrink its input,
+and on its own as an offline summary when no LLM backend is configured.
+
+- Lines that repeat across pages (letterheads, running headers and
+  footers, "Page 3 of 40", signature blocks) are dropped. Lines are
+  compared with digits masked, so page numbers and dates don't hide a
+  repeat. A line is boilerplate if it occurs on at least
+  EXTRACTIVE_REPEAT_SHARE (default 0.3) of the pages, and on 3 or more.
+- If the remaining text is still over the token budget, sentences are
+  ranked with TextRank over TF-IDF cosine similarity and the best ones are
+  kept, in document order, until the budget is used up. The similarity
+  graph is never built: each PageRank step multiplies through the sparse
+  sentence-term matrix, X (X^T v), so the cost grows with the number of
+  terms rather than with the square of the number of sentences.
+"""
+import os
+import re
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from tokens import PAGE_MARKER_RE, SENTENCE_RE, count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Words, keeping Malayalam vowel signs and virama (not \w) inside the word
+TERM_RE = re.compile(r'[\w\u0D00-\u0D7F]+')
+DIGIT_RE = re.compile(r'\d+')
+
+MIN_REPEAT_PAGES = 3
+DAMPING = 0.85
+MAX_ITERATIONS = 50
+TOLERANCE = 1e-6
+
+
+def _line_key(line: str) -> str:
+    return DIGIT_RE.sub('#', ' '.join(line.lower().split()))
+
+
+def _split_marker(page: str) -> Tuple[str, str]:
+    """Split a marked page into its [pN] marker line and body"""
+    match = PAGE_MARKER_RE.match(page)
+    if not match:
+        return '', page
+    return match.group(0), page[match.end():]
+
+
+def repeated_lines(bodies: List[str], share: float) -> Set[str]:
+    """
+    Keys (see _line_key) of lines found on at least `share` of the pages
+
+    Args:
+        bodies: Page texts without markers
+        share: Minimum fraction of pages a line must occur on
+
+    Returns:
+        Set of line keys
+    """
+    min_pages = max(MIN_REPEAT_PAGES, share * len(bodies))
+    if len(bodies) < min_pages:
+        return set()
+    pages_with_line = Counter()
+    for body in bodies:
+        pages_with_line.update({_line_key(line) for line in body.splitlines() if line.strip()})
+    return {key for key, pages in pages_with_line.items() if pages >= min_pages}
+
+
+def textrank(sentences: List[str]) -> np.ndarray:
+    """
+    TextRank score of each sentence, with TF-IDF cosine similarity as edge weights
+
+    Args:
+        sentences: Sentences in document order
+
+    Returns:
+        Array of scores (0 for sentences without words)
+    """
+    n = len(sentences)
+    vocabulary: Dict[str, int] = {}
+    rows: List[int] = []
+    cols: List[int] = []
+    counts: List[int] = []
+    for i, sentence in enumerate(sentences):
+        for term, count in Counter(TERM_RE.findall(sentence.lower())).items():
+            rows.append(i)
+            cols.append(vocabulary.setdefault(term, len(vocabulary)))
+            counts.append(count)
+    if not vocabulary:
+        return np.zeros(n)
+
+    # Sparse (COO) sentence-term matrix of L2-normalized, sublinear TF-IDF weights
+    rows = np.array(rows, dtype=np.int64)
+    cols = np.array(cols, dtype=np.int64)
+    vocabulary_size = len(vocabulary)
+    document_frequency = np.bincount(cols, minlength=vocabulary_size)
+    idf = np.log((1 + n) / (1 + document_frequency)) + 1
+    values = (1 + np.log(np.array(counts, dtype=np.float64))) * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights=values ** 2, minlength=n))
+    values /= norms[rows]
+    has_terms = norms > 0
+
+    def similarity_times(vector: np.ndarray) -> np.ndarray:
+        # (X X^T - I) v: similarity to every other sentence, without the self-loop
+        per_term = np.bincount(cols, weights=values * vector[rows], minlength=vocabulary_size)
+        return np.bincount(rows, weights=values * per_term[cols], minlength=n) - vector * has_terms
+
+    degree = similarity_times(np.ones(n))
+    inverse_degree = np.divide(1.0, degree, out=np.zeros(n), where=degree > 1e-12)
+    scores = np.full(n, 1.0 / n)
+    for _ in range(MAX_ITERATIONS):
+        updated = (1 - DAMPING) / n + DAMPING * similarity_times(scores * inverse_degree)
+        converged = np.abs(updated - scores).sum() < TOLERANCE
+        scores = updated
+        if converged:
+            break
+    return np.where(has_terms, scores, 0.0)
+
+
+def extract_pages(pages: List[str], max_tokens: int, share: Optional[float] = None) -> Dict:
+    """
+    Reduce a document's pages to at most `max_tokens`
+
+    Args:
+        pages: Page texts with [pN] markers, in document order
+        max_tokens: Token budget for the reduced document
+        share: Repeated-line threshold (default: EXTRACTIVE_REPEAT_SHARE)
+
+    Returns:
+        Dictionary with 'pages' (reduced texts with markers; pages left empty
+        are dropped), 'sentences' (the selected sentences in document order,
+        or None if no selection was needed), and the report: input_tokens,
+        output_tokens, repeated_lines (lines removed), total_sentences
+    """
+    if share is None:
+        share = float(os.getenv("EXTRACTIVE_REPEAT_SHARE", "0.3"))
+    separator_tokens = count_tokens("\n\n")
+    markers, bodies = zip(*(_split_marker(page) for page in pages)) if pages else ((), ())
+    input_tokens = sum(count_tokens(page) for page in pages) + separator_tokens * max(0, len(pages) - 1)
+
+    boilerplate = repeated_lines(list(bodies), share)
+    removed = 0
+    stripped = []
+    for body in bodies:
+        lines = body.splitlines()
+        kept = [line for line in lines if not line.strip() or _line_key(line) not in boilerplate]
+        removed += len(lines) - len(kept)
+        stripped.append('\n'.join(kept).strip())
+
+    reduced = [marker + body for marker, body in zip(markers, stripped) if body]
+    tokens = sum(count_tokens(page) for page in reduced) + separator_tokens * max(0, len(reduced) - 1)
+    report = {'input_tokens': input_tokens, 'repeated_lines': removed, 'total_sentences': None}
+    if tokens <= max_tokens:
+        return {'pages': reduced, 'sentences': None, 'output_tokens': tokens, **report}
+
+    # Rank every sentence of the document, then fill the budget best-first
+    page_of: List[int] = []
+    sentences: List[str] = []
+    for index, body in enumerate(stripped):
+        for sentence in SENTENCE_RE.split(body):
+            sentence = sentence.strip()
+            if sentence:
+                page_of.append(index)
+                sentences.append(sentence)
+    scores = textrank(sentences)
+
+    selected = []
+    seen = set()
+    pages_used = set()
+    budget = max_tokens
+    for i in sorted(range(len(sentences)), key=lambda i: (-scores[i], i)):
+        # Exact repeats only: unlike boilerplate lines, sentences differing in a number differ
+        key = ' '.join(sentences[i].lower().split())
+        if scores[i] <= 0 or key in seen:
+            continue
+        size = count_tokens(sentences[i]) + 1
+        if page_of[i] not in pages_used:
+            # The page's marker and separator come with its first sentence
+            size += count_tokens(markers[page_of[i]]) + separator_tokens
+        if size > budget:
+            continue
+        seen.add(key)
+        pages_used.add(page_of[i])
+        selected.append(i)
+        budget -= size
+    selected.sort()
+
+    kept_by_page: Dict[int, List[str]] = {}
+    for i in selected:
+        kept_by_page.setdefault(page_of[i], []).append(sentences[i])
+    reduced = [markers[index] + '\n'.join(kept) for index, kept in sorted(kept_by_page.items())]
+    tokens = sum(count_tokens(page) for page in reduced) + separator_tokens * max(0, len(reduced) - 1)
+    report['total_sentences'] = len(sentences)
+    return {'pages': reduced, 'sentences': [sentences[i] for i in selected], 'output_tokens': tokens, **report}
+
+
+def extractive_summary(pages: List[str], max_tokens: int) -> Tuple[str, Dict]:
+    """
+    Offline summary: the top-ranked sentences of the document
+
+    Args:
+        pages: Page texts with [pN] markers, in document order
+        max_tokens: Token budget for the summary
+
+    Returns:
+        Tuple of (summary text, extract_pages result)
+    """
+    extract = extract_pages(pages, max_tokens)
+    if extract['sentences'] is not None:
+        return '\n'.join(extract['sentences']), extract
+    # Short document: its boilerplate-free text is the summary
+    return '\n\n'.join(_split_marker(page)[1] for page in extract['pages']), extract
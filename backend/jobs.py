@@ -0,0 +1,472 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from ocr import extract_document_text
+from llm_summarizer import create_document_summary
+from search_index import get_search_index
+from dedup import get_duplicate_index, minhash_signature
+from page_store import page_meta
+from versions import diff_pages, get_version_store
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle
+STATUS_QUEUED = 'queued'
+STATUS_RUNNING = 'running'
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+
+# Pipeline stages, in order
+STAGES = ('ocr', 'summary')
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another document"""
+
+
+@dataclass
+class Job:
+    job_id: str
+    owner: str
+    filename: str
+    file_path: str
+    output_dir: str
+    file_hash: Optional[str] = None
+    status: str = STATUS_QUEUED
+    stage: Optional[str] = None
+    progress: Dict[str, Dict[str, int]] = field(
+        default_factory=lambda: {stage: {'done': 0, 'total': 0} for stage in STAGES}
+    )
+    error: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    duplicate_of: Optional[str] = None
+    version_of: Optional[str] = None
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (STATUS_COMPLETED, STATUS_FAILED)
+
+    def to_status(self) -> Dict[str, Any]:
+        """Status view of the job (everything except the result payload)"""
+        return {
+            'job_id': self.job_id,
+            'filename': self.filename,
+            'status': self.status,
+            'stage': self.stage,
+            'progress': {stage: dict(counts) for stage, counts in self.progress.items()},
+            'error': self.error,
+            'duplicate_of': self.duplicate_of,
+            'version_of': self.version_of,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobManager:
+    """
+    Runs OCR + summarization for uploaded documents on a bounded worker pool
+
+    Submitting never blocks: jobs wait in the executor queue until a worker is
+    free, and submission fails with QueueFullError once `max_pending` jobs are
+    waiting or running. Finished jobs are kept in memory (up to `history`) so
+    clients can poll for their status and result.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 100, history: int = 1000):
+        """
+        Args:
+            workers: Number of documents processed concurrently
+            max_pending: Maximum number of queued + running jobs
+            history: Number of finished jobs kept for polling
+        """
+        self.max_pending = max_pending
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'JobManager':
+        """Build a manager from JOB_WORKERS / JOB_QUEUE_SIZE / JOB_HISTORY"""
+        return cls(
+            workers=int(os.getenv("JOB_WORKERS", "2")),
+            max_pending=int(os.getenv("JOB_QUEUE_SIZE", "100")),
+            history=int(os.getenv("JOB_HISTORY", "1000"))
+        )
+
+    def submit(self, owner: str, filename: str, file_path: str, output_root: str,
+               file_hash: Optional[str] = None, version_of: Optional[str] = None) -> Job:
+        """
+        Queue a document for processing
+
+        A file whose content hash matches an already processed document is
+        not queued: the returned job is already completed with that
+        document's result.
+
+        Args:
+            owner: Username of the uploader
+            filename: Original file name
+            file_path: Path of the saved upload
+            output_root: Directory under which the job's output directory is created
+            file_hash: SHA-256 of the file, if already known
+            version_of: Job ID of the previous version of this document (default:
+                the owner's latest upload with the same file name, see versions.py)
+
+        Returns:
+            The queued (or completed duplicate) job
+
+        Raises:
+            QueueFullError: If too many jobs are already pending
+        """
+        canonical = self._find_exact_duplicate(file_hash, owner)
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                raise QueueFullError(f"Job queue is full ({pending} pending)")
+            job_id = uuid.uuid4().hex
+            job = Job(
+                job_id=job_id,
+                owner=owner,
+                filename=filename,
+                file_path=file_path,
+                output_dir=os.path.join(output_root, job_id),
+                file_hash=file_hash,
+                version_of=version_of
+            )
+            self._jobs[job.job_id] = job
+            if canonical is not None:
+                self._complete_as_duplicate(job, canonical, 'exact', 1.0)
+            self._prune()
+        if canonical is not None:
+            logger.info(f"Job {job.job_id} ({filename}) is a duplicate of {canonical['doc_id']}")
+            self._link_duplicate(job, canonical, 'exact', 1.0)
+            return job
+        self._executor.submit(self._run, job)
+        logger.info(f"Queued job {job.job_id} for {filename}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def events_since(self, job: Job, cursor: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Get the job's events from position `cursor` onwards
+
+        Args:
+            job: Job to read
+            cursor: Number of events the caller has already seen
+
+        Returns:
+            Tuple of (new events, whether the job has finished)
+        """
+        with self._lock:
+            return [dict(event) for event in job.events[cursor:]], job.finished
+
+    def list(self, owner: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            return [job for job in self._jobs.values() if owner is None or job.owner == owner]
+
+    def stats(self) -> Dict[str, int]:
+        """Number of tracked jobs per status"""
+        counts = {status: 0 for status in (STATUS_QUEUED, STATUS_RUNNING, STATUS_COMPLETED, STATUS_FAILED)}
+        with self._lock:
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def shutdown(self, wait: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond the history limit (lock held)"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def _emit(self, job: Job, event_type: str, **data):
+        """Append an event to the job's stream (lock held)"""
+        job.events.append({'type': event_type, 'time': time.time(), **data})
+
+    def _set_stage(self, job: Job, stage: str, total: int = 0):
+        with self._lock:
+            job.stage = stage
+            job.progress[stage]['total'] = total
+            self._emit(job, 'stage', stage=stage)
+
+    def _advance(self, job: Job, stage: str, done: int, total: int):
+        with self._lock:
+            job.progress[stage]['done'] = done
+            job.progress[stage]['total'] = total
+            self._emit(job, 'progress', stage=stage, done=done, total=total)
+
+    def _page_done(self, job: Job, page_info: Dict, done: int, page_count: int):
+        with self._lock:
+            job.progress['ocr']['done'] = done
+            job.progress['ocr']['total'] = page_count
+            self._emit(
+                job, 'page',
+                page_num=page_info['page_num'],
+                page_count=page_count,
+                text=page_info['text'],
+                language=page_info['language'],
+                method=page_info['method'],
+                preprocess=page_info.get('preprocess'),
+                ocr_regions=page_info.get('ocr_regions'),
+                segments=page_info.get('segments'),
+                cached=page_info.get('cached', False),
+                timings=page_info.get('timings', {})
+            )
+
+    def _finish(self, job: Job, status: str):
+        """Mark the job finished (lock held)"""
+        job.status = status
+        job.finished_at = time.time()
+        # Page texts are on disk; don't keep a second copy for finished jobs
+        for event in job.events:
+            event.pop('text', None)
+        self._emit(job, 'status', status=status, error=job.error)
+
+    def _find_exact_duplicate(self, file_hash: Optional[str], owner: Optional[str]) -> Optional[Dict]:
+        dedup = get_duplicate_index()
+        if dedup is None or not file_hash:
+            return None
+        try:
+            return dedup.find_exact(file_hash, owner)
+        except Exception as e:
+            logger.warning(f"Duplicate lookup failed: {str(e)}")
+            return None
+
+    def _complete_as_duplicate(self, job: Job, canonical: Dict, kind: str, similarity: float,
+                               pages: Optional[List[Dict]] = None):
+        """
+        Finish a job with an existing document's result instead of summarizing
+        it again (lock held; record the link with _link_duplicate once released)
+        """
+        result = dict(canonical['result'])
+        if pages is not None:
+            # A near duplicate was extracted (and indexed) into its own directory
+            result.update(page_count=len(pages), pages=pages, output_dir=job.output_dir)
+        result.update(duplicate_of=canonical['doc_id'], duplicate_kind=kind, similarity=similarity)
+        job.duplicate_of = canonical['doc_id']
+        job.result = result
+        if job.started_at is None:
+            job.started_at = time.time()
+        self._emit(job, 'duplicate', duplicate_of=canonical['doc_id'], kind=kind, similarity=similarity)
+        self._emit(job, 'summary', summary=result.get('summary'))
+        self._finish(job, STATUS_COMPLETED)
+
+    def _link_duplicate(self, job: Job, canonical: Dict, kind: str, similarity: float):
+        """Record in the duplicate index that a job was served from another document"""
+        try:
+            get_duplicate_index().link_duplicate(job.job_id, canonical['doc_id'], job.owner, job.filename,
+                                                 job.file_hash, kind, similarity)
+        except Exception as e:
+            logger.warning(f"Recording duplicate {job.job_id} failed: {str(e)}")
+
+    def _find_near_duplicate(self, job: Job, signature) -> Optional[Tuple[Dict, float]]:
+        dedup = get_duplicate_index()
+        if dedup is None:
+            return None
+        try:
+            return dedup.find_similar(signature, job.owner)
+        except Exception as e:
+            logger.warning(f"Near-duplicate lookup for job {job.job_id} failed: {str(e)}")
+            return None
+
+    def _register_document(self, job: Job, result: Dict[str, Any], signature):
+        """Make a processed document available for duplicate matching"""
+        dedup = get_duplicate_index()
+        if dedup is None:
+            return
+        try:
+            dedup.add_document(job.job_id, job.owner, job.filename, job.file_hash, result, signature)
+        except Exception as e:
+            logger.warning(f"Registering job {job.job_id} for duplicate detection failed: {str(e)}")
+
+    @staticmethod
+    def _page_results(page_texts: Dict[int, Dict]) -> List[Dict[str, Any]]:
+        """Per-page metadata included in a job result"""
+        return [
+            {
+                'page_num': info['page_num'],
+                'language': info['language'],
+                'method': info['method'],
+                'preprocess': info.get('preprocess'),
+                'ocr_regions': info.get('ocr_regions'),
+                'segments': info.get('segments'),
+                'char_count': len(info['text'])
+            }
+            for _, info in sorted(page_texts.items())
+        ]
+
+    def _previous_version(self, job: Job) -> Optional[Dict]:
+        """Version record of the document this upload revises, if any (PDFs only)"""
+        versions = get_version_store()
+        if versions is None or os.path.splitext(job.file_path)[1].lower() != '.pdf':
+            return None
+        try:
+            if job.version_of:
+                previous = versions.get(job.version_of)
+                if previous is not None and previous['owner'] == job.owner:
+                    return previous
+                logger.warning(f"Job {job.job_id}: previous version {job.version_of} not found")
+                return None
+            if os.getenv("VERSION_MATCH_FILENAME", "true").lower() in ('1', 'true', 'yes'):
+                return versions.latest_by_name(job.owner, job.filename)
+        except Exception as e:
+            logger.warning(f"Version lookup for job {job.job_id} failed: {str(e)}")
+        return None
+
+    def _register_version(self, job: Job, page_texts: Dict[int, Dict], result: Dict[str, Any],
+                          sections: Dict[str, str], previous: Optional[Dict]) -> Optional[int]:
+        """Record a processed PDF as a document version; returns its version number"""
+        versions = get_version_store()
+        if versions is None or os.path.splitext(job.file_path)[1].lower() != '.pdf':
+            return None
+        try:
+            return versions.add_version(job.job_id, job.owner, job.filename, job.file_hash,
+                                        self._page_records(page_texts), result, sections, previous)
+        except Exception as e:
+            logger.warning(f"Recording job {job.job_id} as a document version failed: {str(e)}")
+            return None
+
+    @staticmethod
+    def _page_records(page_texts: Dict[int, Dict]) -> List[Dict[str, Any]]:
+        """Saved page metadata plus text, as kept for versions"""
+        return [{**page_meta(info), 'text': info['text']} for _, info in sorted(page_texts.items())]
+
+    @classmethod
+    def _version_diff(cls, previous: Dict, previous_pages: List[Dict],
+                      page_texts: Dict[int, Dict]) -> Optional[Dict]:
+        """
+        Page diff against the previous version, or None if that version's
+        page records were pruned (see VERSIONS_KEEP_PAGES) and there is
+        nothing to compare with
+        """
+        if not previous_pages and previous['page_count']:
+            return None
+        return diff_pages(previous_pages, cls._page_records(page_texts))
+
+    def _index_pages(self, job: Job, page_texts: Dict[int, Dict]):
+        """Add the extracted pages to the search index (a failure here doesn't fail the job)"""
+        try:
+            get_search_index().index_document(
+                job.job_id,
+                (info for _, info in sorted(page_texts.items())),
+                owner=job.owner,
+                filename=job.filename,
+                file_hash=job.file_hash
+            )
+        except Exception as e:
+            logger.warning(f"Indexing job {job.job_id} failed: {str(e)}")
+
+    def _run(self, job: Job):
+        with self._lock:
+            job.status = STATUS_RUNNING
+            job.started_at = time.time()
+            self._emit(job, 'status', status=STATUS_RUNNING, error=None)
+        try:
+            self._set_stage(job, 'ocr')
+            pages_done = 0
+
+            def on_page(page_info: Dict, page_count: int):
+                nonlocal pages_done
+                pages_done += 1
+                self._page_done(job, page_info, pages_done, page_count)
+
+            # A revision of an earlier upload only re-extracts its changed pages
+            versions = get_version_store()
+            previous = self._previous_version(job)
+            previous_pages = versions.pages(previous['job_id']) if previous else None
+            page_texts, combined_text = extract_document_text(
+                job.file_path,
+                job.output_dir,
+                file_hash=job.file_hash,
+                on_page=on_page,
+                fingerprint=versions is not None,
+                previous_pages=previous_pages
+            )
+            self._index_pages(job, page_texts)
+            pages = self._page_results(page_texts)
+            signature = minhash_signature(combined_text)
+
+            version = None
+            sections: Dict[str, str] = {}
+            previous_summary = None
+            if previous is not None:
+                diff = self._version_diff(previous, previous_pages, page_texts)
+                version = {
+                    'previous': previous['job_id'],
+                    'previous_version': previous['version'],
+                    'pages_reused': sum(1 for info in page_texts.values() if 'reused_from' in info),
+                    'diff': diff
+                }
+                counts = {status: diff[status] for status in ('unchanged', 'modified', 'added', 'removed')} if diff else {}
+                with self._lock:
+                    self._emit(job, 'version', previous=previous['job_id'], diff_available=diff is not None, **counts)
+                sections = versions.sections(previous['job_id'])
+                if diff is not None and not (diff['modified'] or diff['added'] or diff['removed']):
+                    previous_summary = (versions.result(previous['job_id']) or {}).get('summary')
+            else:
+                # A near-duplicate of an earlier upload reuses its summary
+                match = self._find_near_duplicate(job, signature)
+                if match is not None:
+                    canonical, similarity = match
+                    logger.info(f"Job {job.job_id} is a near-duplicate of {canonical['doc_id']} ({similarity:.2f})")
+                    with self._lock:
+                        self._complete_as_duplicate(job, canonical, 'near', similarity, pages=pages)
+                    self._link_duplicate(job, canonical, 'near', similarity)
+                    return
+
+            self._set_stage(job, 'summary', total=1)
+            if previous_summary is not None:
+                logger.info(f"Job {job.job_id}: no pages changed since {previous['job_id']}, reusing its summary")
+                summary = previous_summary
+                self._advance(job, 'summary', 1, 1)
+            else:
+                previous_sections = set(sections)
+                summary = create_document_summary(
+                    page_texts,
+                    combined_text,
+                    job.output_dir,
+                    on_progress=lambda done, total: self._advance(job, 'summary', done, total),
+                    section_summaries=sections
+                )
+                if version is not None:
+                    version['sections_reused'] = len(previous_sections & set(sections))
+
+            result = {
+                'page_count': len(page_texts),
+                'pages': pages,
+                'summary': summary,
+                'output_dir': job.output_dir
+            }
+            if 'error' not in summary:
+                self._register_document(job, result, signature)
+                number = self._register_version(job, page_texts, result, sections, previous)
+                if version is not None and number is not None:
+                    version['number'] = number
+            if version is not None:
+                result['version'] = version
+            with self._lock:
+                job.result = result
+                self._emit(job, 'summary', summary=summary)
+                self._finish(job, STATUS_COMPLETED)
+        except Exception as e:
+            logger.error(f"Job {job.job_id} failed: {str(e)}")
+            with self._lock:
+                job.error = str(e)
+                self._finish(job, STATUS_FAILED)
@@ -0,0 +1,145 @@
+import logging
+from typing import Dict, List, Tuple
+
+import numpy as np
+from langdetect import DetectorFactory, detect_langs
+
+logger = logging.getLogger(__name__)
+
+# langdetect is randomized; seed it so the same text always gets the same answer
+DetectorFactory.seed = 0
+
+# Codepoint ranges
+MALAYALAM_RANGE = (0x0D00, 0x0D7F)
+LATIN_RANGES = ((0x41, 0x5A), (0x61, 0x7A), (0xC0, 0x24F))
+SYMBOLS_RANGE = (0x2000, 0x2BFF)
+
+# Share of letters a script needs for a page to be tagged with it outright,
+# and the minimum share of each script for a page to count as bilingual
+DOMINANT_SHARE = 0.8
+BILINGUAL_SHARE = 0.2
+
+
+def script_counts(text: str) -> Tuple[int, int, int]:
+    """
+    Count Malayalam, Latin and other-script letters in one vectorized pass
+
+    Args:
+        text: Input text
+
+    Returns:
+        Tuple of (malayalam, latin, other) letter counts. Digits, whitespace,
+        ASCII/Latin-1 punctuation and general punctuation/symbols
+        (U+2000-U+2BFF) are not counted.
+    """
+    if not text:
+        return 0, 0, 0
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    malayalam = int(np.count_nonzero((codes >= MALAYALAM_RANGE[0]) & (codes <= MALAYALAM_RANGE[1])))
+    latin_mask = np.zeros(codes.shape, dtype=bool)
+    for low, high in LATIN_RANGES:
+        latin_mask |= (codes >= low) & (codes <= high)
+    latin = int(np.count_nonzero(latin_mask))
+    # Everything from U+0370 (Greek onwards) except Malayalam and symbol blocks is another script
+    other_mask = (codes >= 0x0370) & ~((codes >= SYMBOLS_RANGE[0]) & (codes <= SYMBOLS_RANGE[1]))
+    other = int(np.count_nonzero(other_mask)) - malayalam
+    return malayalam, latin, other
+
+
+def detect_language(text: str) -> str:
+    """
+    Detect the primary language of a page
+
+    Most pages are settled from Unicode script counts alone; langdetect is
+    only consulted when no script dominates and the page isn't a clear
+    Malayalam/English mix.
+
+    Args:
+        text: Input text
+
+    Returns:
+        Language code ('en', 'ml', 'mixed' or 'unknown')
+    """
+    if not text or len(text.strip()) < 10:
+        return 'unknown'
+
+    malayalam, latin, other = script_counts(text)
+    letters = malayalam + latin + other
+    if letters:
+        if malayalam >= DOMINANT_SHARE * letters:
+            return 'ml'
+        if latin >= DOMINANT_SHARE * letters:
+            return 'en'
+        if malayalam >= BILINGUAL_SHARE * letters and latin >= BILINGUAL_SHARE * letters:
+            return 'mixed'
+
+    return _detect_with_langdetect(text)
+
+
+def _detect_with_langdetect(text: str) -> str:
+    """Slow path: statistical detection for pages the script counts can't settle"""
+    try:
+        langs = detect_langs(text)
+
+        # Get top language
+        if langs:
+            primary_lang = langs[0]
+
+            # Check if Malayalam
+            if primary_lang.lang == 'ml' and primary_lang.prob > 0.7:
+                return 'ml'
+            # Check if English
+            elif primary_lang.lang == 'en' and primary_lang.prob > 0.7:
+                return 'en'
+            # Mixed content
+            else:
+                return 'mixed'
+
+        return 'unknown'
+
+    except Exception as e:
+        logger.warning(f"Language detection failed: {str(e)}")
+        return 'unknown'
+
+
+def line_language(line: str) -> str:
+    """
+    Tag a single line by its majority script ('ml', 'en', 'other' or 'unknown')
+    """
+    malayalam, latin, other = script_counts(line)
+    if not (malayalam or latin or other):
+        return 'unknown'
+    if malayalam >= latin and malayalam >= other:
+        return 'ml'
+    if latin >= other:
+        return 'en'
+    return 'other'
+
+
+def segment_languages(text: str) -> List[Dict]:
+    """
+    Split text into runs of consecutive lines sharing a script-based language
+
+    Lines without letters (numbers, rules, blank lines) join the current run.
+
+    Args:
+        text: Page text
+
+    Returns:
+        List of {'language', 'start', 'end'} character ranges into `text`
+    """
+    segments: List[Dict] = []
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        start, offset = offset, offset + len(line)
+        language = line_language(line)
+        if segments and (language == 'unknown' or language == segments[-1]['language']):
+            segments[-1]['end'] = offset
+            continue
+        segments.append({'language': language, 'start': start, 'end': offset})
+
+    # Leading letterless lines take the language of what follows them
+    if len(segments) > 1 and segments[0]['language'] == 'unknown':
+        segments[1]['start'] = segments[0]['start']
+        segments.pop(0)
+    return segments
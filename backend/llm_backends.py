@@ -0,0 +1,254 @@
+"""
+LLM backends for the summarizer.
+
+- 'openai' talks to any OpenAI-compatible chat completions endpoint
+  (GitHub Models by default, LLM_BASE_URL / GITHUB_MODELS_ENDPOINT to point
+  it elsewhere, e.g. vLLM or a llama.cpp server).
+- 'ollama' talks to a local Ollama server (OLLAMA_HOST, default
+  http://localhost:11434) through the `ollama` client; no token needed.
+- 'mock' starts mock_llm_server in-process and talks to it as an
+  OpenAI-compatible endpoint: deterministic replies, no network or token,
+  for tests and benchmarks (MOCK_LLM_LATENCY seconds per request).
+
+Each backend holds one HTTP client for the whole process, so connections
+(and TLS sessions) are kept alive across requests and documents. At most
+LLM_MAX_CONNECTIONS requests are in flight per backend, however many jobs
+are summarizing at once; LLM_CONCURRENCY still bounds each document.
+The model is LLM_MODEL, or the backend's default.
+"""
+import os
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from rate_limit import parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+LLM_BACKENDS = ('openai', 'ollama', 'mock')
+
+
+class LLMBackend:
+    """Interface: run one chat completion"""
+
+    name = 'base'
+    default_connections = 8
+
+    def __init__(self, model: str, max_connections: int):
+        self.model = model
+        self.max_connections = max_connections
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> Dict:
+        """
+        Send one request, waiting for a free connection slot first
+
+        Returns:
+            Dictionary with 'text', 'prompt_tokens' and 'completion_tokens'
+            (token counts may be None if the server doesn't report them)
+        """
+        with self._slots:
+            return self._complete(messages, max_tokens, temperature)
+
+    def _complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> Dict:
+        raise NotImplementedError
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Whether a failed request is worth retrying (rate limits, server errors, timeouts)"""
+        return False
+
+    def is_rate_limited(self, error: Exception) -> bool:
+        return False
+
+    def retry_after(self, error: Exception) -> Optional[float]:
+        """Server-requested delay before retrying, if any"""
+        return None
+
+    def close(self):
+        pass
+
+
+class OpenAIBackend(LLMBackend):
+    """OpenAI-compatible endpoint through a shared, pooled `openai` client"""
+
+    name = 'openai'
+
+    def __init__(self, base_url: str, api_key: str, model: str, max_connections: int, timeout: float):
+        from openai import OpenAI
+        super().__init__(model, max_connections)
+        self.base_url = base_url
+        self._http = httpx.Client(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout
+        )
+        # Retries are handled by llm_summarizer.chat_completion so they respect the rate limiter
+        self.client = OpenAI(base_url=base_url, api_key=api_key, max_retries=0, timeout=timeout,
+                             http_client=self._http)
+
+    def _complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> Dict:
+        response = self.client.chat.completions.create(
+            messages=messages,
+            model=self.model,
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        usage = getattr(response, "usage", None)
+        return {
+            'text': response.choices[0].message.content or "",
+            'prompt_tokens': usage.prompt_tokens if usage is not None else None,
+            'completion_tokens': usage.completion_tokens if usage is not None else None
+        }
+
+    def is_retryable(self, error: Exception) -> bool:
+        from openai import APIConnectionError, APIStatusError
+        if isinstance(error, APIConnectionError):
+            return True
+        if isinstance(error, APIStatusError):
+            return error.status_code in (408, 409, 429) or error.status_code >= 500
+        return False
+
+    def is_rate_limited(self, error: Exception) -> bool:
+        return getattr(error, "status_code", None) == 429
+
+    def retry_after(self, error: Exception) -> Optional[float]:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        if not headers:
+            return None
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms:
+            try:
+                return float(retry_after_ms) / 1000
+            except ValueError:
+                pass
+        return parse_retry_after(headers.get("retry-after"))
+
+    def close(self):
+        self._http.close()
+
+
+class OllamaBackend(LLMBackend):
+    """Local Ollama server through a shared, pooled `ollama` client"""
+
+    name = 'ollama'
+    # Ollama runs few requests per model in parallel (OLLAMA_NUM_PARALLEL)
+    default_connections = 2
+
+    def __init__(self, host: str, model: str, max_connections: int, timeout: float):
+        import ollama
+        super().__init__(model, max_connections)
+        self.host = host
+        # Extra keyword arguments are passed on to the underlying httpx.Client
+        self.client = ollama.Client(
+            host=host,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        )
+
+    def _complete(self, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> Dict:
+        response = self.client.chat(
+            model=self.model,
+            messages=messages,
+            options={'num_predict': max_tokens, 'temperature': temperature}
+        )
+        return {
+            'text': response['message']['content'] or "",
+            'prompt_tokens': response.get('prompt_eval_count'),
+            'completion_tokens': response.get('eval_count')
+        }
+
+    def is_retryable(self, error: Exception) -> bool:
+        import ollama
+        if isinstance(error, httpx.TransportError):
+            return True
+        if isinstance(error, ollama.ResponseError):
+            return error.status_code in (408, 429) or error.status_code >= 500
+        return False
+
+    def is_rate_limited(self, error: Exception) -> bool:
+        return getattr(error, "status_code", None) == 429
+
+    def close(self):
+        self.client._client.close()
+
+
+class MockBackend(OpenAIBackend):
+    """OpenAIBackend against an in-process mock_llm_server"""
+
+    name = 'mock'
+
+    def __init__(self, model: str, max_connections: int, timeout: float, latency: float = 0.0):
+        from mock_llm_server import start_mock_server
+        self.server = start_mock_server(latency=latency)
+        super().__init__(self.server.base_url, 'mock', model, max_connections, timeout)
+
+    def close(self):
+        super().close()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# One backend per configuration per process, so every document shares its
+# connection pool and in-flight limit
+_backends: Dict[Tuple, LLMBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend() -> LLMBackend:
+    """
+    Get the shared backend configured by LLM_BACKEND (default 'openai')
+
+    Returns:
+        LLM backend instance
+
+    Raises:
+        ValueError: For an unknown backend name, or 'openai' without an API
+            key (GITHUB_TOKEN or LLM_API_KEY)
+        ImportError: If 'ollama' is requested but not installed
+    """
+    name = os.getenv("LLM_BACKEND", "openai").lower()
+    if name not in LLM_BACKENDS:
+        raise ValueError(f"Unsupported LLM backend: {name}")
+    default_connections = OllamaBackend.default_connections if name == 'ollama' else LLMBackend.default_connections
+    max_connections = max(1, int(os.getenv("LLM_MAX_CONNECTIONS", str(default_connections))))
+    timeout = float(os.getenv("LLM_TIMEOUT", "120"))
+    model = os.getenv("LLM_MODEL")
+
+    if name == 'openai':
+        api_key = os.getenv("LLM_API_KEY") or os.getenv("GITHUB_TOKEN")
+        if not api_key:
+            raise ValueError("GITHUB_TOKEN environment variable not set. Please set your GitHub token.")
+        base_url = os.getenv("LLM_BASE_URL") or os.getenv("GITHUB_MODELS_ENDPOINT", "https://models.github.ai/inference")
+        model = model or os.getenv("GITHUB_MODELS_MODEL", "openai/gpt-4o")
+        key = (name, base_url, api_key, model, max_connections, timeout)
+    elif name == 'ollama':
+        host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
+        model = model or os.getenv("OLLAMA_MODEL", "llama3.1")
+        key = (name, host, model, max_connections, timeout)
+    else:
+        model = model or 'mock'
+        latency = float(os.getenv("MOCK_LLM_LATENCY", "0"))
+        key = (name, model, max_connections, timeout, latency)
+
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            if name == 'openai':
+                backend = OpenAIBackend(base_url, api_key, model, max_connections, timeout)
+            elif name == 'ollama':
+                backend = OllamaBackend(host, model, max_connections, timeout)
+            else:
+                backend = MockBackend(model, max_connections, timeout, latency)
+            logger.info(f"LLM backend: {name} ({model}, {max_connections} connections)")
+            _backends[key] = backend
+        return backend
+
+
+def close_backends():
+    """Close every backend's connections (on shutdown)"""
+    with _backends_lock:
+        for backend in _backends.values():
+            backend.close()
+        _backends.clear()
@@ -1,89 +1,196 @@
 import os
 import json
-from typing import Dict, List, Any
-from openai import OpenAI
+import time
+import hashlib
+import threading
+import itertools
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Any, Optional, Tuple
 from dotenv import load_dotenv
+from rate_limit import RateLimiter, backoff_delay
+from llm_backends import LLMBackend, get_backend
+from extractive import extract_pages, extractive_summary
+from entities import KeyInformation, scan_text
+from disk_cache import DiskCache
+from tokens import count_tokens, iter_page_chunks, pack_chunks, unmarked_hash
+from page_store import marked_text
+from metrics import LLM_REQUEST_SECONDS, LLM_RETRIES, LLM_TOKENS, LLM_WAIT_SECONDS, SUMMARY_SECONDS
 
 # Load environment variables
 load_dotenv()
 
-def create_document_summary(page_texts: Dict[int, Dict], combined_text: str, output_dir: str) -> Dict[str, Any]:
+# Called as on_progress(done, total) as LLM requests complete
+ProgressCallback = Callable[[int, int], None]
+
+# Shared across documents: provider limits apply per API key, not per request
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+_summary_cache: Optional['SummaryCache'] = None
+_summary_cache_loaded = False
+_summary_cache_lock = threading.Lock()
+
+# Bump whenever the prompts change, to invalidate cached summaries
+PROMPT_VERSION = 1
+
+# Every entity occurrence goes to this file in the output directory; the
+# summary only carries up to KEY_INFO_LIMIT distinct values per category
+ENTITIES_FILE = "entities.jsonl"
+KEY_INFO_LIMIT = int(os.getenv("KEY_INFO_LIMIT", "25"))
+
+DOCUMENT_SYSTEM_PROMPT = "You are a helpful assistant specialized in document analysis and summarization. Provide structured summaries with key information extraction."
+CHUNK_SYSTEM_PROMPT = "You are a helpful assistant. Summarize this section of a document concisely while preserving key information."
+REDUCE_SYSTEM_PROMPT = "You are a helpful assistant specialized in document analysis. Merge these consecutive section summaries into one concise summary, preserving names, dates, figures and decisions."
+FINAL_SYSTEM_PROMPT = "You are a helpful assistant specialized in document analysis. Combine these section summaries into a comprehensive, well-structured final summary."
+
+def create_document_summary(page_texts: Dict[int, Dict], combined_text: str, output_dir: str,
+                            on_progress: Optional[ProgressCallback] = None,
+                            section_summaries: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
     """
-    Create document summary using GitHub models via OpenAI client
+    Create document summary with the configured LLM backend (see llm_backends)
+
+    Wrapper around summarize_pages for an already extracted document.
 
     Args:
         page_texts: Dictionary of page texts from OCR
-        combined_text: Combined text from all pages
+        combined_text: Combined text from all pages (unused, the pages are
+            combined as they are summarized)
         output_dir: Directory to save summary files
+        on_progress: Callback invoked with (done, total) LLM requests
+        section_summaries: Section summaries of a previous version of the
+            document (see summarize_large_document); replaced in place with
+            this version's
 
     Returns:
         Dictionary containing summary data or error
     """
-    try:
-        # Get GitHub token
-        token = os.getenv("GITHUB_TOKEN")
-        if not token:
-            return {
-                "error": "GITHUB_TOKEN environment variable not set. Please set your GitHub token."
-            }
+    pages = (page_texts[page_num] for page_num in sorted(page_texts))
+    return summarize_pages(pages, output_dir, on_progress, section_summaries)
 
-        # Initialize OpenAI client with GitHub endpoint
-        client = OpenAI(
-            base_url=os.getenv("GITHUB_MODELS_ENDPOINT", "https://models.github.ai/inference"),
-            api_key=token
-        )
+def summarize_pages(pages: Iterable[Dict], output_dir: str,
+                    on_progress: Optional[ProgressCallback] = None,
+                    section_summaries: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Summarize a document from a stream of pages (e.g. ocr.iter_document_pages)
+
+    Pages are read lazily: a document that fits in MAX_CHUNK_TOKENS is
+    summarized in one request; past that, chunks are sent to the LLM as
+    soon as they fill up, while later pages are still being extracted, and
+    only the chunks in flight are held in memory.
+
+    With EXTRACTIVE_PRESUMMARY (off by default, since it needs the whole
+    document in memory and waits for the last page) the document is first
+    reduced locally (see extractive): lines repeated across pages are
+    dropped and, past EXTRACTIVE_MAX_TOKENS (default 4 x MAX_CHUNK_TOKENS),
+    only the top-ranked sentences are kept. Without a configured LLM
+    backend (e.g. no GITHUB_TOKEN) the summary is extractive only, up to
+    EXTRACTIVE_SUMMARY_TOKENS, unless EXTRACTIVE_FALLBACK is false.
+    Errors raised by the page stream itself propagate; summarization errors
+    are returned, and may leave the stream partly (or, without a usable
+    backend, not at all) consumed.
 
-        # Estimate token count (rough approximation: ~4 characters per token)
-        estimated_tokens = len(combined_text) // 4
-        max_tokens = int(os.getenv("MAX_CHUNK_TOKENS", "5000"))  # Configurable chunk size
+    Args:
+        pages: Page info dictionaries in page order ('page_num', 'text', 'language')
+        output_dir: Directory to save summary files
+        on_progress: Callback invoked with (done, total) LLM requests
+        section_summaries: See create_document_summary
 
-        if estimated_tokens > max_tokens:
-            # Document is too large, use chunking approach
-            print(f"Document too large ({estimated_tokens} tokens), using chunking approach...")
-            summary_text = summarize_large_document(client, combined_text, max_tokens)
+    Returns:
+        Dictionary containing summary data or error
+    """
+    start = time.perf_counter()
+    stats = None
+    try:
+        # Shared backend (LLM_BACKEND), reusing its connections across documents
+        try:
+            backend = get_backend()
+        except (ValueError, ImportError) as error:
+            if not _env_flag("EXTRACTIVE_FALLBACK"):
+                return {"error": str(error)}
+            print(f"{error} Using an extractive summary instead.")
+            backend = None
+
+        max_tokens = int(os.getenv("MAX_CHUNK_TOKENS", "5000"))  # Configurable chunk size
+        stats = _DocumentStats(os.path.join(output_dir, ENTITIES_FILE))
+        stream = _page_stream(pages)
+
+        extract = None
+        if backend is None:
+            summary_text, extract = extractive_summary(
+                [stats.add(page_info) for page_info in stream],
+                int(os.getenv("EXTRACTIVE_SUMMARY_TOKENS", "600"))
+            )
+            _Progress(on_progress, total=1).step()
+        elif _env_flag("EXTRACTIVE_PRESUMMARY", "false"):
+            extract = extract_pages(
+                [stats.add(page_info) for page_info in stream],
+                int(os.getenv("EXTRACTIVE_MAX_TOKENS", str(max_tokens * 4)))
+            )
+            buffered, remaining = extract['pages'], iter(())
+            fits = extract['output_tokens'] <= max_tokens
         else:
+            # Read pages until the document is known not to fit in one request
+            # (tokens estimated per script, or counted with tiktoken if TOKENIZER=tiktoken)
+            buffered: List[str] = []
+            for page_info in stream:
+                buffered.append(stats.add(page_info))
+                if stats.tokens > max_tokens:
+                    break
+            remaining = (stats.add(page_info) for page_info in stream)
+            fits = stats.tokens <= max_tokens
+
+        if extract is not None:
+            reduction = 1 - extract['output_tokens'] / extract['input_tokens'] if extract['input_tokens'] else 0.0
+            print(f"Extractive stage: {extract['input_tokens']} -> {extract['output_tokens']} tokens "
+                  f"({reduction:.0%} less), {extract['repeated_lines']} repeated lines removed")
+
+        if backend is not None and not fits:
+            # Document is too large, use chunking approach
+            print(f"Document larger than {max_tokens} tokens, using chunking approach...")
+            summary_text = summarize_large_document(backend, None, max_tokens, on_progress,
+                                                    pages=itertools.chain(buffered, remaining),
+                                                    section_summaries=section_summaries)
+        elif backend is not None:
             # Document fits in one request
+            combined_text = "\n\n".join(buffered)
             content = f"Document Content:\n{combined_text}\n\nPlease provide a comprehensive summary of this document."
 
-            response = client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful assistant specialized in document analysis and summarization. Provide structured summaries with key information extraction."
-                    },
-                    {
-                        "role": "user",
-                        "content": content
-                    }
-                ],
-                model=os.getenv("GITHUB_MODELS_MODEL", "openai/gpt-4o"),
-                max_tokens=2000,
-                temperature=0.3
+            (summary_text, error), = summarize_batch(
+                backend, DOCUMENT_SYSTEM_PROMPT, [content], 2000,
+                _Progress(on_progress, total=1), get_summary_cache()
             )
-            summary_text = response.choices[0].message.content or ""
+            if summary_text is None:
+                raise RuntimeError(error)
 
         # Extract document type and key information
-        document_type = detect_document_type(combined_text)
-        key_information = extract_key_information(summary_text)
+        document_type = stats.document_type()
+        key_info = extract_key_information(summary_text, stats.key_information)
 
         # Prepare metadata
-        languages = []
-        for page_info in page_texts.values():
-            if page_info.get('language') and page_info['language'] not in languages:
-                languages.append(page_info['language'])
-
         metadata = {
-            "total_pages": len(page_texts),
-            "total_characters": len(combined_text),
-            "estimated_tokens": estimated_tokens,
-            "languages_detected": languages
+            "total_pages": stats.pages,
+            "total_characters": stats.characters,
+            "estimated_tokens": stats.tokens,
+            "languages_detected": stats.languages,
+            "summary_method": "llm" if backend is not None else "extractive",
+            "entity_count": stats.entity_count,
+            "entities_file": ENTITIES_FILE
         }
+        if extract is not None:
+            metadata["extractive"] = {
+                "input_tokens": extract['input_tokens'],
+                "output_tokens": extract['output_tokens'],
+                "token_reduction": round(reduction, 4),
+                "repeated_lines_removed": extract['repeated_lines'],
+                "sentences": extract['total_sentences'],
+                "sentences_selected": len(extract['sentences']) if extract['sentences'] is not None else None
+            }
 
         # Save summary files
         summary_data = {
             "document_type": document_type,
             "overall_summary": summary_text,
-            "key_information": key_information,
+            "key_information": key_info,
             "metadata": metadata
         }
 
@@ -97,7 +204,7 @@ def create_document_summary(page_texts: Dict[int, Dict], combined_text: str, out
         txt_content = f"Document Type: {document_type}\n\n"
         txt_content += f"Overall Summary:\n{summary_text}\n\n"
         txt_content += "Key Information:\n"
-        for category, items in key_information.items():
+        for category, items in key_info.items():
             if items:
                 txt_content += f"{category.replace('_', ' ').upper()}: {', '.join(items)}\n"
         txt_content += "\nMetadata:\n"
@@ -105,126 +212,430 @@ def create_document_summary(page_texts: Dict[int, Dict], combined_text: str, out
         txt_content += f"Total Characters: {metadata['total_characters']}\n"
         txt_content += f"Estimated Tokens: {metadata['estimated_tokens']}\n"
         txt_content += f"Languages Detected: {', '.join(metadata['languages_detected'])}\n"
+        txt_content += f"Summary Method: {metadata['summary_method']}\n"
+        if extract is not None:
+            txt_content += (f"Extractive Stage: {extract['input_tokens']} -> {extract['output_tokens']} tokens "
+                            f"({reduction:.0%} less)\n")
 
         with open(txt_path, 'w', encoding='utf-8') as f:
             f.write(txt_content)
 
+        SUMMARY_SECONDS.observe(time.perf_counter() - start, outcome='ok')
         return summary_data
 
+    except _PageStreamError as error:
+        SUMMARY_SECONDS.observe(time.perf_counter() - start, outcome='error')
+        raise error.__cause__
     except Exception as error:
+        SUMMARY_SECONDS.observe(time.perf_counter() - start, outcome='error')
         print(f"Error in create_document_summary: {error}")
         return {
             "error": f"Failed to generate summary: {str(error)}"
         }
+    finally:
+        if stats is not None:
+            stats.close()
+
+def _env_flag(name: str, default: str = "true") -> bool:
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+class _PageStreamError(Exception):
+    """Wraps an error raised while producing pages, so it isn't reported as a summary failure"""
+
+def _page_stream(pages: Iterable[Dict]) -> Iterator[Dict]:
+    iterator = iter(pages)
+    while True:
+        try:
+            page_info = next(iterator)
+        except StopIteration:
+            return
+        except Exception as error:
+            raise _PageStreamError(str(error)) from error
+        yield page_info
+
+class _DocumentStats:
+    """
+    Running totals over a page stream, for the summary metadata. Every
+    entity found is appended to a JSON Lines file; only the capped key
+    information is kept in memory.
+    """
+
+    def __init__(self, entities_path: str):
+        self.pages = 0
+        self.characters = 0
+        self.tokens = 0
+        self.languages: List[str] = []
+        self.document_types = set()
+        self.key_information = KeyInformation(KEY_INFO_LIMIT)
+        self.entity_count = 0
+        self._entities_path = entities_path
+        self._entities_file = None
+        self._separator_tokens = count_tokens("\n\n")
+
+    def add(self, page_info: Dict) -> str:
+        """Count a page and collect its entities; returns its marked text"""
+        text = marked_text(page_info['page_num'], page_info['text'])
+        if self.pages:
+            self.characters += 2
+            self.tokens += self._separator_tokens
+        self.pages += 1
+        self.characters += len(text)
+        self.tokens += count_tokens(text)
+        language = page_info.get('language')
+        if language and language not in self.languages:
+            self.languages.append(language)
+        self.document_types |= document_type_hits(text)
+        entities = scan_text(page_info['text'], page_info['page_num'])
+        self.key_information.add(entities)
+        self.entity_count += len(entities)
+        if self._entities_file is None:
+            self._entities_file = open(self._entities_path, 'w', encoding='utf-8')
+        for entity in entities:
+            self._entities_file.write(json.dumps(entity, ensure_ascii=False) + "\n")
+        return text
+
+    def close(self):
+        if self._entities_file is not None:
+            self._entities_file.close()
+            self._entities_file = None
+
+    def document_type(self) -> str:
+        return pick_document_type(self.document_types)
+
+class SummaryCache(DiskCache):
+    """
+    Cache of LLM summaries keyed by input text hash, model, prompt and
+    PROMPT_VERSION (configured with SUMMARY_CACHE_DIR / SUMMARY_CACHE_MAX_MB)
+    """
 
-def summarize_large_document(client: OpenAI, text: str, max_chunk_tokens: int) -> str:
+    DB_NAME = 'summary_cache.sqlite3'
+    DIR_ENV = 'SUMMARY_CACHE_DIR'
+    MAX_MB_ENV = 'SUMMARY_CACHE_MAX_MB'
+    DEFAULT_MAX_MB = 256
+
+class _Progress:
+    """Thread-safe (done, total) counter forwarded to an on_progress callback"""
+
+    def __init__(self, on_progress: Optional[ProgressCallback], total: int):
+        self.on_progress = on_progress
+        self.done = 0
+        self.total = total
+        self._lock = threading.Lock()
+
+    def add_total(self, amount: int):
+        with self._lock:
+            self.total += amount
+
+    def step(self):
+        with self._lock:
+            self.done += 1
+            if self.on_progress:
+                self.on_progress(self.done, self.total)
+
+def summarize_large_document(backend: LLMBackend, text: Optional[str], max_chunk_tokens: int,
+                             on_progress: Optional[ProgressCallback] = None,
+                             pages: Optional[Iterable[str]] = None,
+                             section_summaries: Optional[Dict[str, str]] = None) -> str:
     """
     Summarize a large document by chunking it into smaller pieces
 
+    With `pages`, whole pages are packed into token-budget chunks with
+    content-defined boundaries (see tokens.iter_page_chunks), so a revised
+    version of the document is chunked the same way outside its changed
+    pages. Otherwise (or with CHUNK_OVERLAP_TOKENS overlap) the text is
+    packed by paragraphs, oversized ones split on sentence boundaries.
+    Map: chunks are summarized concurrently (LLM_CONCURRENCY requests in
+    flight), paced by the shared rate limiter and retried with backoff.
+    Chunks are submitted as soon as they are packed, and packing waits while
+    more than twice that many are outstanding, so a lazy `pages` iterator is
+    only read as fast as the LLM keeps up.
+    Reduce: while the joined section summaries don't fit in `max_chunk_tokens`
+    they are grouped into budget-sized batches and summarized again, level by
+    level, so no prompt exceeds the budget. Every summary is cached by its
+    input text, so re-processing a mostly unchanged document only calls the
+    LLM for the chunks (and the reduce groups) that changed.
+
     Args:
-        client: OpenAI client instance
-        text: Full document text
-        max_chunk_tokens: Maximum tokens per chunk
+        backend: LLM backend
+        text: Full document text (may be None when `pages` is given)
+        max_chunk_tokens: Maximum tokens per chunk (and per reduce prompt)
+        on_progress: Callback invoked with (done, total) LLM requests; total
+            grows as reduce levels are added
+        pages: Page texts with markers, in document order (any iterable)
+        section_summaries: Map-stage summaries of a previous version, keyed by
+            the section's text hash (page markers excluded, so renumbered
+            pages still match). Sections found there are not summarized
+            again; the dictionary is then replaced with this version's.
 
     Returns:
         Combined summary of all chunks
     """
-    import time
+    overlap = int(os.getenv("CHUNK_OVERLAP_TOKENS", "0"))
+    if pages is not None and not overlap:
+        chunks = iter_page_chunks(pages, max_chunk_tokens)
+    else:
+        # Overlapping chunks are packed from the whole text
+        if text is None:
+            text = "\n\n".join(pages)
+        chunks = iter(pack_chunks(text, max_chunk_tokens, overlap_tokens=overlap))
+
+    previous = dict(section_summaries or {})
+    progress = _Progress(on_progress, total=1)
+    cache = get_summary_cache()
+    concurrency = max(1, int(os.getenv("LLM_CONCURRENCY", "4")))
+
+    # Map: summarize each new or changed chunk
+    keys: List[str] = []
+    results: List[Any] = []
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = deque()
+        for i, chunk in enumerate(chunks):
+            key = unmarked_hash(chunk)
+            keys.append(key)
+            if key in previous:
+                results.append((previous[key], None))
+                continue
+            progress.add_total(1)
+            prompt = f"Document Section {i+1}:\n{chunk}\n\nPlease summarize this section of the document."
+            future = executor.submit(_summarize_one, backend, CHUNK_SYSTEM_PROMPT, prompt, 1000, progress, cache)
+            results.append(future)
+            pending.append(future)
+            while len(pending) > concurrency * 2:
+                pending.popleft().result()
+        results = [result.result() if isinstance(result, Future) else result for result in results]
+    reused = sum(1 for key in keys if key in previous)
+    print(f"Split document into {len(keys)} chunks for summarization"
+          + (f" ({reused} reused from the previous version)" if reused else ""))
+
+    if section_summaries is not None:
+        section_summaries.clear()
+        section_summaries.update({key: summary for key, (summary, _) in zip(keys, results) if summary is not None})
+    summaries = [
+        f"Section {i+1} Summary:\n{summary}" if summary is not None
+        else f"Section {i+1}: [Error processing this section: {error}]"
+        for i, (summary, error) in enumerate(results)
+    ]
+
+    # Reduce: collapse summaries level by level until they fit in one prompt
+    level = 0
+    max_levels = int(os.getenv("MAX_REDUCE_LEVELS", "6"))
+    while count_tokens("\n\n".join(summaries)) > max_chunk_tokens and level < max_levels:
+        level += 1
+        groups = pack_summaries(summaries, max_chunk_tokens)
+        print(f"Reduce level {level}: combining {len(summaries)} summaries into {len(groups)}")
+        progress.add_total(len(groups))
+        group_prompts = [
+            f"Section Summaries:\n{group}\n\nPlease combine these section summaries into one concise summary that preserves key information."
+            for group in groups
+        ]
+        group_summaries = summarize_batch(backend, REDUCE_SYSTEM_PROMPT, group_prompts, 1000, progress, cache)
+        summaries = [
+            f"Part {i+1} Summary:\n{summary}" if summary is not None else groups[i]
+            for i, (summary, _) in enumerate(group_summaries)
+        ]
+
+    # Combine the remaining summaries into a final summary
+    combined_summaries = "\n\n".join(summaries)
+    final_content = f"Individual Section Summaries:\n{combined_summaries}\n\nPlease provide a comprehensive final summary that combines all these section summaries into a coherent document overview."
+
+    (final_summary, error), = summarize_batch(backend, FINAL_SYSTEM_PROMPT, [final_content], 2000, progress, cache)
+    if final_summary is None:
+        print(f"Error creating final summary: {error}")
+        return f"Document Summary (Chunked Processing):\n\n{combined_summaries}"
+    return final_summary
 
-    # Split text into chunks based on character count (rough token estimation)
-    chunk_size = max_chunk_tokens * 4  # ~4 chars per token
-    chunks = []
+def pack_summaries(summaries: List[str], max_tokens: int) -> List[str]:
+    """
+    Greedily pack consecutive summaries into groups of at most `max_tokens`
 
-    # Split by paragraphs first to maintain coherence
-    paragraphs = text.split('\n\n')
-    current_chunk = ""
-    current_size = 0
+    A summary larger than the budget forms a group of its own; it still
+    shrinks when summarized, so every reduce level makes progress.
 
-    for para in paragraphs:
-        para_size = len(para) // 4  # Estimate tokens
+    Args:
+        summaries: Summaries in document order
+        max_tokens: Token budget per group
 
-        if current_size + para_size > max_chunk_tokens and current_chunk:
-            chunks.append(current_chunk.strip())
-            current_chunk = para
-            current_size = para_size
-        else:
-            current_chunk += "\n\n" + para if current_chunk else para
-            current_size += para_size
+    Returns:
+        List of joined groups
+    """
+    groups: List[List[str]] = []
+    current: List[str] = []
+    current_size = 0
+    for summary in summaries:
+        size = count_tokens(summary)
+        if current and current_size + size > max_tokens:
+            groups.append(current)
+            current, current_size = [], 0
+        current.append(summary)
+        current_size += size
+    if current:
+        groups.append(current)
+    return ["\n\n".join(group) for group in groups]
+
+def summarize_batch(backend: LLMBackend, system_prompt: str, contents: List[str], max_tokens: int,
+                    progress: _Progress, cache: Optional[SummaryCache]) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    Run one completion per content concurrently, serving repeats from the cache
 
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    Args:
+        backend: LLM backend
+        system_prompt: System message for every request
+        contents: User messages
+        max_tokens: Completion token limit
+        progress: Progress counter, stepped once per content
+        cache: Summary cache, or None
 
-    print(f"Split document into {len(chunks)} chunks for summarization")
+    Returns:
+        List of (summary, None) or (None, error message) in input order
+    """
+    def run(content: str) -> Tuple[Optional[str], Optional[str]]:
+        return _summarize_one(backend, system_prompt, content, max_tokens, progress, cache)
+
+    if not contents:
+        return []
+    if len(contents) == 1:
+        return [run(contents[0])]
+    concurrency = max(1, int(os.getenv("LLM_CONCURRENCY", "4")))
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(contents))) as executor:
+        return list(executor.map(run, contents))
+
+def _summarize_one(backend: LLMBackend, system_prompt: str, content: str, max_tokens: int,
+                   progress: _Progress, cache: Optional[SummaryCache]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    One completion, served from the cache when possible
 
-    # Summarize each chunk with rate limiting
-    chunk_summaries = []
-    for i, chunk in enumerate(chunks):
-        try:
-            content = f"Document Section {i+1}:\n{chunk}\n\nPlease summarize this section of the document."
-
-            response = client.chat.completions.create(
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a helpful assistant. Summarize this section of a document concisely while preserving key information."
-                    },
-                    {
-                        "role": "user",
-                        "content": content
-                    }
-                ],
-                model=os.getenv("GITHUB_MODELS_MODEL", "openai/gpt-4o"),
-                max_tokens=1000,
-                temperature=0.3
+    Returns:
+        (summary, None) or (None, error message)
+    """
+    try:
+        key = None
+        if cache:
+            content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            key = cache.make_key(
+                content_hash, 0,
+                backend=backend.name,
+                model=backend.model,
+                system=system_prompt,
+                max_tokens=max_tokens,
+                prompt_version=PROMPT_VERSION
             )
+            cached = cache.get(key)
+            if cached is not None:
+                return cached['summary'], None
+        summary = chat_completion(
+            backend,
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": content}
+            ],
+            max_tokens=max_tokens
+        )
+        if key and summary:
+            cache.put(key, {'summary': summary})
+        return summary, None
+    except Exception as e:
+        return None, str(e)
+    finally:
+        progress.step()
 
-            chunk_summary = response.choices[0].message.content or ""
-            chunk_summaries.append(f"Section {i+1} Summary:\n{chunk_summary}")
-            print(f"Summarized chunk {i+1}/{len(chunks)}")
-
-            # Add delay between requests to avoid rate limits
-            if i < len(chunks) - 1:  # Don't delay after the last chunk
-                delay = int(os.getenv("CHUNK_DELAY_SECONDS", "3"))
-                time.sleep(delay)  # Configurable delay between requests
-
-        except Exception as e:
-            print(f"Error summarizing chunk {i+1}: {e}")
-            chunk_summaries.append(f"Section {i+1}: [Error processing this section: {str(e)}]")
+def get_summary_cache() -> Optional[SummaryCache]:
+    """
+    Process-wide summary cache, or None if SUMMARY_CACHE_DIR is unset
+    """
+    global _summary_cache, _summary_cache_loaded
+    with _summary_cache_lock:
+        if not _summary_cache_loaded:
+            _summary_cache = SummaryCache.from_env()
+            _summary_cache_loaded = True
+        return _summary_cache
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Process-wide rate limiter shared by every summarization request, built
+    from LLM_REQUESTS_PER_MINUTE / LLM_TOKENS_PER_MINUTE (0 = unlimited)
+    """
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(
+                requests_per_minute=float(os.getenv("LLM_REQUESTS_PER_MINUTE", "15")),
+                tokens_per_minute=float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+            )
+        return _rate_limiter
 
-            # If rate limited, wait longer before continuing
-            if "429" in str(e) or "rate" in str(e).lower():
-                retry_delay = int(os.getenv("RATE_LIMIT_RETRY_DELAY", "30"))
-                print(f"Rate limit detected, waiting {retry_delay} seconds before continuing...")
-                time.sleep(retry_delay)
+def chat_completion(backend: LLMBackend, messages: List[Dict[str, str]], max_tokens: int,
+                    temperature: float = 0.3) -> str:
+    """
+    Send one chat completion request through the rate limiter, retrying
+    retryable failures with jittered exponential backoff. A Retry-After from
+    the server pauses every caller sharing the limiter.
 
-    # Combine all chunk summaries into a final summary
-    combined_summaries = "\n\n".join(chunk_summaries)
+    Args:
+        backend: LLM backend (its client's own retries are disabled)
+        messages: Chat messages
+        max_tokens: Completion token limit
+        temperature: Sampling temperature
 
-    try:
-        final_content = f"Individual Section Summaries:\n{combined_summaries}\n\nPlease provide a comprehensive final summary that combines all these section summaries into a coherent document overview."
-
-        response = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful assistant specialized in document analysis. Combine these section summaries into a comprehensive, well-structured final summary."
-                },
-                {
-                    "role": "user",
-                    "content": final_content
-                }
-            ],
-            model=os.getenv("GITHUB_MODELS_MODEL", "openai/gpt-4o"),
-            max_tokens=2000,
-            temperature=0.3
-        )
+    Returns:
+        Response text
 
-        final_summary = response.choices[0].message.content or ""
-        return final_summary
+    Raises:
+        The last API error once retries are exhausted
+    """
+    limiter = get_rate_limiter()
+    max_retries = int(os.getenv("LLM_MAX_RETRIES", "5"))
+    base_delay = float(os.getenv("LLM_RETRY_BASE_DELAY", "1"))
+    max_delay = float(os.getenv("RATE_LIMIT_RETRY_DELAY", "30"))
+    # Budget the prompt plus the completion against the TPM limit
+    request_tokens = sum(count_tokens(m["content"]) for m in messages) + max_tokens
+
+    attempt = 0
+    while True:
+        waited = time.perf_counter()
+        limiter.acquire(request_tokens)
+        LLM_WAIT_SECONDS.observe(time.perf_counter() - waited)
+        started = time.perf_counter()
+        try:
+            response = backend.complete(messages, max_tokens, temperature)
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, outcome='ok')
+            LLM_TOKENS.inc(response['prompt_tokens'] or 0, kind='prompt')
+            LLM_TOKENS.inc(response['completion_tokens'] or 0, kind='completion')
+            return response['text']
+        except Exception as e:
+            rate_limited = backend.is_rate_limited(e)
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                        outcome='rate_limited' if rate_limited else 'error')
+            if attempt >= max_retries or not backend.is_retryable(e):
+                raise
+            LLM_RETRIES.inc(reason='rate_limit' if rate_limited else 'error')
+            delay = backoff_delay(attempt, base_delay, max_delay)
+            retry_after = backend.retry_after(e)
+            if retry_after is not None:
+                limiter.pause(retry_after)
+                delay = retry_after + delay / 4
+            print(f"LLM request failed ({e}), retry {attempt+1}/{max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+# Document types by priority, with the keywords that identify them
+DOCUMENT_TYPES = [
+    ("Resume/CV", ["resume", "cv", "experience", "skills"]),
+    ("Invoice", ["invoice", "bill", "payment"]),
+    ("Contract", ["contract", "agreement", "terms"]),
+    ("Report", ["report"]),
+]
+
+def document_type_hits(text: str) -> set:
+    """Document types whose keywords occur in the text"""
+    lower_text = text.lower()
+    return {name for name, keywords in DOCUMENT_TYPES if any(keyword in lower_text for keyword in keywords)}
 
-    except Exception as e:
-        print(f"Error creating final summary: {e}")
-        return f"Document Summary (Chunked Processing):\n\n{combined_summaries}"
+def pick_document_type(hits: set) -> str:
+    """Highest-priority document type among keyword hits"""
+    for name, _ in DOCUMENT_TYPES:
+        if name in hits:
+            return name
+    return "Document"
 
 def detect_document_type(text: str) -> str:
     """
@@ -236,52 +647,23 @@ def detect_document_type(text: str) -> str:
     Returns:
         Document type string
     """
-    lower_text = text.lower()
-
-    if any(keyword in lower_text for keyword in ["resume", "cv", "experience", "skills"]):
-        return "Resume/CV"
-    elif any(keyword in lower_text for keyword in ["invoice", "bill", "payment"]):
-        return "Invoice"
-    elif any(keyword in lower_text for keyword in ["contract", "agreement", "terms"]):
-        return "Contract"
-    elif "report" in lower_text:
-        return "Report"
-    else:
-        return "Document"
+    return pick_document_type(document_type_hits(text))
 
-def extract_key_information(summary_text: str) -> Dict[str, List[str]]:
+def extract_key_information(summary_text: str, document: Optional[KeyInformation] = None) -> Dict[str, List[str]]:
     """
-    Extract key information from summary text using pattern matching
+    Extract key information from the summary text and the document's own
+    entities (see entities.scan_text), at most KEY_INFO_LIMIT values per category
 
     Args:
         summary_text: The summary text to analyze
+        document: Key information collected from the document's pages
 
     Returns:
         Dictionary of key information categories
     """
-    import re
-
-    key_info = {
-        "names": [],
-        "dates": [],
-        "organizations": [],
-        "locations": [],
-        "contact_info": []
-    }
-
-    # Basic pattern matching
-    name_pattern = r'\b[A-Z][a-z]+ [A-Z][a-z]+\b'
-    date_pattern = r'\b\d{1,2}[-/]\d{1,2}[-/]\d{2,4}\b'
-    email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    phone_pattern = r'\b\d{3}[-.]?\d{3}[-.]?\d{4}\b'
-
-    names = re.findall(name_pattern, summary_text) or []
-    dates = re.findall(date_pattern, summary_text) or []
-    emails = re.findall(email_pattern, summary_text) or []
-    phones = re.findall(phone_pattern, summary_text) or []
-
-    key_info["names"] = list(set(names))
-    key_info["dates"] = list(set(dates))
-    key_info["contact_info"] = list(set(emails + phones))
-
-    return key_info
+    info = KeyInformation(KEY_INFO_LIMIT).add(scan_text(summary_text))
+    if document is not None:
+        for category, values in document.as_dict().items():
+            for value in values:
+                info.add_value(category, value)
+    return info.as_dict()
@@ -1,9 +1,16 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, status
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from typing import List, Set
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional, Set, Tuple
 import os
+import json
+import asyncio
+import hashlib
+import sqlite3
+import tempfile
+import time
 import logging
 from dotenv import load_dotenv
 from auth import (
@@ -15,6 +22,13 @@ from auth import (
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from datetime import timedelta
+from jobs import JobManager, QueueFullError, STATUS_COMPLETED
+from ocr import PROCESSABLE_EXTENSIONS
+from metrics import REGISTRY, UPLOAD_BYTES, UPLOAD_SECONDS
+from search_index import get_search_index
+from dedup import get_duplicate_index
+from versions import get_version_store
+from llm_backends import close_backends
 
 # Load environment variables
 load_dotenv()
@@ -28,13 +42,26 @@ app = FastAPI(title="SIH Document Processing API")
 # Configuration from environment variables
 DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 UPLOAD_DIR = os.getenv("UPLOAD_FOLDER", "uploads")
+OUTPUT_DIR = os.getenv("OUTPUT_FOLDER", "processed")
 MAX_FILE_SIZE = int(os.getenv("MAX_CONTENT_LENGTH", 16 * 1024 * 1024))  # Default 16MB
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))  # Default 1MB
+EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "0.25"))  # Seconds
+EVENT_KEEPALIVE_INTERVAL = float(os.getenv("EVENT_KEEPALIVE_INTERVAL", "15"))  # Seconds
 ALLOWED_EXTENSIONS: Set[str] = {
     f".{ext}" for ext in os.getenv("ALLOWED_EXTENSIONS", "pdf,doc,docx,txt").split(",")
 }
 
 # Create uploads directory if it doesn't exist
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+# Background OCR + summarization jobs
+job_manager = JobManager.from_env()
+
+@app.on_event("shutdown")
+def shutdown_job_manager():
+    job_manager.shutdown(wait=False)
+    close_backends()
 
 # Configure error handling
 @app.exception_handler(HTTPException)
@@ -69,9 +96,113 @@ def validate_file(file: UploadFile) -> None:
             detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
         )
 
+def file_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail=f"File size exceeds maximum allowed size of {MAX_FILE_SIZE/1024/1024}MB"
+    )
+
+# Upload request bodies may exceed MAX_FILE_SIZE by this much (multipart framing, form fields)
+UPLOAD_BODY_SLACK = 64 * 1024
+
+class UploadSizeLimitMiddleware:
+    """
+    Enforce the upload size limit on the raw request body, before the
+    multipart form is parsed and spooled to disk: requests declaring a larger
+    Content-Length are rejected without reading the body, and chunked or
+    mis-declared bodies are cut off as soon as the limit is passed.
+    """
+
+    def __init__(self, app, paths: Set[str], max_bytes: int):
+        self.app = app
+        self.paths = paths
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Stops the form parser; the app turns it into the error response
+                    raise file_too_large()
+            return message
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracked_send)
+        except HTTPException:
+            if response_started:
+                raise
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope, receive, send):
+        error = file_too_large()
+        logger.error(f"HTTP error: {error.detail}")
+        response = JSONResponse(status_code=error.status_code, content={"detail": error.detail},
+                                headers={"Connection": "close"})
+        await response(scope, receive, send)
+
+app.add_middleware(UploadSizeLimitMiddleware, paths={"/api/upload"},
+                   max_bytes=MAX_FILE_SIZE + UPLOAD_BODY_SLACK)
+
+async def save_upload(file: UploadFile) -> Tuple[str, int, str]:
+    """
+    Stream an upload to disk in fixed-size chunks, hashing it on the way
+
+    The data goes to a temp file in UPLOAD_DIR and is renamed into place only
+    once complete. The final name is prefixed with the content hash, so
+    concurrent uploads sharing a filename never overwrite each other's bytes.
+
+    Returns:
+        Tuple of (saved path, size in bytes, SHA-256 hex digest)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=UPLOAD_DIR, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise file_too_large()
+                digest.update(chunk)
+                await run_in_threadpool(out.write, chunk)
+        file_hash = digest.hexdigest()
+        file_path = os.path.join(UPLOAD_DIR, f"{file_hash[:16]}_{os.path.basename(file.filename)}")
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return file_path, size, file_hash
+
 @app.post("/api/login", response_model=Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(form_data.username, form_data.password)
+    # bcrypt verification runs on the thread pool so it never blocks the event loop
+    user = await run_in_threadpool(authenticate_user, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -95,37 +226,65 @@ def read_root():
 @app.post("/api/upload")
 async def upload_file(
     file: UploadFile = File(...),
+    version_of: Optional[str] = Form(None),
     current_user: User = Depends(get_current_user)
 ):
+    """
+    Store an upload and queue it for processing. `version_of` names the job
+    of the previous version of the document; without it, an earlier upload
+    with the same file name is treated as the previous version.
+    """
+    start = time.perf_counter()
+    outcome = "error"
     try:
-        # Validate file type
+        # Validate file type (oversized bodies were already cut off by UploadSizeLimitMiddleware)
         validate_file(file)
         
-        # Read file content
-        contents = await file.read()
-        
-        # Check file size
-        if len(contents) > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File size exceeds maximum allowed size of {MAX_FILE_SIZE/1024/1024}MB"
-            )
+        if version_of:
+            versions = get_version_store()
+            previous = await run_in_threadpool(versions.get, version_of) if versions else None
+            if previous is None or previous['owner'] != current_user.username:
+                raise HTTPException(status_code=404, detail="Previous version not found")
         
-        # Save file
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as f:
-            f.write(contents)
+        # Stream the spooled file into place, checking the exact file size
+        file_path, size, file_hash = await save_upload(file)
         
-        # Here you can add OCR or summarization logic
+        # Queue OCR + summarization; the client polls /api/jobs/{job_id}.
+        # Exact duplicates of processed files come back already completed.
+        # The duplicate lookup hits SQLite, so submit off the event loop.
+        job_id = None
+        duplicate_of = None
+        if os.path.splitext(file.filename)[1].lower() in PROCESSABLE_EXTENSIONS:
+            try:
+                job = await run_in_threadpool(
+                    job_manager.submit,
+                    owner=current_user.username,
+                    filename=file.filename,
+                    file_path=file_path,
+                    output_root=OUTPUT_DIR,
+                    file_hash=file_hash,
+                    version_of=version_of
+                )
+            except QueueFullError as e:
+                raise HTTPException(status_code=503, detail=str(e))
+            job_id = job.job_id
+            duplicate_of = job.duplicate_of
         
+        outcome = "ok"
+        UPLOAD_BYTES.inc(size)
         return {
             "filename": file.filename,
-            "size": len(contents),
+            "size": size,
+            "sha256": file_hash,
             "message": "File received successfully",
-            "saved_path": file_path
+            "saved_path": file_path,
+            "job_id": job_id,
+            "duplicate_of": duplicate_of
         }
         
     except HTTPException as e:
+        if e.status_code < 500:
+            outcome = "rejected"
         raise e
     except Exception as e:
         raise HTTPException(
@@ -133,4 +292,132 @@ async def upload_file(
             detail=f"An error occurred while processing the file: {str(e)}"
         )
     finally:
+        UPLOAD_SECONDS.observe(time.perf_counter() - start, outcome=outcome)
         await file.close()
+
+def get_user_job(job_id: str, current_user: User):
+    job = job_manager.get(job_id)
+    if job is None or job.owner != current_user.username:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/jobs")
+async def list_jobs(current_user: User = Depends(get_current_user)):
+    return [job.to_status() for job in job_manager.list(owner=current_user.username)]
+
+@app.get("/api/jobs/{job_id}")
+async def get_job_status(job_id: str, current_user: User = Depends(get_current_user)):
+    return get_user_job(job_id, current_user).to_status()
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str, current_user: User = Depends(get_current_user)):
+    job = get_user_job(job_id, current_user)
+    if job.status != STATUS_COMPLETED:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Job is {job.status}" + (f": {job.error}" if job.error else "")
+        )
+    return {**job.to_status(), "result": job.result}
+
+@app.get("/api/jobs/{job_id}/versions")
+async def get_job_versions(job_id: str, current_user: User = Depends(get_current_user)):
+    """
+    All versions of the document a job processed, oldest first. The page
+    diff against the previous version is in each job's result ('version';
+    its 'diff' is None when that version's page records were pruned).
+    """
+    versions = get_version_store()
+    record = await run_in_threadpool(versions.get, job_id) if versions else None
+    if record is None or record['owner'] != current_user.username:
+        raise HTTPException(status_code=404, detail="No versions recorded for this job")
+    return await run_in_threadpool(versions.history, record['doc_key'])
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str, current_user: User = Depends(get_current_user)):
+    """
+    Server-Sent Events stream of a job: status and stage changes, one `page`
+    event per extracted page (text, language, method, timings) as soon as it is
+    done, summary progress and finally the summary. Events are replayed from
+    the start, so late subscribers catch up.
+    """
+    job = get_user_job(job_id, current_user)
+
+    async def event_stream():
+        cursor = 0
+        idle = 0.0
+        while True:
+            events, finished = job_manager.events_since(job, cursor)
+            for event in events:
+                yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+            cursor += len(events)
+            if finished and not events:
+                break
+            if events:
+                idle = 0.0
+                continue
+            if idle >= EVENT_KEEPALIVE_INTERVAL:
+                yield ": keepalive\n\n"
+                idle = 0.0
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+            idle += EVENT_POLL_INTERVAL
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/search")
+async def search_pages(
+    q: str,
+    limit: int = 20,
+    offset: int = 0,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Ranked page hits for the current user's documents (and shared,
+    bulk-ingested ones). Snippets are HTML-escaped with matches in <mark>.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+    limit = max(1, min(limit, 100))
+    offset = max(0, offset)
+    try:
+        hits = await run_in_threadpool(
+            get_search_index().search, q, owner=current_user.username, limit=limit, offset=offset
+        )
+    except sqlite3.OperationalError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid search query: {str(e)}")
+    return {"query": q, "limit": limit, "offset": offset, "hits": hits}
+
+@app.get("/api/duplicates")
+async def list_duplicate_clusters(current_user: User = Depends(get_current_user)):
+    """
+    Duplicate clusters involving the current user's uploads: the processed
+    document and the uploads (exact or near-duplicate) served from its results
+    """
+    dedup = get_duplicate_index()
+    if dedup is None:
+        return {"enabled": False, "threshold": None, "clusters": []}
+    clusters = await run_in_threadpool(dedup.clusters, current_user.username)
+    return {"enabled": True, "threshold": dedup.threshold, "clusters": clusters}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """
+    Counters and latency histograms in the Prometheus text format: OCR stage
+    times per page, LLM call latency/tokens/retries, summary and upload times
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/stats")
+async def get_stats(current_user: User = Depends(get_current_user)):
+    """
+    JSON view of the same metrics for the dashboard, with p50/p95/p99 over
+    recent observations, plus job counts by status and search index size
+    """
+    return {
+        "jobs": job_manager.stats(),
+        "search_index": await run_in_threadpool(get_search_index().stats),
+        "metrics": REGISTRY.snapshot()
+    }
@@ -0,0 +1,244 @@
+"""
+In-process counters and latency histograms, rendered in the Prometheus text
+exposition format for /metrics and as a JSON snapshot (with p50/p95/p99
+over recent observations) for the dashboard.
+
+OCR page workers run in separate processes, so page stage timings are not
+recorded where they are measured: they travel back in each page's
+`timings` dict and are observed in the parent process.
+"""
+import math
+import threading
+from bisect import bisect_left
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Seconds; covers fast text-layer reads up to slow OCR pages and LLM calls
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Observations kept per series for the JSON percentiles
+RECENT_SAMPLES = 1000
+
+LabelKey = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class Metric:
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelKey:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+    def snapshot(self) -> List[Dict]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing total per label set"""
+
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [{'labels': dict(zip(self.labelnames, key)), 'value': value} for key, value in items]
+
+
+class _HistogramSeries:
+    __slots__ = ('counts', 'sum', 'count', 'recent')
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.sum = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram per label set, plus a window of recent values"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[LabelKey, _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets))
+            series.counts[bisect_left(self.buckets, value)] += 1
+            series.sum += value
+            series.count += 1
+            series.recent.append(value)
+
+    def render(self) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted(self._series.items())
+            for key, series in items:
+                cumulative = 0
+                for bound, count in zip(self.buckets, series.counts):
+                    cumulative += count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(series.sum)}")
+                lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            items = [(key, series.count, series.sum, sorted(series.recent))
+                     for key, series in sorted(self._series.items())]
+        result = []
+        for key, count, total, recent in items:
+            entry = {
+                'labels': dict(zip(self.labelnames, key)),
+                'count': count,
+                'sum': total,
+                'mean': total / count if count else 0.0
+            }
+            if recent:
+                entry.update(p50=_percentile(recent, 0.5), p95=_percentile(recent, 0.95),
+                             p99=_percentile(recent, 0.99), max=recent[-1])
+            result.append(entry)
+        return result
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets or DEFAULT_BUCKETS))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, List[Dict]]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+
+REGISTRY = MetricsRegistry()
+
+# OCR
+OCR_STAGE_SECONDS = REGISTRY.histogram(
+    'ocr_stage_seconds', 'Time spent per OCR pipeline stage for one page', ['stage'])
+OCR_PAGES = REGISTRY.counter(
+    'ocr_pages_total', 'Pages extracted, by method and whether they came from the cache', ['method', 'cached'])
+
+# Summarization
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    'llm_request_seconds', 'Latency of individual LLM API calls (excluding rate limiter waits)', ['outcome'])
+LLM_WAIT_SECONDS = REGISTRY.histogram(
+    'llm_rate_limit_wait_seconds', 'Time LLM calls spent waiting on the client-side rate limiter')
+LLM_TOKENS = REGISTRY.counter(
+    'llm_tokens_total', 'Tokens reported by the LLM API', ['kind'])
+LLM_RETRIES = REGISTRY.counter(
+    'llm_retries_total', 'Retried LLM calls, by reason', ['reason'])
+SUMMARY_SECONDS = REGISTRY.histogram(
+    'summary_seconds', 'End-to-end document summarization time', ['outcome'])
+
+# Uploads
+UPLOAD_SECONDS = REGISTRY.histogram(
+    'upload_seconds', 'Time to receive, hash and store an upload', ['outcome'])
+UPLOAD_BYTES = REGISTRY.counter(
+    'upload_bytes_total', 'Bytes of successfully stored uploads')
+
+# Page timing keys (see DocumentOCR) -> stage label
+OCR_TIMING_STAGES = {
+    'text_layer_ms': 'text_layer',
+    'render_ms': 'render',
+    'preprocess_ms': 'preprocess',
+    'tesseract_ms': 'tesseract',
+    'language_ms': 'language',
+    'save_ms': 'save',
+    'total_ms': 'page',
+}
+
+
+def observe_page(page_info: Dict):
+    """Record a page's stage timings and outcome"""
+    for key, stage in OCR_TIMING_STAGES.items():
+        value = page_info.get('timings', {}).get(key)
+        if value is not None:
+            OCR_STAGE_SECONDS.observe(value / 1000, stage=stage)
+    OCR_PAGES.inc(method=page_info['method'], cached=str(bool(page_info.get('cached'))).lower())
@@ -0,0 +1,199 @@
+"""
+Deterministic stand-in for an OpenAI-compatible chat completions endpoint
+(and Ollama's /api/chat).
+
+Useful for exercising the summarizer's concurrency, rate limiting and retry
+handling without a network or an API token:
+
+    python mock_llm_server.py --port 8099 --latency 0.5 --rate-limit-every 5
+    GITHUB_TOKEN=mock GITHUB_MODELS_ENDPOINT=http://127.0.0.1:8099/v1 python script.py
+
+LLM_BACKEND=mock starts one in-process instead (see llm_backends);
+LLM_BACKEND=ollama OLLAMA_HOST=http://127.0.0.1:8099 uses it as an Ollama server.
+
+Every N-th request (--rate-limit-every) is answered with 429 and a
+Retry-After header. Replies echo the opening words of the last user message,
+so the same input always produces the same summary.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], latency: float = 0.0,
+                 rate_limit_every: int = 0, retry_after: float = 1.0, reply_words: int = 40):
+        """
+        Args:
+            address: (host, port) to listen on, port 0 picks a free port
+            latency: Seconds to wait before answering each request
+            rate_limit_every: Answer every N-th request with 429 (0 = never)
+            retry_after: Retry-After value sent with 429 responses
+            reply_words: Number of words echoed back in each reply
+        """
+        super().__init__(address, MockLLMHandler)
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.reply_words = reply_words
+        self.stats = {'requests': 0, 'rate_limited': 0, 'completed': 0, 'max_in_flight': 0}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def next_request(self) -> bool:
+        """Count a request; returns False if it should be rate limited"""
+        with self._lock:
+            self.stats['requests'] += 1
+            if self.rate_limit_every and self.stats['requests'] % self.rate_limit_every == 0:
+                self.stats['rate_limited'] += 1
+                return False
+            self._in_flight += 1
+            self.stats['max_in_flight'] = max(self.stats['max_in_flight'], self._in_flight)
+            return True
+
+    def request_done(self):
+        with self._lock:
+            self._in_flight -= 1
+            self.stats['completed'] += 1
+
+    def reply(self, body: Dict) -> Dict:
+        messages = body.get('messages') or [{}]
+        user_text = next(
+            (m.get('content', '') for m in reversed(messages) if m.get('role') == 'user'),
+            ''
+        )
+        words = user_text.split()
+        content = "Summary: " + " ".join(words[:self.reply_words])
+        prompt_tokens = sum(len(m.get('content', '')) for m in messages) // 4
+        completion_tokens = len(content) // 4
+        return {
+            'id': f"mock-{self.stats['requests']}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'mock'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens
+            }
+        }
+
+
+def ollama_reply(reply: Dict) -> Dict:
+    """Chat completion reply in Ollama's /api/chat (non-streaming) format"""
+    return {
+        'model': reply['model'],
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(reply['created'])),
+        'message': reply['choices'][0]['message'],
+        'done': True,
+        'prompt_eval_count': reply['usage']['prompt_tokens'],
+        'eval_count': reply['usage']['completion_tokens']
+    }
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    server: MockLLMServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict, headers: Dict[str, str] = None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': {'message': 'Invalid JSON'}})
+            return
+
+        path = self.path.rstrip('/')
+        ollama = path == '/api/chat'
+        if not ollama and not path.endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f'Unknown path {self.path}'}})
+            return
+
+        if not self.server.next_request():
+            self._send_json(
+                429,
+                {'error': {'message': 'Rate limit exceeded', 'type': 'rate_limit'}},
+                {'Retry-After': f'{self.server.retry_after:g}'}
+            )
+            return
+
+        try:
+            if self.server.latency:
+                time.sleep(self.server.latency)
+            reply = self.server.reply(body)
+            self._send_json(200, ollama_reply(reply) if ollama else reply)
+        finally:
+            self.server.request_done()
+
+
+def start_mock_server(host: str = '127.0.0.1', port: int = 0, **options) -> MockLLMServer:
+    """
+    Start a mock server on a background thread
+
+    Args:
+        host: Interface to bind
+        port: Port to bind (0 = any free port)
+        **options: MockLLMServer options
+
+    Returns:
+        Running server; call shutdown() to stop it
+    """
+    server = MockLLMServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds per request')
+    parser.add_argument('--rate-limit-every', type=int, default=0, help='Return 429 for every N-th request')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds on 429')
+    args = parser.parse_args()
+
+    server = MockLLMServer(
+        (args.host, args.port),
+        latency=args.latency,
+        rate_limit_every=args.rate_limit_every,
+        retry_after=args.retry_after
+    )
+    print(f"Mock LLM server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Stats: {server.stats}")
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
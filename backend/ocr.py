@@ -1,120 +1,595 @@
 import os
 import pymupdf  # PyMuPDF
-import pytesseract
-from PIL import Image
 import cv2
 import numpy as np
-from langdetect import detect_langs
-import json
-from typing import Dict, List, Tuple, Optional
+import math
+import time
+import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Collection, Dict, FrozenSet, Iterator, List, Tuple, Optional
 import logging
+from ocr_cache import OCRCache, file_sha256
+from ocr_engines import OCREngine, get_engine
+from language import detect_language, segment_languages
+from metrics import observe_page
+from page_store import PAGE_STORES, PageStore, marked_text, open_page_store
+from versions import fingerprint_key, page_fingerprint
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Called as on_page(page_info, page_count) after each page is extracted
+PageCallback = Callable[[Dict, int], None]
+
+# File types the OCR pipeline can process
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.tiff', '.bmp'}
+PROCESSABLE_EXTENSIONS = {'.pdf'} | IMAGE_EXTENSIONS
+
+# Bump whenever rendering/preprocessing changes output, to invalidate cached pages
+PREPROCESS_VERSION = 2
+
+# Preprocessing profiles: steps applied to the grayscale page before Tesseract.
+# 'auto' picks one per page; see DocumentOCR._choose_profile
+PREPROCESS_PROFILES = {
+    'none': (),
+    'fast': ('otsu',),
+    'full': ('denoise', 'adaptive'),
+    'deskew': ('denoise', 'adaptive', 'deskew')
+}
+
+# Auto profile thresholds: noise sigma and 5th-95th percentile spread in gray
+# levels, skew in degrees
+NOISE_THRESHOLD = float(os.getenv("OCR_NOISE_THRESHOLD", "2.0"))
+CONTRAST_THRESHOLD = float(os.getenv("OCR_CONTRAST_THRESHOLD", "100"))
+SKEW_THRESHOLD = float(os.getenv("OCR_SKEW_THRESHOLD", "0.5"))
+
+# Page OCR modes: 'page' rasterizes whole low-text pages, 'regions' OCRs only
+# the embedded images of every page and merges them with the text layer
+OCR_MODES = ('page', 'regions')
+
+# Images smaller than this (in PDF points, either side) are ignored in 'regions' mode
+MIN_REGION_SIZE = float(os.getenv("OCR_MIN_REGION_SIZE", "36"))
+
+# Largest batch of pages handed to a worker process at once
+MAX_BATCH_PAGES = 16
+
+# PyMuPDF colorspaces accepted for page rendering
+RENDER_COLORSPACES = {
+    'gray': pymupdf.csGRAY,
+    'rgb': pymupdf.csRGB
+}
+
+
+def pixmap_to_array(pix) -> np.ndarray:
+    """
+    Wrap a PyMuPDF pixmap's samples as a numpy array without copying
+    
+    Args:
+        pix: PyMuPDF Pixmap (no alpha)
+        
+    Returns:
+        Read-only uint8 array of shape (height, width) for grayscale pixmaps or
+        (height, width, n) otherwise. The array shares memory with the pixmap.
+    """
+    samples = getattr(pix, 'samples_mv', None)
+    if samples is None:
+        samples = pix.samples
+    img = np.frombuffer(samples, dtype=np.uint8).reshape(pix.height, pix.stride)
+    img = img[:, :pix.width * pix.n]
+    if pix.n == 1:
+        return img
+    return img.reshape(pix.height, pix.width, pix.n)
+
+
 class DocumentOCR:
-    def __init__(self, tesseract_langs='mal+eng'):
+    def __init__(self, tesseract_langs='mal+eng', workers: Optional[int] = None,
+                 dpi: Optional[int] = None, colorspace: Optional[str] = None,
+                 cache: Optional[OCRCache] = None, preprocess: Optional[str] = None,
+                 ocr_mode: Optional[str] = None, engine: Optional[str] = None,
+                 language_segments: Optional[bool] = None, page_store: Optional[str] = None):
         """
         Initialize OCR service
         Args:
             tesseract_langs: Languages for Tesseract OCR (default: Malayalam + English)
+            workers: Number of worker processes for PDF pages (default: OCR_WORKERS env var,
+                1 = serial, 0 = one per CPU)
+            dpi: Render resolution for OCR'd PDF pages (default: OCR_DPI env var or 300).
+                ~200 is enough for large clean fonts, use 300+ for small print
+            colorspace: Render colorspace for OCR'd PDF pages, 'gray' or 'rgb'
+                (default: OCR_COLORSPACE env var or 'gray')
+            cache: Page result cache (default: built from OCR_CACHE_DIR, disabled if unset)
+            preprocess: Preprocessing profile name from PREPROCESS_PROFILES, or 'auto'
+                to pick one per page (default: OCR_PREPROCESS env var or 'auto')
+            ocr_mode: 'page' to OCR whole low-text pages, or 'regions' to OCR only
+                embedded image regions merged with the text layer
+                (default: OCR_MODE env var or 'page')
+            engine: OCR backend, 'tesserocr' (persistent, in-memory), 'pytesseract'
+                (subprocess per image) or 'auto' (default: OCR_ENGINE env var or 'auto')
+            language_segments: Tag runs of lines with their script language in each
+                page's 'segments' (default: OCR_LANGUAGE_SEGMENTS env var or off)
+            page_store: How pages are written, 'jsonl' (one pages.jsonl per document)
+                or 'files' (page_N.txt + page_N_meta.json) (default: OCR_PAGE_STORE
+                env var or 'jsonl')
         """
         self.tesseract_langs = tesseract_langs
+        if workers is None:
+            workers = int(os.getenv("OCR_WORKERS", "1"))
+        self.workers = workers or os.cpu_count() or 1
+        self.dpi = dpi or int(os.getenv("OCR_DPI", "300"))
+        self.colorspace = (colorspace or os.getenv("OCR_COLORSPACE", "gray")).lower()
+        if self.colorspace not in RENDER_COLORSPACES:
+            raise ValueError(f"Unsupported colorspace: {self.colorspace}")
+        self.cache = cache or OCRCache.from_env()
+        self.preprocess = (preprocess or os.getenv("OCR_PREPROCESS", "auto")).lower()
+        if self.preprocess != 'auto' and self.preprocess not in PREPROCESS_PROFILES:
+            raise ValueError(f"Unsupported preprocessing profile: {self.preprocess}")
+        self.ocr_mode = (ocr_mode or os.getenv("OCR_MODE", "page")).lower()
+        if self.ocr_mode not in OCR_MODES:
+            raise ValueError(f"Unsupported OCR mode: {self.ocr_mode}")
+        self.engine_name = (engine or os.getenv("OCR_ENGINE", "auto")).lower()
+        if language_segments is None:
+            language_segments = os.getenv("OCR_LANGUAGE_SEGMENTS", "0").lower() in ('1', 'true', 'yes')
+        self.language_segments = language_segments
+        self.page_store = (page_store or os.getenv("OCR_PAGE_STORE", "jsonl")).lower()
+        if self.page_store not in PAGE_STORES:
+            raise ValueError(f"Unsupported page store: {self.page_store}")
+        self._engine: Optional[OCREngine] = None
+    
+    @property
+    def engine(self) -> OCREngine:
+        """
+        OCR backend, created on first use and shared per process
+        """
+        if self._engine is None:
+            self._engine = get_engine(self.engine_name, self.tesseract_langs)
+        return self._engine
         
-    def extract_text_from_pdf(self, pdf_path: str, output_dir: str) -> Dict[int, Dict]:
+    def extract_text_from_pdf(self, pdf_path: str, output_dir: str,
+                              file_hash: Optional[str] = None,
+                              on_page: Optional[PageCallback] = None,
+                              fingerprint: bool = False,
+                              previous_pages: Optional[List[Dict]] = None) -> Dict[int, Dict]:
         """
         Extract text from PDF using PyMuPDF first, fall back to OCR for low-text pages
         
+        Collects iter_pdf_pages into a dictionary; use that directly to keep
+        memory flat on very long documents.
+        
         Args:
             pdf_path: Path to PDF file
             output_dir: Directory to save extracted page texts
+            file_hash: SHA-256 of the file, if already known (used for cache keys)
+            on_page: Callback invoked with (page_info, page_count) as each page is saved
+            fingerprint: Add a 'fingerprint' to every page (see versions.page_fingerprint)
+            previous_pages: Page records of the previous version of this document;
+                pages with the same fingerprint reuse their text instead of being
+                extracted again (implies fingerprint)
             
         Returns:
             Dictionary with page numbers as keys and page info as values
         """
-        page_texts = {}
+        return {
+            page_info['page_num']: page_info
+            for page_info in self.iter_pdf_pages(pdf_path, output_dir, file_hash, on_page,
+                                                 fingerprint, previous_pages)
+        }
+    
+    def iter_pdf_pages(self, pdf_path: str, output_dir: str,
+                       file_hash: Optional[str] = None,
+                       on_page: Optional[PageCallback] = None,
+                       fingerprint: bool = False,
+                       previous_pages: Optional[List[Dict]] = None) -> Iterator[Dict]:
+        """
+        Extract a PDF page by page, yielding each page in page order as soon as
+        it is saved. Nothing is kept after a page is yielded, and page workers
+        only run a bounded number of batches ahead of the consumer, so memory
+        stays flat however long the document is.
+        
+        Args: see extract_text_from_pdf
+            
+        Returns:
+            Iterator of page info dictionaries
+        """
+        store = None
+        doc = None
         
         try:
             # Open PDF with PyMuPDF
             doc = pymupdf.open(pdf_path)
+            page_count = len(doc)
+            if self.cache and not file_hash:
+                file_hash = file_sha256(pdf_path)
             
-            for page_num, page in enumerate(doc, 1):
-                logger.info(f"Processing page {page_num}/{len(doc)}")
-                
-                # First try to extract text directly
-                text = page.get_text()
-                
-                # Check if page has meaningful text (threshold: 50 characters)
-                if len(text.strip()) < 50:
-                    logger.info(f"Page {page_num} has low text content, running OCR...")
-                    text = self._ocr_pdf_page(page, page_num)
-                
-                # Detect language
-                language = self._detect_language(text)
-                
-                # Add page marker
-                marked_text = f"[p{page_num}]\n{text}"
-                
-                page_info = {
-                    'page_num': page_num,
-                    'text': text,
-                    'marked_text': marked_text,
-                    'language': language,
-                    'method': 'ocr' if len(text.strip()) < 50 else 'direct'
-                }
-                
-                page_texts[page_num] = page_info
+            # Fingerprints are computed page by page, in the workers, as pages are loaded
+            fingerprint = fingerprint or previous_pages is not None
+            reusable = {fingerprint_key(p.get('fingerprint')): p for p in previous_pages or []}
+            reusable.pop(None, None)
+            
+            page_nums = list(range(1, page_count + 1))
+            workers = min(self.workers, page_count)
+            if workers > 1:
+                # Workers open the PDF themselves, so release our handle first
+                doc.close()
+                extracted = self._extract_pages_parallel(pdf_path, page_nums, workers, file_hash,
+                                                         fingerprint, frozenset(reusable))
+            else:
+                extracted = (
+                    self._process_page(doc, page_num, page_count, file_hash, fingerprint, reusable)
+                    for page_num in page_nums
+                )
+            
+            store = open_page_store(self.page_store, output_dir)
+            reused = 0
+            for page_info in extracted:
+                if 'reuse' in page_info:
+                    page_info = self._reused_page(page_info, reusable[page_info['reuse']])
+                    reused += 1
                 
                 # Save individual page text
-                self._save_page_text(output_dir, page_num, page_info)
+                self._save_page(store, page_info)
+                observe_page(page_info)
                 
-            doc.close()
+                if on_page:
+                    on_page(page_info, page_count)
+                yield page_info
+            
+            if previous_pages is not None:
+                logger.info(f"Reused {reused}/{page_count} pages from the previous version")
+            if self.cache:
+                try:
+                    logger.info(f"OCR cache stats: {self.cache.stats()}")
+                except sqlite3.Error as e:
+                    logger.warning(f"Cache stats failed ({self.cache.DB_NAME}): {str(e)}")
             
         except Exception as e:
             logger.error(f"Error processing PDF: {str(e)}")
             raise
+        finally:
+            # Keep whatever pages were written, with their index
+            if store:
+                store.close()
+            if doc is not None and not doc.is_closed:
+                doc.close()
+    
+    def _reused_page(self, stub: Dict, record: Dict) -> Dict:
+        """
+        Page info for a page whose fingerprint matched a page of the previous
+        version, built from that page's record instead of extracting it again
+        """
+        page_info = self._page_info(stub['page_num'], record['text'], record['language'], record['method'],
+                                    stub['timings'], cached=True, preprocess=record.get('preprocess'),
+                                    ocr_regions=record.get('ocr_regions'))
+        page_info['fingerprint'] = stub['fingerprint']
+        page_info['reused_from'] = record['page_num']
+        return page_info
+    
+    def _process_page(self, doc, page_num: int, page_count: int,
+                      file_hash: Optional[str] = None, fingerprint: bool = False,
+                      reusable: Optional[Collection[str]] = None) -> Dict:
+        """
+        Extract text from a single PDF page, falling back to OCR for low-text pages
+        
+        Args:
+            doc: Open PyMuPDF document
+            page_num: Page number (1-based)
+            page_count: Total number of pages in the document
+            file_hash: SHA-256 of the file (required for caching)
+            fingerprint: Add the page's 'fingerprint' (see versions.page_fingerprint)
+            reusable: Fingerprint keys of the previous version's pages; a
+                matching page is not extracted (implies fingerprint)
+            
+        Returns:
+            Page info dictionary, or for a page matching `reusable` just its
+            'page_num', 'fingerprint', 'timings' and 'reuse' (the matching key)
+        """
+        logger.info(f"Processing page {page_num}/{page_count}")
+        start = time.perf_counter()
+        timings = {}
+        
+        # Cache hits skip loading, rendering and OCR altogether (unless the
+        # entry predates fingerprints and one is needed)
+        cache_key = self._cache_key(file_hash, page_num)
+        cached = self.cache.get(cache_key) if cache_key else None
+        page = None
+        text = None
+        page_fp = None
+        if fingerprint or reusable:
+            page_fp = cached.get('fingerprint') if cached is not None else None
+            if page_fp is None:
+                page = doc[page_num - 1]
+                text = page.get_text()
+                page_fp = page_fingerprint(page, text)
+                timings['fingerprint_ms'] = _elapsed_ms(start)
+            key = fingerprint_key(page_fp)
+            if reusable and key in reusable:
+                timings['total_ms'] = _elapsed_ms(start)
+                return {'page_num': page_num, 'fingerprint': page_fp, 'timings': timings, 'reuse': key}
+        
+        if cached is not None:
+            timings['total_ms'] = _elapsed_ms(start)
+            page_info = self._page_info(page_num, cached['text'], cached['language'], cached['method'],
+                                        timings, cached=True, preprocess=cached.get('preprocess'),
+                                        ocr_regions=cached.get('ocr_regions'))
+            if page_fp is not None:
+                page_info['fingerprint'] = page_fp
+            return page_info
+        
+        if page is None:
+            page = doc[page_num - 1]
+            # First try to extract text directly
+            text = page.get_text()
+        timings['text_layer_ms'] = _elapsed_ms(start)
+        
+        profile = None
+        regions = None
+        if self.ocr_mode == 'regions':
+            step = time.perf_counter()
+            text, method, profile, regions = self._extract_with_regions(page, page_num, text, timings)
+            if method != 'direct':
+                timings['ocr_ms'] = _elapsed_ms(step)
+        else:
+            # Check if page has meaningful text (threshold: 50 characters)
+            method = 'direct'
+            if len(text.strip()) < 50:
+                logger.info(f"Page {page_num} has low text content, running OCR...")
+                step = time.perf_counter()
+                text, profile = self._ocr_pdf_page(page, page_num, timings=timings)
+                timings['ocr_ms'] = _elapsed_ms(step)
+                method = 'ocr'
+        
+        # Detect language
+        step = time.perf_counter()
+        language = self._detect_language(text)
+        timings['language_ms'] = _elapsed_ms(step)
+        
+        # Don't cache empty OCR output, it is usually a transient OCR failure
+        if cache_key and text.strip():
+            self.cache.put(cache_key, {'text': text, 'language': language, 'method': method,
+                                       'preprocess': profile, 'ocr_regions': regions,
+                                       'fingerprint': page_fp})
+        
+        timings['total_ms'] = _elapsed_ms(start)
+        page_info = self._page_info(page_num, text, language, method, timings,
+                                    preprocess=profile, ocr_regions=regions)
+        if page_fp is not None:
+            page_info['fingerprint'] = page_fp
+        return page_info
+    
+    def _extract_with_regions(self, page, page_num: int, text_layer: str,
+                              timings: Optional[Dict[str, float]] = None) -> Tuple[str, str, Optional[str], int]:
+        """
+        OCR only the embedded image regions of a page and merge the results
+        with the native text layer in reading order (top-to-bottom, left-to-right)
+        
+        Images that already have a meaningful amount of text-layer text on top
+        of them (e.g. full-page backgrounds of digital PDFs) are skipped. Pages
+        with neither usable text nor images fall back to whole-page OCR.
+        
+        Args:
+            page: PyMuPDF page object
+            page_num: Page number
+            text_layer: Text extracted from the page's text layer
+            timings: Dictionary that render/preprocess/OCR times are added to
+            
+        Returns:
+            Tuple of (text, method, preprocessing profile(s), number of OCR'd regions)
+            where method is 'direct', 'hybrid' or 'ocr'
+        """
+        blocks = [b for b in page.get_text("blocks") if b[6] == 0 and b[4].strip()]
+        regions = self._image_regions(page, blocks)
+        
+        if not regions:
+            if len(text_layer.strip()) >= 50:
+                return text_layer, 'direct', None, 0
+            logger.info(f"Page {page_num} has low text content and no images, running OCR...")
+            text, profile = self._ocr_pdf_page(page, page_num, timings=timings)
+            return text, 'ocr', profile, 0
+        
+        logger.info(f"Page {page_num}: running OCR on {len(regions)} image region(s)")
+        items = [(b[1], b[0], b[4]) for b in blocks]
+        profiles = []
+        for rect in regions:
+            region_text, profile = self._ocr_pdf_page(page, page_num, clip=rect, timings=timings)
+            if region_text.strip():
+                items.append((rect.y0, rect.x0, region_text))
+            if profile and profile not in profiles:
+                profiles.append(profile)
+        
+        items.sort(key=lambda item: (item[0], item[1]))
+        text = "\n".join(item[2].strip("\n") for item in items) + "\n"
+        method = 'hybrid' if blocks else 'ocr'
+        return text, method, ",".join(profiles) or None, len(regions)
+    
+    @staticmethod
+    def _image_regions(page, blocks: List[Tuple]) -> List:
+        """
+        Bounding boxes of the page's images worth OCR'ing, overlapping ones merged
+        
+        Args:
+            page: PyMuPDF page object
+            blocks: Text blocks from page.get_text("blocks")
             
-        return page_texts
+        Returns:
+            List of PyMuPDF Rects
+        """
+        rects = []
+        for info in page.get_image_info():
+            rect = pymupdf.Rect(info['bbox']) & page.rect
+            if rect.is_empty or rect.width < MIN_REGION_SIZE or rect.height < MIN_REGION_SIZE:
+                continue
+            covered = sum(len(b[4].strip()) for b in blocks if rect.contains(pymupdf.Rect(b[:4])))
+            if covered >= 50:
+                continue
+            rects.append(rect)
+        
+        # Merge overlapping rects so no pixels are OCR'd twice
+        merged = []
+        for rect in sorted(rects, key=lambda r: (r.y0, r.x0)):
+            for index, other in enumerate(merged):
+                if other.intersects(rect):
+                    merged[index] = other | rect
+                    break
+            else:
+                merged.append(pymupdf.Rect(rect))
+        return merged
+    
+    def _page_info(self, page_num: int, text: str, language: str, method: str,
+                   timings: Optional[Dict[str, float]] = None, cached: bool = False,
+                   preprocess: Optional[str] = None, ocr_regions: Optional[int] = None) -> Dict:
+        """
+        Build the page info dictionary returned for every page
+        """
+        page_info = {
+            'page_num': page_num,
+            'text': text,
+            'language': language,
+            'method': method,
+            'preprocess': preprocess,
+            'ocr_regions': ocr_regions,
+            'timings': timings or {},
+            'cached': cached
+        }
+        if self.language_segments:
+            page_info['segments'] = segment_languages(text)
+        return page_info
+    
+    def _cache_key(self, file_hash: Optional[str], page_num: int) -> Optional[str]:
+        """
+        Cache key for a page under the current settings, or None if caching is off
+        """
+        if not self.cache or not file_hash:
+            return None
+        return OCRCache.make_key(
+            file_hash, page_num,
+            langs=self.tesseract_langs,
+            dpi=self.dpi,
+            colorspace=self.colorspace,
+            profile=self.preprocess,
+            mode=self.ocr_mode,
+            preprocess=PREPROCESS_VERSION
+        )
     
-    def extract_text_from_image(self, image_path: str, output_dir: str) -> Dict[int, Dict]:
+    def _extract_pages_parallel(self, pdf_path: str, page_nums: List[int], workers: int,
+                                file_hash: Optional[str] = None, fingerprint: bool = False,
+                                reusable: FrozenSet[str] = frozenset()) -> Iterator[Dict]:
+        """
+        Process PDF pages on a pool of worker processes
+        
+        Pages are split into consecutive batches (several per worker so that slow
+        scanned pages don't leave the other workers idle, at most
+        MAX_BATCH_PAGES each). Each worker opens the PDF on its own; batches
+        are yielded back in page order, and only a couple of batches per
+        worker are submitted ahead of the one being consumed.
+        
+        Args:
+            pdf_path: Path to PDF file
+            page_nums: Page numbers (1-based, ascending) to process
+            workers: Number of worker processes
+            file_hash: SHA-256 of the file (used for cache keys)
+            fingerprint, reusable: see _process_page
+            
+        Returns:
+            Iterator of page info dictionaries in page order
+        """
+        batch_size = max(1, min(MAX_BATCH_PAGES, math.ceil(len(page_nums) / (workers * 4))))
+        batches = [page_nums[start:start + batch_size] for start in range(0, len(page_nums), batch_size)]
+        logger.info(f"Processing {len(page_nums)} pages on {workers} workers in {len(batches)} batches")
+        
+        config = self._worker_config()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for batch in batches:
+                pending.append(executor.submit(_extract_page_batch, config, pdf_path, batch, file_hash,
+                                               fingerprint, reusable))
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+    
+    def _worker_config(self) -> Dict:
+        """
+        Constructor arguments used to rebuild this service inside a worker process
+        """
+        return {
+            'tesseract_langs': self.tesseract_langs,
+            'workers': 1,
+            'dpi': self.dpi,
+            'colorspace': self.colorspace,
+            'cache': self.cache,
+            'preprocess': self.preprocess,
+            'ocr_mode': self.ocr_mode,
+            'engine': self.engine_name,
+            'language_segments': self.language_segments
+        }
+    
+    def extract_text_from_image(self, image_path: str, output_dir: str,
+                                file_hash: Optional[str] = None,
+                                on_page: Optional[PageCallback] = None) -> Dict[int, Dict]:
         """
         Extract text from image file using OCR
         
         Args:
             image_path: Path to image file
             output_dir: Directory to save extracted text
+            file_hash: SHA-256 of the file, if already known (used for cache keys)
+            on_page: Callback invoked with (page_info, 1) once the page is saved
             
         Returns:
             Dictionary with single page (page 1)
         """
         try:
+            start = time.perf_counter()
+            if self.cache and not file_hash:
+                file_hash = file_sha256(image_path)
+            cache_key = self._cache_key(file_hash, 1)
+            cached = self.cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                page_info = self._page_info(1, cached['text'], cached['language'], 'ocr',
+                                            {'total_ms': _elapsed_ms(start)}, cached=True,
+                                            preprocess=cached.get('preprocess'))
+                with open_page_store(self.page_store, output_dir) as store:
+                    self._save_page(store, page_info)
+                observe_page(page_info)
+                if on_page:
+                    on_page(page_info, 1)
+                return {1: page_info}
+            
             # Read and preprocess image
+            timings = {}
+            step = time.perf_counter()
             image = cv2.imread(image_path)
-            processed_image = self._preprocess_image(image)
-            
-            # Convert to PIL Image for Tesseract
-            pil_image = Image.fromarray(processed_image)
+            _add_ms(timings, 'render_ms', step)
+            step = time.perf_counter()
+            processed_image, profile = self._prepare_for_ocr(image)
+            _add_ms(timings, 'preprocess_ms', step)
             
             # Run OCR
-            text = pytesseract.image_to_string(pil_image, lang=self.tesseract_langs)
+            step = time.perf_counter()
+            text = self.engine.image_to_string(processed_image)
+            _add_ms(timings, 'tesseract_ms', step)
+            timings['ocr_ms'] = _elapsed_ms(start)
             
             # Detect language
+            step = time.perf_counter()
             language = self._detect_language(text)
+            timings['language_ms'] = _elapsed_ms(step)
+            timings['total_ms'] = _elapsed_ms(start)
             
-            # Add page marker
-            marked_text = f"[p1]\n{text}"
+            if cache_key and text.strip():
+                self.cache.put(cache_key, {'text': text, 'language': language, 'method': 'ocr',
+                                           'preprocess': profile})
             
-            page_info = {
-                'page_num': 1,
-                'text': text,
-                'marked_text': marked_text,
-                'language': language,
-                'method': 'ocr'
-            }
+            page_info = self._page_info(1, text, language, 'ocr', timings, preprocess=profile)
             
             # Save page text
-            self._save_page_text(output_dir, 1, page_info)
+            with open_page_store(self.page_store, output_dir) as store:
+                self._save_page(store, page_info)
+            observe_page(page_info)
+            
+            if on_page:
+                on_page(page_info, 1)
             
             return {1: page_info}
             
@@ -122,140 +597,178 @@ class DocumentOCR:
             logger.error(f"Error processing image: {str(e)}")
             raise
     
-    def _ocr_pdf_page(self, page, page_num: int) -> str:
+    def _ocr_pdf_page(self, page, page_num: int, dpi: Optional[int] = None, clip=None,
+                      timings: Optional[Dict[str, float]] = None) -> Tuple[str, Optional[str]]:
         """
         Convert PDF page to image and run OCR
         
         Args:
             page: PyMuPDF page object
             page_num: Page number
+            dpi: Render resolution override for this page
+            clip: PyMuPDF Rect to render instead of the whole page
+            timings: Dictionary that render/preprocess/OCR times are added to
             
         Returns:
-            Extracted text
+            Tuple of (extracted text, preprocessing profile used)
         """
+        timings = timings if timings is not None else {}
         try:
-            # Convert page to image (high resolution for better OCR)
-            mat = pymupdf.Matrix(300/72, 300/72)  # 300 DPI
-            pix = page.get_pixmap(matrix=mat)
-            
-            # Convert to numpy array
-            img_data = pix.tobytes("png")
-            nparr = np.frombuffer(img_data, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            # Render page straight into a numpy array (no PNG round trip).
+            # `pix` must stay alive while `img` is in use, `img` views its buffer.
+            step = time.perf_counter()
+            pix = self._render_page(page, dpi, clip)
+            img = pixmap_to_array(pix)
+            _add_ms(timings, 'render_ms', step)
             
             # Preprocess image
-            processed_img = self._preprocess_image(img)
-            
-            # Convert to PIL Image
-            pil_image = Image.fromarray(processed_img)
+            step = time.perf_counter()
+            processed_img, profile = self._prepare_for_ocr(img, rgb=True)
+            _add_ms(timings, 'preprocess_ms', step)
             
             # Run OCR
-            text = pytesseract.image_to_string(pil_image, lang=self.tesseract_langs)
+            step = time.perf_counter()
+            text = self.engine.image_to_string(processed_img)
+            _add_ms(timings, 'tesseract_ms', step)
             
-            return text
+            return text, profile
             
         except Exception as e:
             logger.error(f"Error in OCR for page {page_num}: {str(e)}")
-            return ""
+            return "", None
+    
+    def _render_page(self, page, dpi: Optional[int] = None, clip=None):
+        """
+        Render PDF page (or a region of it) to a pixmap in the configured colorspace
+        
+        Args:
+            page: PyMuPDF page object
+            dpi: Render resolution override (default: self.dpi)
+            clip: PyMuPDF Rect limiting the rendered area
+            
+        Returns:
+            PyMuPDF Pixmap without alpha channel
+        """
+        zoom = (dpi or self.dpi) / 72
+        colorspace = RENDER_COLORSPACES[self.colorspace]
+        return page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), colorspace=colorspace,
+                               alpha=False, clip=clip)
     
-    def _preprocess_image(self, image: np.ndarray) -> np.ndarray:
+    def _prepare_for_ocr(self, image: np.ndarray, rgb: bool = False) -> Tuple[np.ndarray, str]:
         """
-        Preprocess image for better OCR accuracy
+        Preprocess an image with the configured profile, or with a per-image
+        profile picked from its noise, contrast and skew when set to 'auto'
         
         Args:
             image: Input image as numpy array
+            rgb: Whether a 3-channel image is in RGB (rather than OpenCV's BGR) order
             
         Returns:
-            Preprocessed image
+            Tuple of (preprocessed image, name of the profile used)
         """
-        # Convert to grayscale
-        if len(image.shape) == 3:
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        gray = _to_gray(image, rgb)
+        angle = None
+        if self.preprocess == 'auto':
+            profile, angle = self._choose_profile(gray)
         else:
-            gray = image
+            profile = self.preprocess
+        return self._apply_profile(gray, profile, angle), profile
+    
+    def _apply_profile(self, gray: np.ndarray, profile: str, angle: Optional[float] = None) -> np.ndarray:
+        """
+        Run the steps of a preprocessing profile on a grayscale image
+        
+        Args:
+            gray: Grayscale image
+            profile: Profile name, optionally suffixed with '+deskew'
+            angle: Skew angle in degrees if already estimated
+            
+        Returns:
+            Preprocessed image
+        """
+        base, _, suffix = profile.partition('+')
+        steps = PREPROCESS_PROFILES[base] + ((suffix,) if suffix else ())
+        img = gray
+        for step in steps:
+            if step == 'denoise':
+                img = cv2.fastNlMeansDenoising(img)
+            elif step == 'adaptive':
+                # Adaptive thresholding for uneven lighting
+                img = cv2.adaptiveThreshold(
+                    img, 255,
+                    cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                    cv2.THRESH_BINARY, 11, 2
+                )
+            elif step == 'otsu':
+                _, img = cv2.threshold(img, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+            elif step == 'deskew':
+                if angle is None:
+                    angle = _estimate_skew(_downscale(img))
+                if abs(angle) >= SKEW_THRESHOLD:
+                    img = _rotate(img, angle)
+        return img
+    
+    def _choose_profile(self, gray: np.ndarray) -> Tuple[str, float]:
+        """
+        Pick a preprocessing profile from cheap statistics on a downscaled copy
         
-        # Apply denoising
-        denoised = cv2.fastNlMeansDenoising(gray)
+        Clean, high-contrast renders go straight to Tesseract ('none'),
+        low-contrast clean pages get a global Otsu threshold ('fast') and only
+        noisy scans pay for denoising ('full'). '+deskew' is added when the
+        page is visibly rotated.
         
-        # Apply adaptive thresholding for better text extraction
-        thresh = cv2.adaptiveThreshold(
-            denoised, 255, 
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY, 11, 2
-        )
+        Args:
+            gray: Grayscale image
+            
+        Returns:
+            Tuple of (profile name, estimated skew angle in degrees)
+        """
+        small = _downscale(gray)
+        noise = _estimate_noise(small)
+        low, high = np.percentile(small, (5, 95))
+        
+        if noise >= NOISE_THRESHOLD:
+            profile = 'full'
+        elif high - low < CONTRAST_THRESHOLD:
+            profile = 'fast'
+        else:
+            profile = 'none'
         
-        # Deskew if needed (optional, can add if performance allows)
-        # angle = self._get_skew_angle(thresh)
-        # if abs(angle) > 0.5:
-        #     thresh = self._rotate_image(thresh, angle)
+        _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        angle = _estimate_skew(binary)
+        if abs(angle) >= SKEW_THRESHOLD:
+            profile += '+deskew'
         
-        return thresh
+        logger.debug(f"Preprocess profile {profile} (noise={noise:.2f}, contrast={high - low:.0f}, skew={angle:.1f})")
+        return profile, angle
     
     def _detect_language(self, text: str) -> str:
         """
-        Detect primary language of text
+        Detect primary language of text from its Unicode scripts, falling
+        back to langdetect for ambiguous pages (see language.detect_language)
         
         Args:
             text: Input text
             
         Returns:
-            Language code ('en', 'ml', or 'mixed')
+            Language code ('en', 'ml', 'mixed' or 'unknown')
         """
-        if not text or len(text.strip()) < 10:
-            return 'unknown'
-        
-        try:
-            langs = detect_langs(text)
-            
-            # Get top language
-            if langs:
-                primary_lang = langs[0]
-                
-                # Check if Malayalam
-                if primary_lang.lang == 'ml' and primary_lang.prob > 0.7:
-                    return 'ml'
-                # Check if English
-                elif primary_lang.lang == 'en' and primary_lang.prob > 0.7:
-                    return 'en'
-                # Mixed content
-                else:
-                    return 'mixed'
-            
-            return 'unknown'
-            
-        except Exception as e:
-            logger.warning(f"Language detection failed: {str(e)}")
-            return 'unknown'
+        return detect_language(text)
     
-    def _save_page_text(self, output_dir: str, page_num: int, page_info: Dict):
+    def _save_page(self, store: PageStore, page_info: Dict):
         """
-        Save page text and metadata to file
+        Save page text and metadata, recording the write time in its timings
         
         Args:
-            output_dir: Output directory
-            page_num: Page number
+            store: Open page store of the document
             page_info: Page information dictionary
         """
-        os.makedirs(output_dir, exist_ok=True)
-        
-        # Save text file
-        text_path = os.path.join(output_dir, f"page_{page_num}.txt")
-        with open(text_path, 'w', encoding='utf-8') as f:
-            f.write(page_info['marked_text'])
-        
-        # Save metadata
-        meta_path = os.path.join(output_dir, f"page_{page_num}_meta.json")
-        meta_info = {
-            'page_num': page_info['page_num'],
-            'language': page_info['language'],
-            'method': page_info['method'],
-            'char_count': len(page_info['text'])
-        }
-        
-        with open(meta_path, 'w', encoding='utf-8') as f:
-            json.dump(meta_info, f, indent=2)
+        step = time.perf_counter()
+        store.write_page(page_info)
+        page_info['timings']['save_ms'] = _elapsed_ms(step)
     
-    def combine_page_texts(self, page_texts: Dict[int, Dict]) -> str:
+    @staticmethod
+    def combine_page_texts(page_texts: Dict[int, Dict]) -> str:
         """
         Combine all page texts into single document with page markers
         
@@ -265,14 +778,9 @@ class DocumentOCR:
         Returns:
             Combined text with page markers
         """
-        combined_text = ""
-        
-        for page_num in sorted(page_texts.keys()):
-            if combined_text:
-                combined_text += "\n\n"
-            combined_text += page_texts[page_num]['marked_text']
-        
-        return combined_text
+        return "\n\n".join(
+            marked_text(page_num, page_texts[page_num]['text']) for page_num in sorted(page_texts)
+        )
     
     def get_page_languages(self, page_texts: Dict[int, Dict]) -> Dict[str, List[int]]:
         """
@@ -295,8 +803,137 @@ class DocumentOCR:
         return lang_distribution
 
 
+def _to_gray(image: np.ndarray, rgb: bool = False) -> np.ndarray:
+    """Convert to grayscale (rendered PDF pages are RGB, cv2.imread gives BGR)"""
+    if len(image.shape) == 3:
+        return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY if rgb else cv2.COLOR_BGR2GRAY)
+    return image
+
+
+def _downscale(gray: np.ndarray, max_side: int = 1000) -> np.ndarray:
+    """
+    Nearest-neighbour subsample so the longest side is at most `max_side`
+    (unlike area averaging this keeps per-pixel noise intact)
+    """
+    scale = max_side / max(gray.shape[:2])
+    if scale >= 1:
+        return gray
+    return cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_NEAREST)
+
+
+def _estimate_noise(gray: np.ndarray) -> float:
+    """
+    Robust noise sigma estimate: median absolute Laplacian-of-Laplacian response
+    (text edges are sparse, so they barely move the median)
+    """
+    kernel = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+    response = cv2.filter2D(gray.astype(np.float32), -1, kernel)[1:-1, 1:-1]
+    return float(1.4826 * np.median(np.abs(response)) / 6)
+
+
+def _estimate_skew(binary: np.ndarray, max_angle: float = 5.0, step: float = 0.5) -> float:
+    """
+    Estimate text skew in degrees with a projection-profile search: text lines
+    line up with pixel rows (giving the most uneven row sums) at the right angle
+    """
+    ink = 255 - binary  # text as foreground, rotation fills borders with 0
+    h, w = ink.shape[:2]
+    center = (w / 2, h / 2)
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-max_angle, max_angle + step / 2, step):
+        matrix = cv2.getRotationMatrix2D(center, float(angle), 1.0)
+        rotated = cv2.warpAffine(ink, matrix, (w, h), flags=cv2.INTER_NEAREST)
+        score = float(np.var(rotated.sum(axis=1, dtype=np.float64)))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def _rotate(image: np.ndarray, angle: float) -> np.ndarray:
+    """Rotate around the centre, filling exposed borders with white"""
+    h, w = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(image, matrix, (w, h), flags=cv2.INTER_LINEAR,
+                          borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+
+
+def _elapsed_ms(start: float) -> float:
+    """Milliseconds since a time.perf_counter() reading"""
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def _add_ms(timings: Dict[str, float], key: str, start: float):
+    """Add the milliseconds since `start` to a timing (stages can run several times per page)"""
+    timings[key] = round(timings.get(key, 0.0) + (time.perf_counter() - start) * 1000, 2)
+
+
+def _extract_page_batch(config: Dict, pdf_path: str, page_nums: List[int],
+                        file_hash: Optional[str] = None, fingerprint: bool = False,
+                        reusable: FrozenSet[str] = frozenset()) -> List[Dict]:
+    """
+    Worker entry point: open the PDF and process the given pages
+    
+    Args:
+        config: DocumentOCR constructor arguments
+        pdf_path: Path to PDF file
+        page_nums: Page numbers (1-based)
+        file_hash: SHA-256 of the file (used for cache keys)
+        fingerprint, reusable: see DocumentOCR._process_page
+        
+    Returns:
+        List of page info dictionaries in page order
+    """
+    ocr = DocumentOCR(**config)
+    doc = pymupdf.open(pdf_path)
+    try:
+        page_count = len(doc)
+        return [
+            ocr._process_page(doc, page_num, page_count, file_hash, fingerprint, reusable)
+            for page_num in page_nums
+        ]
+    finally:
+        doc.close()
+        # Write the batch's cache reads before the worker moves on
+        if ocr.cache:
+            ocr.cache.close()
+
+
 # Convenience functions for direct use
-def extract_document_text(file_path: str, output_dir: str, tesseract_langs='mal+eng') -> Tuple[Dict[int, Dict], str]:
+def iter_document_pages(file_path: str, output_dir: str, tesseract_langs='mal+eng',
+                        workers: Optional[int] = None, dpi: Optional[int] = None,
+                        file_hash: Optional[str] = None,
+                        on_page: Optional[PageCallback] = None,
+                        ocr_mode: Optional[str] = None, fingerprint: bool = False,
+                        previous_pages: Optional[List[Dict]] = None) -> Iterator[Dict]:
+    """
+    Extract a document (PDF or image) page by page, in page order, without
+    keeping earlier pages (see DocumentOCR.iter_pdf_pages)
+    
+    Args: see extract_document_text
+        
+    Returns:
+        Iterator of page info dictionaries
+    """
+    ocr = DocumentOCR(tesseract_langs=tesseract_langs, workers=workers, dpi=dpi, ocr_mode=ocr_mode)
+    
+    # Check file type
+    file_ext = os.path.splitext(file_path)[1].lower()
+    
+    if file_ext == '.pdf':
+        return ocr.iter_pdf_pages(file_path, output_dir, file_hash=file_hash, on_page=on_page,
+                                  fingerprint=fingerprint, previous_pages=previous_pages)
+    if file_ext in IMAGE_EXTENSIONS:
+        return iter(ocr.extract_text_from_image(file_path, output_dir, file_hash=file_hash,
+                                                on_page=on_page).values())
+    raise ValueError(f"Unsupported file type: {file_ext}")
+
+
+def extract_document_text(file_path: str, output_dir: str, tesseract_langs='mal+eng',
+                          workers: Optional[int] = None, dpi: Optional[int] = None,
+                          file_hash: Optional[str] = None,
+                          on_page: Optional[PageCallback] = None,
+                          ocr_mode: Optional[str] = None, fingerprint: bool = False,
+                          previous_pages: Optional[List[Dict]] = None) -> Tuple[Dict[int, Dict], str]:
     """
     Extract text from document (PDF or image)
     
@@ -304,23 +941,25 @@ def extract_document_text(file_path: str, output_dir: str, tesseract_langs='mal+
         file_path: Path to document
         output_dir: Directory to save outputs
         tesseract_langs: Languages for Tesseract
+        workers: Number of worker processes for PDF pages (None = OCR_WORKERS env var)
+        dpi: Render resolution for OCR'd PDF pages (None = OCR_DPI env var or 300)
+        file_hash: SHA-256 of the file, if already known (used for cache keys)
+        on_page: Callback invoked with (page_info, page_count) as each page is saved
+        ocr_mode: 'page' or 'regions' (None = OCR_MODE env var or 'page')
+        fingerprint: Fingerprint PDF pages (see DocumentOCR.extract_text_from_pdf)
+        previous_pages: Page records of the previous version, reused for
+            unchanged PDF pages
         
     Returns:
         Tuple of (page_texts dictionary, combined_text)
     """
-    ocr = DocumentOCR(tesseract_langs=tesseract_langs)
-    
-    # Check file type
-    file_ext = os.path.splitext(file_path)[1].lower()
-    
-    if file_ext == '.pdf':
-        page_texts = ocr.extract_text_from_pdf(file_path, output_dir)
-    elif file_ext in ['.png', '.jpg', '.jpeg', '.tiff', '.bmp']:
-        page_texts = ocr.extract_text_from_image(file_path, output_dir)
-    else:
-        raise ValueError(f"Unsupported file type: {file_ext}")
+    page_texts = {
+        page_info['page_num']: page_info
+        for page_info in iter_document_pages(file_path, output_dir, tesseract_langs, workers, dpi, file_hash,
+                                             on_page, ocr_mode, fingerprint, previous_pages)
+    }
     
     # Get combined text
-    combined_text = ocr.combine_page_texts(page_texts)
+    combined_text = DocumentOCR.combine_page_texts(page_texts)
     
-    return page_texts, combined_text
\ No newline at end of file
+    return page_texts, combined_text
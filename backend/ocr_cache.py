@@ -0,0 +1,33 @@
+import hashlib
+from disk_cache import DiskCache
+
+# Read buffer size for hashing files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """
+    Compute the SHA-256 hex digest of a file without loading it into memory
+
+    Args:
+        path: Path to file
+
+    Returns:
+        Hex digest string
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OCRCache(DiskCache):
+    """
+    Cache of per-page OCR results, keyed by file hash, page number and OCR
+    settings (configured with OCR_CACHE_DIR / OCR_CACHE_MAX_MB)
+    """
+
+    DB_NAME = 'ocr_cache.sqlite3'
+    DIR_ENV = 'OCR_CACHE_DIR'
+    MAX_MB_ENV = 'OCR_CACHE_MAX_MB'
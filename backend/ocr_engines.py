@@ -0,0 +1,135 @@
+"""
+OCR engine backends for DocumentOCR.
+
+- 'pytesseract' runs the tesseract CLI once per image: a new process that
+  reloads the traineddata and reads the image back from a temp file.
+- 'tesserocr' keeps a libtesseract instance per thread with the language
+  models loaded and hands it images straight from memory. It needs the
+  optional `tesserocr` package (built against the system libtesseract).
+- 'auto' uses tesserocr when it can be imported and pytesseract otherwise.
+"""
+import os
+import logging
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+import pytesseract
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+OCR_ENGINES = ('auto', 'tesserocr', 'pytesseract')
+
+
+class OCREngine:
+    """Interface: turn a preprocessed image into text"""
+
+    name = 'base'
+
+    def image_to_string(self, image: np.ndarray) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PytesseractEngine(OCREngine):
+    """One tesseract subprocess per image (the original behaviour)"""
+
+    name = 'pytesseract'
+
+    def __init__(self, langs: str):
+        self.langs = langs
+
+    def image_to_string(self, image: np.ndarray) -> str:
+        return pytesseract.image_to_string(Image.fromarray(image), lang=self.langs)
+
+
+class TesserocrEngine(OCREngine):
+    """
+    Long-lived libtesseract instances, one per thread (the API isn't
+    thread-safe), each keeping the language models loaded between images
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, langs: str, tessdata_path: str = None):
+        import tesserocr  # noqa: F401 - fail early if unavailable
+        self.langs = langs
+        self.tessdata_path = tessdata_path or os.getenv("TESSDATA_PREFIX")
+        self._local = threading.local()
+        self._apis = []
+        self._lock = threading.Lock()
+
+    def _api(self):
+        api = getattr(self._local, 'api', None)
+        if api is None:
+            import tesserocr
+            kwargs = {'lang': self.langs}
+            if self.tessdata_path:
+                kwargs['path'] = self.tessdata_path
+            api = tesserocr.PyTessBaseAPI(**kwargs)
+            self._local.api = api
+            with self._lock:
+                self._apis.append(api)
+        return api
+
+    def image_to_string(self, image: np.ndarray) -> str:
+        api = self._api()
+        api.SetImage(Image.fromarray(image))
+        try:
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+
+    def close(self):
+        with self._lock:
+            for api in self._apis:
+                api.End()
+            self._apis = []
+        self._local = threading.local()
+
+
+# One engine per (name, langs) per process, so pool workers and job threads
+# reuse loaded models across pages and documents
+_engines: Dict[Tuple[str, str], OCREngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(name: str, langs: str) -> OCREngine:
+    """
+    Get the shared engine for a backend name and language set
+
+    Args:
+        name: 'auto', 'tesserocr' or 'pytesseract'
+        langs: Tesseract language string (e.g. 'mal+eng')
+
+    Returns:
+        OCR engine instance
+
+    Raises:
+        ValueError: For an unknown engine name
+        ImportError: If 'tesserocr' is requested but not installed
+    """
+    if name not in OCR_ENGINES:
+        raise ValueError(f"Unsupported OCR engine: {name}")
+    with _engines_lock:
+        key = (name, langs)
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _create_engine(name, langs)
+            _engines[key] = engine
+        return engine
+
+
+def _create_engine(name: str, langs: str) -> OCREngine:
+    if name == 'pytesseract':
+        return PytesseractEngine(langs)
+    try:
+        return TesserocrEngine(langs)
+    except ImportError:
+        if name == 'tesserocr':
+            raise
+        logger.info("tesserocr not installed, using pytesseract")
+        return PytesseractEngine(langs)
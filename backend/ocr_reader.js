@@ -1,19 +1,57 @@
-import fs from "fs/promises";
+import fs from "fs";
+import fsp from "fs/promises";
 import path from "path";
+import readline from "readline";
+
+const PAGES_FILE = "pages.jsonl";
+
+/**
+ * Read pages.jsonl (the default page store) one record per line and return
+ * the pages with their [pN] marker, in page order.
+ */
+async function readPagesJSONL(file) {
+	const pages = [];
+	const lines = readline.createInterface({
+		input: fs.createReadStream(file, { encoding: "utf8" }),
+		crlfDelay: Infinity,
+	});
+	for await (const line of lines) {
+		if (!line.trim()) continue;
+		let record;
+		try {
+			record = JSON.parse(line);
+		} catch (e) {
+			// A partial last line from a document still being written
+			continue;
+		}
+		pages.push(record);
+	}
+	pages.sort((a, b) => a.page_num - b.page_num);
+	return pages.map((p) => `[p${p.page_num}]\n${p.text}`);
+}
 
 /**
- * Read OCR text files from the output directory and return combined text.
- * Looks for files named page_*.txt and concatenates them in numeric order.
+ * Read OCR text from the output directory and return combined text.
+ * Reads pages.jsonl when present, otherwise looks for files named
+ * page_*.txt and concatenates them in numeric order.
  */
 export async function readOCRFromOutput(outputDir = "output") {
 	const dir = path.resolve(process.cwd(), outputDir);
 	let entries;
 	try {
-		entries = await fs.readdir(dir);
+		entries = await fsp.readdir(dir);
 	} catch (e) {
 		throw new Error(`Failed to read output directory '${dir}': ${e.message}`);
 	}
 
+	if (entries.includes(PAGES_FILE)) {
+		const parts = await readPagesJSONL(path.join(dir, PAGES_FILE));
+		if (parts.length === 0) {
+			throw new Error(`No pages found in ${path.join(dir, PAGES_FILE)}`);
+		}
+		return parts.join("\n\n");
+	}
+
 	const pageFiles = entries
 		.filter((n) => /^page_\d+\.txt$/.test(n))
 		.sort((a, b) => {
@@ -23,13 +61,13 @@ export async function readOCRFromOutput(outputDir = "output") {
 		});
 
 	if (pageFiles.length === 0) {
-		throw new Error(`No page_*.txt files found in ${dir}`);
+		throw new Error(`No ${PAGES_FILE} or page_*.txt files found in ${dir}`);
 	}
 
 	const parts = [];
 	for (const fname of pageFiles) {
 		const p = path.join(dir, fname);
-		const txt = await fs.readFile(p, "utf8");
+		const txt = await fsp.readFile(p, "utf8");
 		parts.push(txt);
 	}
 
@@ -0,0 +1,241 @@
+"""
+Where extracted pages are written.
+
+- 'jsonl' (default): one pages.jsonl per document, one JSON record per page,
+  written through a large buffer, plus a pages.idx.json byte-offset index
+  written on close so single pages can be read without scanning the file.
+- 'files': the original layout, page_N.txt (with the [pN] marker) and
+  page_N_meta.json per page.
+
+ocr_reader.js reads either layout. A 'jsonl' document can still be converted
+to the per-page files with export_page_files, or from the shell:
+
+      python page_store.py export processed/<job_id>
+"""
+import os
+import re
+import json
+import argparse
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PAGE_STORES = ('jsonl', 'files')
+
+PAGES_FILE = 'pages.jsonl'
+INDEX_FILE = 'pages.idx.json'
+
+PAGE_FILE_RE = re.compile(r'^page_(\d+)\.txt$')
+
+# Bytes buffered before the pages file is written out
+WRITE_BUFFER = 1024 * 1024
+
+
+def page_meta(page_info: Dict) -> Dict:
+    """
+    Metadata saved for a page (everything but the text)
+    """
+    meta = {
+        'page_num': page_info['page_num'],
+        'language': page_info['language'],
+        'method': page_info['method'],
+        'char_count': len(page_info['text'])
+    }
+    for key in ('preprocess', 'ocr_regions', 'segments', 'fingerprint', 'reused_from'):
+        if page_info.get(key):
+            meta[key] = page_info[key]
+    return meta
+
+
+def marked_text(page_num: int, text: str) -> str:
+    return f"[p{page_num}]\n{text}"
+
+
+class PageStore:
+    """Interface: write a document's pages one at a time, then close"""
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+
+    def write_page(self, page_info: Dict):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PageFileStore(PageStore):
+    """page_N.txt + page_N_meta.json per page"""
+
+    def write_page(self, page_info: Dict):
+        page_num = page_info['page_num']
+        write_page_files(self.output_dir, page_num, marked_text(page_num, page_info['text']), page_meta(page_info))
+
+
+class JSONLPageStore(PageStore):
+    """
+    All pages in one buffered JSONL file. Records hold the page metadata plus
+    its unmarked 'text'.
+    """
+
+    def __init__(self, output_dir: str):
+        super().__init__(output_dir)
+        self.path = os.path.join(output_dir, PAGES_FILE)
+        self._file = open(self.path, 'wb', buffering=WRITE_BUFFER)
+        self._offset = 0
+        self._index: Dict[int, Tuple[int, int]] = {}
+
+    def write_page(self, page_info: Dict):
+        record = {**page_meta(page_info), 'text': page_info['text']}
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+        self._file.write(line)
+        self._index[page_info['page_num']] = (self._offset, len(line))
+        self._offset += len(line)
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        index = {str(page_num): entry for page_num, entry in sorted(self._index.items())}
+        with open(os.path.join(self.output_dir, INDEX_FILE), 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+
+
+def open_page_store(kind: str, output_dir: str) -> PageStore:
+    """
+    Args:
+        kind: 'jsonl' or 'files'
+        output_dir: Document output directory
+
+    Raises:
+        ValueError: For an unknown store kind
+    """
+    if kind == 'jsonl':
+        return JSONLPageStore(output_dir)
+    if kind == 'files':
+        return PageFileStore(output_dir)
+    raise ValueError(f"Unsupported page store: {kind}")
+
+
+def write_page_files(output_dir: str, page_num: int, text: str, meta: Dict):
+    """Write one page in the per-page file layout (`text` already marked)"""
+    with open(os.path.join(output_dir, f"page_{page_num}.txt"), 'w', encoding='utf-8') as f:
+        f.write(text)
+    with open(os.path.join(output_dir, f"page_{page_num}_meta.json"), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+
+
+class JSONLPageReader:
+    """
+    Random and sequential access to a document's pages.jsonl. Without an
+    index file (e.g. the writer crashed before closing) the offsets are
+    rebuilt with one scan.
+    """
+
+    def __init__(self, output_dir: str):
+        self.path = os.path.join(output_dir, PAGES_FILE)
+        index_path = os.path.join(output_dir, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, 'r', encoding='utf-8') as f:
+                self.index = {int(page_num): tuple(entry) for page_num, entry in json.load(f).items()}
+        else:
+            self.index = self._scan()
+
+    def _scan(self) -> Dict[int, Tuple[int, int]]:
+        index = {}
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if line.endswith(b"\n"):
+                    index[json.loads(line)['page_num']] = (offset, len(line))
+                offset += len(line)
+        return index
+
+    def page_numbers(self) -> List[int]:
+        return sorted(self.index)
+
+    def read_page(self, page_num: int) -> Optional[Dict]:
+        entry = self.index.get(page_num)
+        if entry is None:
+            return None
+        offset, length = entry
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.read(length))
+
+    def iter_pages(self) -> Iterator[Dict]:
+        """Pages in page order, reading the file front to back once"""
+        with open(self.path, 'rb') as f:
+            for page_num in self.page_numbers():
+                offset, length = self.index[page_num]
+                f.seek(offset)
+                yield json.loads(f.read(length))
+
+
+def iter_stored_pages(output_dir: str) -> Iterator[Dict]:
+    """
+    Saved pages of a document in page order, one at a time, from either
+    layout (page metadata plus unmarked 'text')
+    """
+    if os.path.exists(os.path.join(output_dir, PAGES_FILE)):
+        yield from JSONLPageReader(output_dir).iter_pages()
+        return
+    page_nums = sorted(int(m.group(1)) for m in map(PAGE_FILE_RE.match, os.listdir(output_dir)) if m)
+    for page_num in page_nums:
+        with open(os.path.join(output_dir, f"page_{page_num}.txt"), 'r', encoding='utf-8') as f:
+            text = f.read()
+        prefix = marked_text(page_num, '')
+        if text.startswith(prefix):
+            text = text[len(prefix):]
+        meta_path = os.path.join(output_dir, f"page_{page_num}_meta.json")
+        meta = {'page_num': page_num}
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        yield {**meta, 'text': text}
+
+
+def export_page_files(output_dir: str, dest_dir: Optional[str] = None) -> int:
+    """
+    Write page_N.txt / page_N_meta.json files from a document's pages.jsonl
+
+    Args:
+        output_dir: Document output directory holding pages.jsonl
+        dest_dir: Where to write the files (default: output_dir)
+
+    Returns:
+        Number of pages exported
+    """
+    dest_dir = dest_dir or output_dir
+    os.makedirs(dest_dir, exist_ok=True)
+    count = 0
+    for record in JSONLPageReader(output_dir).iter_pages():
+        text = record.pop('text')
+        write_page_files(dest_dir, record['page_num'], marked_text(record['page_num'], text), record)
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Page store utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export = subparsers.add_parser("export", help="Write page_N.txt / page_N_meta.json from pages.jsonl")
+    export.add_argument("output_dir", help="Document output directory")
+    export.add_argument("--dest", help="Destination directory (default: output_dir)")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        count = export_page_files(args.output_dir, args.dest)
+        print(f"Exported {count} pages to {args.dest or args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
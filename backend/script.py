@@ -1,71 +1,272 @@
-from ocr import extract_document_text
-from llm_summarizer import create_document_summary
-import load_env  # Load environment variables from .env file
+"""
+Bulk ingestion: extract text from every document under the given paths.
+
+Inputs can be files, directories (searched recursively) or glob patterns.
+Documents are processed in parallel (--doc-workers), each optionally with
+its own page worker pool (--page-workers). Every document gets its own
+output directory, <output>/<sha256[:16]>_<name>/, holding its pages
+(pages.jsonl, or page_N.txt / page_N_meta.json files with
+OCR_PAGE_STORE=files) and document_summary.* with --summarize.
+
+Finished documents are appended to a checkpoint manifest
+(<output>/manifest.jsonl). Re-running the same command skips documents that
+are already done and unchanged (same size and mtime), so an interrupted
+backfill resumes where it stopped; failed documents are retried.
+
+Usage:
+    python script.py MALAYALAM.pdf
+    python script.py /data/scans "/data/inbox/**/*.pdf" --output processed --doc-workers 8
+"""
+import argparse
+import glob
+import json
 import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional
+
+import load_env  # Load environment variables from .env file
+from ocr import PROCESSABLE_EXTENSIONS
+
+MANIFEST_NAME = 'manifest.jsonl'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+def iter_input_files(inputs: List[str]) -> Iterator[str]:
+    """
+    Expand files, directories and glob patterns into absolute paths of
+    processable documents, each yielded once
+    """
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = (
+                os.path.join(root, name)
+                for root, dirs, files in os.walk(item)
+                for name in sorted(files)
+            )
+        elif os.path.isfile(item):
+            candidates = [item]
+        else:
+            candidates = sorted(glob.iglob(item, recursive=True))
+        for path in candidates:
+            path = os.path.abspath(path)
+            if path in seen or not os.path.isfile(path):
+                continue
+            if os.path.splitext(path)[1].lower() not in PROCESSABLE_EXTENSIONS:
+                continue
+            seen.add(path)
+            yield path
+
+
+def file_signature(path: str) -> Dict:
+    """Cheap change check used on resume (hashing 50k files again would not be)"""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Dict]:
+    """
+    Latest manifest record per path. A truncated last line (from a crash
+    mid-write) is ignored.
+    """
+    records = {}
+    if not os.path.exists(manifest_path):
+        return records
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            records[record['path']] = record
+    return records
+
+
+def is_done(record: Optional[Dict], path: str) -> bool:
+    if not record or record.get('status') != STATUS_DONE:
+        return False
+    signature = file_signature(path)
+    return record.get('size') == signature['size'] and record.get('mtime') == signature['mtime']
+
+
+def ingest_document(path: str, output_root: str, options: Dict) -> Dict:
+    """
+    Extract (and optionally summarize) one document into its own output
+    directory. Runs in a worker process; never raises.
+
+    Returns:
+        Manifest record for the document
+    """
+    from ocr import iter_document_pages
+    from ocr_cache import file_sha256
+
+    start = time.perf_counter()
+    record = {'path': path, **file_signature(path)}
+    try:
+        file_hash = file_sha256(path)
+        name = os.path.splitext(os.path.basename(path))[0]
+        output_dir = os.path.join(output_root, f"{file_hash[:16]}_{name}")
+        record.update(sha256=file_hash, output_dir=output_dir)
+        record.update(pages=0, ocr_pages=0, direct_pages=0, cached_pages=0)
+
+        # Pages are streamed through extraction and summarization one at a
+        # time, so long archive scans don't have to fit in memory
+        def counted(pages):
+            for info in pages:
+                record['pages'] += 1
+                record['ocr_pages'] += info['method'] in ('ocr', 'hybrid')
+                record['direct_pages'] += info['method'] == 'direct'
+                record['cached_pages'] += bool(info.get('cached'))
+                yield info
+
+        pages = counted(iter_document_pages(
+            file_path=path,
+            output_dir=output_dir,
+            tesseract_langs=options['langs'],
+            workers=options['page_workers'],
+            file_hash=file_hash
+        ))
+        summary = None
+        if options['summarize']:
+            from llm_summarizer import summarize_pages
+            summary = summarize_pages(pages, output_dir)
+        # Finish extraction if summarization stopped early (or didn't run)
+        for _ in pages:
+            pass
+
+        if options['index']:
+            from page_store import iter_stored_pages
+            from search_index import get_search_index
+            get_search_index().index_document(
+                os.path.basename(output_dir),
+                iter_stored_pages(output_dir),
+                filename=os.path.basename(path),
+                file_hash=file_hash
+            )
+
+        if summary is not None and 'error' in summary:
+            raise RuntimeError(f"Summary failed: {summary['error']}")
+
+        record['status'] = STATUS_DONE
+    except Exception as e:
+        record.update(status=STATUS_FAILED, error=f"{type(e).__name__}: {str(e)}")
+    record['elapsed_s'] = round(time.perf_counter() - start, 3)
+    record['finished_at'] = time.time()
+    return record
+
+
+class Stats:
+    """Running throughput totals for the current run"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.documents = 0
+        self.failed = 0
+        self.skipped = 0
+        self.pages = 0
+        self.ocr_pages = 0
+        self.direct_pages = 0
+        self.cached_pages = 0
+
+    def add(self, record: Dict):
+        self.documents += 1
+        if record['status'] != STATUS_DONE:
+            self.failed += 1
+            return
+        self.pages += record['pages']
+        self.ocr_pages += record['ocr_pages']
+        self.direct_pages += record['direct_pages']
+        self.cached_pages += record['cached_pages']
+
+    def report(self) -> str:
+        elapsed = time.perf_counter() - self.start
+        rate = self.pages / elapsed if elapsed else 0.0
+        ocr_share = self.ocr_pages / self.pages * 100 if self.pages else 0.0
+        return "\n".join([
+            f"Documents: {self.documents - self.failed} done, {self.failed} failed, "
+            f"{self.skipped} skipped (already in manifest)",
+            f"Pages:     {self.pages} in {elapsed:.1f}s ({rate:.2f} pages/sec)",
+            f"Methods:   {self.ocr_pages} OCR / {self.direct_pages} direct "
+            f"({ocr_share:.1f}% OCR), {self.cached_pages} from cache",
+        ])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", default=["MALAYALAM.pdf"],
+                        help="Files, directories or glob patterns (default: MALAYALAM.pdf)")
+    parser.add_argument("--output", default="output", help="Output root directory (default: output)")
+    parser.add_argument("--doc-workers", type=int, default=os.cpu_count() or 1,
+                        help="Documents processed in parallel (default: CPU count)")
+    parser.add_argument("--page-workers", type=int, default=1,
+                        help="Page worker processes per document (default: 1)")
+    parser.add_argument("--langs", default="mal+eng", help="Tesseract languages (default: mal+eng)")
+    parser.add_argument("--summarize", action="store_true", help="Also generate an LLM summary per document")
+    parser.add_argument("--index", action="store_true",
+                        help="Add pages to the search index (SEARCH_DB_PATH), visible to all users")
+    parser.add_argument("--manifest", help=f"Checkpoint manifest path (default: <output>/{MANIFEST_NAME})")
+    args = parser.parse_args(argv)
+
+    output_root = os.path.abspath(args.output)
+    os.makedirs(output_root, exist_ok=True)
+    manifest_path = args.manifest or os.path.join(output_root, MANIFEST_NAME)
+    done = load_manifest(manifest_path)
+    options = {'langs': args.langs, 'page_workers': args.page_workers, 'summarize': args.summarize,
+               'index': args.index}
+
+    stats = Stats()
+    pending = set()
+    max_in_flight = max(1, args.doc_workers) * 2
+
+    print(f"Output directory: {output_root}")
+    print(f"Manifest: {manifest_path}")
+
+    with open(manifest_path, 'a', encoding='utf-8') as manifest, \
+            ProcessPoolExecutor(max_workers=max(1, args.doc_workers)) as executor:
+
+        def collect(futures):
+            for future in futures:
+                if future.exception() is not None:
+                    # Worker died or was interrupted: leave it out of the manifest so it's retried
+                    print(f"⚠️  Worker error: {future.exception()!r}")
+                    continue
+                record = future.result()
+                manifest.write(json.dumps(record, ensure_ascii=False) + "\n")
+                manifest.flush()
+                stats.add(record)
+                if record['status'] == STATUS_DONE:
+                    print(f"✅ {record['path']}: {record['pages']} pages "
+                          f"({record['ocr_pages']} OCR) in {record['elapsed_s']:.1f}s")
+                else:
+                    print(f"❌ {record['path']}: {record['error']}")
+
+        try:
+            for path in iter_input_files(args.inputs):
+                if is_done(done.get(path), path):
+                    stats.skipped += 1
+                    continue
+                # Bound the number of queued documents so huge inputs aren't all submitted up front
+                if len(pending) >= max_in_flight:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+                pending.add(executor.submit(ingest_document, path, output_root, options))
+            finished, pending = wait(pending)
+            collect(finished)
+        except KeyboardInterrupt:
+            print("\nInterrupted, waiting for running documents (re-run to resume)...")
+            for future in pending:
+                future.cancel()
+            collect(f for f in pending if not f.cancelled())
+            print(stats.report())
+            return 130
+
+    print()
+    print(stats.report())
+    return 1 if stats.failed else 0
+
 
-# Set up paths
-pdf_path = os.path.join(os.getcwd(), "MALAYALAM.pdf")
-output_dir = os.path.join(os.getcwd(), "output")
-
-# Create output directory if it doesn't exist
-os.makedirs(output_dir, exist_ok=True)
-
-print(f"PDF path: {pdf_path}")
-print(f"Output directory: {output_dir}")
-print(f"PDF exists: {os.path.exists(pdf_path)}")
-
-try:
-    # Extract text from PDF
-    print("\n🔍 Extracting text from PDF...")
-    page_texts, combined_text = extract_document_text(
-        file_path=pdf_path,
-        output_dir=output_dir,
-        tesseract_langs='mal+eng'  # Malayalam + English
-    )
-
-    # Access results
-    print(f"✅ Extracted {len(page_texts)} pages")
-    print(f"📊 Combined text length: {len(combined_text)} characters")
-
-    # Display language detection results
-    print("\n🌍 Language Detection:")
-    for page_num, info in page_texts.items():
-        print(f"  Page {page_num}: {info['language']} (via {info['method']})")
-
-    # Display sample of page 1
-    if 1 in page_texts:
-        print("\n📄 Sample from Page 1:")
-        print(page_texts[1]['marked_text'][:300] + "..." if len(page_texts[1]['marked_text']) > 300 else page_texts[1]['marked_text'])
-
-    # Generate GitHub LLM summary
-    print("\n🤖 Generating AI Summary using GitHub LLM...")
-    summary_data = create_document_summary(page_texts, combined_text, output_dir)
-
-    if "error" not in summary_data:
-        print("✅ AI Summary Generated Successfully!")
-        print(f"\n📋 Document Type: {summary_data['document_type']}")
-        print(f"\n📝 Overall Summary:\n{summary_data['overall_summary']}")
-
-        print("\n🔑 Key Information:")
-        for category, items in summary_data['key_information'].items():
-            if items:
-                print(f"  {category.replace('_', ' ').title()}: {', '.join(items)}")
-
-        print("\n📊 Metadata:")
-        print(f"  Total Pages: {summary_data['metadata']['total_pages']}")
-        print(f"  Total Characters: {summary_data['metadata']['total_characters']}")
-        print(f"  Languages Detected: {', '.join(summary_data['metadata']['languages_detected'])}")
-
-        print(f"\n💾 Summary files saved to: {output_dir}")
-        print("  - document_summary.json (detailed JSON)")
-        print("  - document_summary.txt (readable format)")
-
-    else:
-        print(f"❌ Error generating AI summary: {summary_data['error']}")
-        print("💡 Make sure you have set your GITHUB_TOKEN environment variable")
-        print("   You can get a GitHub token from: https://github.com/settings/tokens")
-
-except Exception as e:
-    print(f"❌ Error: {str(e)}")
-    import traceback
-    traceback.print_exc()
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
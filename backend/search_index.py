@@ -0,0 +1,273 @@
+"""
+Full-text index of extracted pages (SQLite FTS5).
+
+Malayalam needs care on both sides of the index:
+- FTS5's unicode61 tokenizer only keeps letters and numbers in tokens, so
+  vowel signs and the virama (combining marks) would split every Malayalam
+  word into fragments. They are declared as token characters instead.
+- Text is NFC-normalized, old-style chillus (consonant + virama + ZWJ) are
+  mapped to the atomic chillu letters and the remaining ZWJ/ZWNJ dropped,
+  so differently encoded spellings of a word index to the same token.
+- Malayalam words take suffixes (കരാർ -> കരാറിന്റെ), so Malayalam query
+  terms are prefix matches, and a final chillu also matches the consonant
+  it turns into before a suffix.
+"""
+import os
+import re
+import html
+import time
+import sqlite3
+import logging
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Malayalam combining marks: signs, virama, vowel signs, length mark
+MALAYALAM_MARKS = ''.join(
+    chr(c) for c in [*range(0x0D00, 0x0D04), 0x0D3B, 0x0D3C, *range(0x0D3E, 0x0D4E), 0x0D57, 0x0D62, 0x0D63]
+)
+TOKENIZER = f"unicode61 remove_diacritics 2 tokenchars '{MALAYALAM_MARKS}'"
+
+VIRAMA = '\u0D4D'
+ZWJ = '\u200D'
+ZWNJ = '\u200C'
+
+# Base consonant -> atomic chillu
+CHILLUS = {'ണ': 'ൺ', 'ന': 'ൻ', 'ര': 'ർ', 'ല': 'ൽ', 'ള': 'ൾ', 'ക': 'ൿ'}
+OLD_CHILLU_RE = re.compile(f"([{''.join(CHILLUS)}]){VIRAMA}{ZWJ}")
+# Chillu -> consonant(s) it is written as when a suffix follows
+CHILLU_STEMS = {'ൺ': 'ണ', 'ൻ': 'ന', 'ർ': 'റര', 'ൽ': 'ല', 'ൾ': 'ള', 'ൿ': 'ക'}
+
+MALAYALAM_RE = re.compile('[\u0D00-\u0D7F]')
+QUERY_TERM_RE = re.compile(r'"([^"]+)"|(\S+)')
+
+# Private-use markers around snippet matches, replaced after HTML escaping
+_MARK_START = '\uE000'
+_MARK_END = '\uE001'
+
+MAX_QUERY_TERMS = 16
+
+
+def normalize_text(text: str) -> str:
+    """Canonical form used for both indexed text and queries"""
+    text = unicodedata.normalize('NFC', text)
+    text = OLD_CHILLU_RE.sub(lambda m: CHILLUS[m.group(1)], text)
+    return text.replace(ZWJ, '').replace(ZWNJ, '')
+
+
+def _quote(term: str) -> str:
+    return '"' + term.replace('"', '""') + '"'
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Turn user input into an FTS5 MATCH expression
+
+    Every term must match (AND). "Quoted text" is a phrase, a trailing *
+    makes a term a prefix match, and Malayalam terms are always prefix
+    matches. Terms are quoted, so FTS5 operators in the input are treated as
+    text. Terms with punctuation (e.g. KMRL/2024/123) match as phrases.
+
+    Returns:
+        MATCH expression, or None if the query has no terms
+    """
+    clauses = []
+    for phrase, term in QUERY_TERM_RE.findall(normalize_text(query))[:MAX_QUERY_TERMS]:
+        if phrase:
+            clauses.append(_quote(phrase))
+            continue
+        prefix = term.endswith('*')
+        term = term.rstrip('*')
+        if not re.search(r'\w', term):
+            continue
+        if not MALAYALAM_RE.search(term):
+            clauses.append(_quote(term) + ('*' if prefix else ''))
+            continue
+        variants = [term]
+        stems = CHILLU_STEMS.get(term[-1], '')
+        variants += [term[:-1] + stem for stem in stems]
+        alternatives = [_quote(variant) + '*' for variant in variants]
+        clauses.append(alternatives[0] if len(alternatives) == 1 else '(' + ' OR '.join(alternatives) + ')')
+    return ' AND '.join(clauses) or None
+
+
+class SearchIndex:
+    """
+    Page-level full-text index, updated one document at a time
+
+    Documents without an owner (e.g. bulk-ingested archives) are visible to
+    every user; others only to their owner. Each thread gets its own
+    connection, so one instance can be shared by the job pool and the API.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite database file
+        """
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if getattr(self._local, 'conn', None) is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " doc_id TEXT PRIMARY KEY,"
+                " owner TEXT,"
+                " filename TEXT,"
+                " file_hash TEXT,"
+                " page_count INTEGER NOT NULL,"
+                " indexed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS page_rows ("
+                " id INTEGER PRIMARY KEY,"
+                " doc_id TEXT NOT NULL,"
+                " page_num INTEGER NOT NULL,"
+                " language TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS page_rows_doc ON page_rows (doc_id)")
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5("
+                f" text, tokenize=\"{TOKENIZER}\", prefix='2 3')"
+            )
+            self._local.conn = conn
+        return self._local.conn
+
+    def index_document(self, doc_id: str, pages: Iterable[Dict], owner: Optional[str] = None,
+                       filename: Optional[str] = None, file_hash: Optional[str] = None) -> int:
+        """
+        Add or replace a document's pages in one transaction
+
+        Args:
+            doc_id: Document identifier (job ID or output directory name)
+            pages: Page info dictionaries ('page_num', 'text', 'language')
+            owner: Username allowed to search the document (None = everyone)
+            filename: Original file name, returned with hits
+            file_hash: SHA-256 of the source file
+
+        Returns:
+            Number of pages indexed
+        """
+        conn = self.conn
+        count = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._delete(conn, doc_id)
+            for page in pages:
+                cursor = conn.execute(
+                    "INSERT INTO page_rows (doc_id, page_num, language) VALUES (?, ?, ?)",
+                    (doc_id, page['page_num'], page.get('language'))
+                )
+                conn.execute("INSERT INTO pages (rowid, text) VALUES (?, ?)",
+                             (cursor.lastrowid, normalize_text(page['text'])))
+                count += 1
+            conn.execute(
+                "INSERT INTO documents (doc_id, owner, filename, file_hash, page_count, indexed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (doc_id, owner, filename, file_hash, count, time.time())
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return count
+
+    def remove_document(self, doc_id: str):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._delete(conn, doc_id)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _delete(conn: sqlite3.Connection, doc_id: str):
+        conn.execute("DELETE FROM pages WHERE rowid IN (SELECT id FROM page_rows WHERE doc_id = ?)", (doc_id,))
+        conn.execute("DELETE FROM page_rows WHERE doc_id = ?", (doc_id,))
+        conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+
+    def search(self, query: str, owner: Optional[str] = None, limit: int = 20,
+               offset: int = 0, snippet_tokens: int = 16) -> List[Dict]:
+        """
+        Ranked page hits for a query
+
+        Args:
+            query: Search terms (see build_match_query)
+            owner: Only return documents owned by this user or by no one
+                (None = all documents)
+            limit: Maximum number of hits
+            offset: Hits to skip, for paging
+            snippet_tokens: Approximate snippet length in tokens
+
+        Returns:
+            Hits, best first: doc_id, filename, page_num, language, score and
+            an HTML-escaped snippet with matches wrapped in <mark>
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT r.doc_id, d.filename, r.page_num, r.language, bm25(pages) AS score,"
+            " snippet(pages, 0, ?, ?, '…', ?)"
+            " FROM pages"
+            " JOIN page_rows r ON r.id = pages.rowid"
+            " JOIN documents d ON d.doc_id = r.doc_id"
+            " WHERE pages MATCH ?"
+        )
+        params: list = [_MARK_START, _MARK_END, snippet_tokens, match]
+        if owner is not None:
+            sql += " AND (d.owner = ? OR d.owner IS NULL)"
+            params.append(owner)
+        sql += " ORDER BY score LIMIT ? OFFSET ?"
+        params += [limit, offset]
+
+        hits = []
+        for doc_id, filename, page_num, language, score, snippet in self.conn.execute(sql, params):
+            snippet = html.escape(snippet).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>')
+            hits.append({
+                'doc_id': doc_id,
+                'filename': filename,
+                'page_num': page_num,
+                'language': language,
+                # bm25() is lower-is-better; flip it so higher means more relevant
+                'score': round(-score, 4),
+                'snippet': snippet
+            })
+        return hits
+
+    def stats(self) -> Dict[str, int]:
+        documents, pages = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(page_count), 0) FROM documents"
+        ).fetchone()
+        return {'documents': documents, 'pages': pages}
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_search_index: Optional[SearchIndex] = None
+_search_index_lock = threading.Lock()
+
+
+def get_search_index() -> SearchIndex:
+    """Process-wide index at SEARCH_DB_PATH (default search.db)"""
+    global _search_index
+    with _search_index_lock:
+        if _search_index is None:
+            _search_index = SearchIndex(os.getenv("SEARCH_DB_PATH", "search.db"))
+        return _search_index
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Backend modules import each other as top-level modules (run from backend/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# main.py creates its upload and output folders on import
+_folders = tempfile.mkdtemp(prefix="sih-tests-")
+os.environ.setdefault("UPLOAD_FOLDER", os.path.join(_folders, "uploads"))
+os.environ.setdefault("OUTPUT_FOLDER", os.path.join(_folders, "processed"))
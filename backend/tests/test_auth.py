@@ -0,0 +1,63 @@
+import asyncio
+import os
+import time
+
+import pytest
+from fastapi import HTTPException
+
+import auth
+from auth import PrincipalCache, SQLiteUserStore, UserInDB
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setenv("ADMIN_USERNAME", "admin")
+    monkeypatch.setenv("ADMIN_EMAIL", "admin@example.com")
+    monkeypatch.setenv("ADMIN_PASSWORD", "secret")
+    store = SQLiteUserStore(os.path.join(tmp_path, "users.db"))
+    auth.set_user_store(store)
+    yield store
+    auth.set_user_store(None)
+
+
+def _user(name):
+    return UserInDB(username=name, email=f"{name}@example.com", hashed_password="x")
+
+
+def test_store_seeds_admin_and_finds_by_email(store):
+    assert store.get_user("admin").email == "admin@example.com"
+    assert store.get_user("admin@example.com").username == "admin"
+    assert store.get_user("nobody") is None
+    assert auth.authenticate_user("admin@example.com", "secret").username == "admin"
+    assert auth.authenticate_user("admin", "wrong") is False
+
+
+def test_disabled_user_cannot_log_in(store):
+    store.add_user("clerk", "clerk@example.com", "pw", disabled=True)
+    assert store.get_user("clerk").disabled
+    assert auth.authenticate_user("clerk", "pw") is False
+
+
+def test_token_user_is_cached_until_changed(store):
+    token = auth.create_access_token({"sub": "admin"})
+    assert asyncio.run(auth.get_current_user(token)).username == "admin"
+    # Cached: later lookups don't hit the store
+    auth._user_store = None
+    assert asyncio.run(auth.get_current_user(token)).username == "admin"
+    auth._user_store = store
+    store.add_user("admin", "admin@example.com", "secret", disabled=True)
+    with pytest.raises(HTTPException):
+        asyncio.run(auth.get_current_user(token))
+
+
+def test_principal_cache_expiry_and_lru():
+    cache = PrincipalCache(max_size=2)
+    cache.put("t1", _user("a"), time.time() + 60)
+    cache.put("t2", _user("b"), time.time() + 60)
+    cache.get("t1")
+    cache.put("t3", _user("c"), time.time() + 60)
+    assert cache.get("t2") is None and cache.get("t1").username == "a"
+    cache.invalidate("a@example.com")
+    assert cache.get("t1") is None and cache.get("t3").username == "c"
+    cache.put("t4", _user("d"), time.time() - 1)
+    assert cache.get("t4") is None
@@ -0,0 +1,103 @@
+import time
+import threading
+
+import openai
+import pytest
+
+import llm_summarizer
+from llm_backends import OpenAIBackend
+from mock_llm_server import start_mock_server
+
+
+@pytest.fixture
+def fast_retries(monkeypatch):
+    monkeypatch.setenv("LLM_REQUESTS_PER_MINUTE", "0")
+    monkeypatch.setenv("LLM_TOKENS_PER_MINUTE", "0")
+    monkeypatch.setenv("LLM_RETRY_BASE_DELAY", "0.01")
+    monkeypatch.setenv("RATE_LIMIT_RETRY_DELAY", "0.05")
+    # Fresh limiter built from the settings above
+    monkeypatch.setattr(llm_summarizer, "_rate_limiter", None)
+
+
+@pytest.fixture
+def mock_backend():
+    servers, backends = [], []
+
+    def start(**options):
+        server = start_mock_server(**options)
+        backend = OpenAIBackend(server.base_url, 'mock', 'mock', max_connections=2, timeout=5)
+        servers.append(server)
+        backends.append(backend)
+        return server, backend
+
+    yield start
+    for backend in backends:
+        backend.close()
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+MESSAGES = [{"role": "user", "content": "alpha beta gamma delta"}]
+
+
+def test_completion_returns_reply(fast_retries, mock_backend):
+    server, backend = mock_backend()
+    text = llm_summarizer.chat_completion(backend, MESSAGES, max_tokens=50)
+    assert text == "Summary: alpha beta gamma delta"
+    assert server.stats['requests'] == 1
+
+
+def test_429_is_retried_after_retry_after(fast_retries, mock_backend):
+    server, backend = mock_backend(rate_limit_every=2, retry_after=0.3)
+    llm_summarizer.chat_completion(backend, MESSAGES, max_tokens=50)
+    start = time.monotonic()
+    # Second request is rate limited, its retry goes through
+    text = llm_summarizer.chat_completion(backend, MESSAGES, max_tokens=50)
+    assert text.startswith("Summary:")
+    assert time.monotonic() - start >= 0.3
+    assert server.stats['requests'] == 3
+    assert server.stats['rate_limited'] == 1
+
+
+def test_retry_after_pauses_the_shared_limiter(fast_retries, mock_backend, monkeypatch):
+    monkeypatch.setenv("LLM_MAX_RETRIES", "1")
+    server, backend = mock_backend(rate_limit_every=1, retry_after=0.5)
+    errors = []
+
+    def call():
+        try:
+            llm_summarizer.chat_completion(backend, MESSAGES, max_tokens=50)
+        except openai.RateLimitError as e:
+            errors.append(e)
+
+    limiter = llm_summarizer.get_rate_limiter()
+    worker = threading.Thread(target=call)
+    worker.start()
+    # Wait for the 429 to reach the client
+    while limiter._paused_until <= time.monotonic():
+        time.sleep(0.005)
+    # Another caller is held back by the server's Retry-After too
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start > 0.3
+    worker.join()
+    assert len(errors) == 1
+
+
+def test_retries_are_bounded(fast_retries, mock_backend, monkeypatch):
+    monkeypatch.setenv("LLM_MAX_RETRIES", "2")
+    server, backend = mock_backend(rate_limit_every=1, retry_after=0)
+    with pytest.raises(openai.RateLimitError):
+        llm_summarizer.chat_completion(backend, MESSAGES, max_tokens=50)
+    assert server.stats['requests'] == 3
+
+
+def test_rate_limit_errors_are_classified(mock_backend):
+    server, backend = mock_backend(rate_limit_every=1, retry_after=7)
+    with pytest.raises(openai.RateLimitError) as info:
+        backend.complete(MESSAGES, 50, 0.3)
+    assert backend.is_rate_limited(info.value)
+    assert backend.is_retryable(info.value)
+    assert backend.retry_after(info.value) == 7.0
+    assert not backend.is_retryable(ValueError("not an API error"))
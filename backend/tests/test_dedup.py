@@ -0,0 +1,74 @@
+import os
+
+import numpy as np
+
+import dedup
+import jobs
+from dedup import DuplicateIndex, estimate_similarity, minhash_signature
+from jobs import STATUS_COMPLETED, JobManager
+
+WORDS = [f"word{i}" for i in range(400)]
+
+
+def _text(words):
+    return " ".join(words)
+
+
+def test_short_text_has_no_signature():
+    assert minhash_signature("too few words here") is None
+
+
+def test_signature_is_deterministic():
+    a = minhash_signature(_text(WORDS))
+    assert a.shape == (dedup.NUM_PERM,)
+    assert np.array_equal(a, minhash_signature(_text(WORDS)))
+
+
+def test_blocked_signature_matches_a_single_block(monkeypatch):
+    expected = minhash_signature(_text(WORDS))
+    monkeypatch.setattr(dedup, "SIGNATURE_BLOCK", 7)
+    assert np.array_equal(minhash_signature(_text(WORDS)), expected)
+
+
+def test_similarity_tracks_jaccard():
+    original = minhash_signature(_text(WORDS))
+    # Different header, same body
+    near = minhash_signature("[p1]\nForwarded copy\n" + _text(WORDS))
+    other = minhash_signature(_text(f"other{i}" for i in range(400)))
+    assert estimate_similarity(original, near) >= 0.9
+    assert estimate_similarity(original, other) < 0.1
+
+
+def test_index_matches_only_the_same_owner(tmp_path):
+    index = DuplicateIndex(os.path.join(tmp_path, "dedup.db"), threshold=0.9)
+    signature = minhash_signature(_text(WORDS))
+    index.add_document("job1", "alice", "a.pdf", "hash1", {'page_count': 1}, signature)
+
+    assert index.find_exact("hash1", "alice")['doc_id'] == "job1"
+    assert index.find_exact("hash1", "bob") is None
+
+    near = minhash_signature("cover note " + _text(WORDS))
+    document, similarity = index.find_similar(near, "alice")
+    assert document['doc_id'] == "job1" and similarity >= 0.9
+    assert index.find_similar(near, "bob") is None
+
+    index.link_duplicate("job2", "job1", "alice", "copy.pdf", "hash2", "near", similarity)
+    assert index.find_exact("hash2", "alice")['doc_id'] == "job1"
+    assert index.find_exact("hash2", "bob") is None
+
+
+def test_exact_duplicate_upload_is_not_queued(tmp_path, monkeypatch):
+    index = DuplicateIndex(os.path.join(tmp_path, "dedup.db"))
+    index.add_document("job1", "alice", "a.pdf", "hash1", {'page_count': 1, 'summary': {'overall_summary': "s"}},
+                       minhash_signature(_text(WORDS)))
+    monkeypatch.setattr(jobs, "get_duplicate_index", lambda: index)
+    manager = JobManager(workers=1)
+    try:
+        job = manager.submit("alice", "copy.pdf", "/nonexistent/copy.pdf", str(tmp_path), file_hash="hash1")
+    finally:
+        manager.shutdown()
+    assert job.status == STATUS_COMPLETED and job.duplicate_of == "job1"
+    assert job.result['duplicate_kind'] == 'exact' and job.result['page_count'] == 1
+    assert [event['type'] for event in job.events] == ['duplicate', 'summary', 'status']
+    cluster, = index.clusters("alice")
+    assert cluster['doc_id'] == "job1" and cluster['duplicates'][0]['doc_id'] == job.job_id
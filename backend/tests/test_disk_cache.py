@@ -0,0 +1,87 @@
+import os
+import pickle
+import sqlite3
+
+import pymupdf
+
+import disk_cache
+from disk_cache import DiskCache
+from ocr import DocumentOCR
+from ocr_cache import OCRCache
+
+
+def _pdf(path, pages):
+    doc = pymupdf.open()
+    for n in range(pages):
+        doc.new_page().insert_text((72, 72), f"Page {n}: " + "tender clause text " * 12, fontsize=9)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def test_put_get_and_running_totals(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    key = DiskCache.make_key("abc", 1, langs="mal+eng", dpi=300)
+    assert key == DiskCache.make_key("abc", 1, dpi=300, langs="mal+eng")
+    assert key != DiskCache.make_key("abc", 2, dpi=300, langs="mal+eng")
+    assert cache.get(key) is None
+    cache.put(key, {'text': "ഒന്ന്"})
+    cache.put(key, {'text': "two"})
+    assert cache.get(key) == {'text': "two"}
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['size_bytes'] == len('{"text": "two"}')
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=130)
+    for n in range(3):
+        cache.put(f"k{n}", {'text': "x" * 30})
+    cache.get("k0")
+    cache.flush()
+    cache.put("k3", {'text': "x" * 30})
+    assert cache.get("k1") is None and cache.get("k0") is not None
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['entries'] == 3 and stats['size_bytes'] <= 130
+
+
+def test_reads_are_batched(tmp_path, monkeypatch):
+    monkeypatch.setattr(disk_cache, "FLUSH_READS", 3)
+    cache = DiskCache(str(tmp_path))
+    other = DiskCache(str(tmp_path))
+    for _ in range(2):
+        cache.get("missing")
+    assert other.stats()['misses'] == 0
+    cache.get("missing")
+    assert other.stats()['misses'] == 3
+
+
+def test_pickled_cache_reconnects(tmp_path):
+    cache = OCRCache(str(tmp_path))
+    cache.put("k", {'text': "page"})
+    copy = pickle.loads(pickle.dumps(cache))
+    assert copy.get("k") == {'text': "page"}
+    assert os.path.exists(os.path.join(tmp_path, OCRCache.DB_NAME))
+
+
+def test_second_run_hits_cache(tmp_path):
+    pdf = _pdf(os.path.join(tmp_path, "doc.pdf"), 3)
+    ocr = DocumentOCR(workers=1, engine='pytesseract', cache=OCRCache(os.path.join(tmp_path, "cache")))
+    first = list(ocr.iter_pdf_pages(pdf, os.path.join(tmp_path, "out1"), fingerprint=True))
+    second = list(ocr.iter_pdf_pages(pdf, os.path.join(tmp_path, "out2"), fingerprint=True))
+    assert not any(page['cached'] for page in first)
+    assert all(page['cached'] for page in second)
+    assert [page['text'] for page in second] == [page['text'] for page in first]
+    assert [page['fingerprint'] for page in second] == [page['fingerprint'] for page in first]
+
+
+def test_stats_failure_does_not_fail_document(tmp_path, monkeypatch):
+    cache = OCRCache(os.path.join(tmp_path, "cache"))
+
+    def broken():
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(cache, "stats", broken)
+    ocr = DocumentOCR(workers=1, engine='pytesseract', cache=cache)
+    pages = list(ocr.iter_pdf_pages(_pdf(os.path.join(tmp_path, "doc.pdf"), 2), os.path.join(tmp_path, "out")))
+    assert len(pages) == 2
@@ -0,0 +1,76 @@
+import json
+import os
+
+import llm_summarizer
+from entities import KeyInformation, iter_entities, key_information, scan_text
+
+
+def values(text, kind):
+    return [e['value'] for e in scan_text(text) if e['type'] == kind]
+
+
+def test_phones_are_normalized():
+    text = "Call +91 98470 12345 or 098470-12345, office 0471-2345678."
+    assert values(text, 'phone') == ['+919847012345', '+919847012345', '+914712345678']
+
+
+def test_malayalam_digits():
+    assert values("ഫോൺ ൯൮൪൭൦൧൨൩൪൫", 'phone') == ['+919847012345']
+    assert values("തീയതി ൧൨.൦൩.൨൦൨൪", 'date') == ['2024-03-12']
+
+
+def test_dates_are_normalized():
+    text = "Dated 12.03.2024, due 2024-04-01, signed 5th March 2024 and March 12, 2024; 01/02/99."
+    assert values(text, 'date') == ['2024-03-12', '2024-04-01', '2024-03-05', '2024-03-12', '1999-02-01']
+
+
+def test_impossible_dates_are_dropped():
+    assert values("On 31.02.2024 nothing happened", 'date') == []
+
+
+def test_emails_organizations_and_names():
+    text = "Mail Info@KMRL.co.in to Kochi Metro Rail Limited, attention Priya Nair."
+    entities = scan_text(text)
+    assert values(text, 'email') == ['info@kmrl.co.in']
+    assert 'Kochi Metro Rail Limited' in values(text, 'organization')
+    assert 'Priya Nair' in values(text, 'name')
+    for entity in entities:
+        assert text[entity['start']:entity['end']] == entity['text']
+
+
+def test_matches_start_at_word_boundaries():
+    assert values("ref9847012345", 'phone') == []
+    assert values("98470123456789", 'phone') == []
+
+
+def test_key_information_groups_by_category():
+    pages = [{'page_num': 1, 'text': "Priya Nair, 9847012345"},
+             {'page_num': 2, 'text': "Priya Nair on 01.01.2024"}]
+    entities = list(iter_entities(pages))
+    assert {e['page'] for e in entities} == {1, 2}
+    info = key_information(entities)
+    assert info['names'] == ['Priya Nair']
+    assert info['contact_info'] == ['+919847012345']
+    assert info['dates'] == ['2024-01-01']
+
+
+def test_key_information_is_capped():
+    info = KeyInformation(limit=2)
+    info.add(scan_text("Call 9847012341, 9847012342, 9847012343 or 9847012341"))
+    assert info.as_dict()['contact_info'] == ['+919847012341', '+919847012342']
+    assert len(key_information(scan_text("9847012341 9847012342 9847012343"), limit=1)['contact_info']) == 1
+
+
+def test_summary_keeps_capped_key_information(tmp_path, monkeypatch):
+    monkeypatch.delenv("GITHUB_TOKEN", raising=False)
+    monkeypatch.setattr(llm_summarizer, "KEY_INFO_LIMIT", 2)
+    pages = [{'page_num': n, 'language': 'eng',
+              'text': f"Clause {n}: Priya Nair can be reached on 98470 1234{n} from 0{n}.03.2024."}
+             for n in range(1, 5)]
+    result = llm_summarizer.summarize_pages(iter(pages), str(tmp_path))
+    assert 'entities' not in result
+    assert result['key_information']['contact_info'] == ['+919847012341', '+919847012342']
+    assert result['metadata']['entity_count'] == 12
+    with open(os.path.join(tmp_path, result['metadata']['entities_file']), encoding='utf-8') as f:
+        entities = [json.loads(line) for line in f]
+    assert len(entities) == 12 and {e['page'] for e in entities} == {1, 2, 3, 4}
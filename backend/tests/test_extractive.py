@@ -0,0 +1,70 @@
+import numpy as np
+
+from extractive import extract_pages, extractive_summary, repeated_lines, textrank
+from tokens import count_tokens
+
+HEADER = "KOCHI METRO RAIL LIMITED"
+
+
+def _page(number, body):
+    return f"[p{number}]\n{HEADER}\n{body}\nPage {number} of 10"
+
+
+def test_textrank_prefers_central_sentences():
+    sentences = [
+        "The metro tender covers track work and signalling.",
+        "Track work and signalling are in the metro tender.",
+        "The tender for metro signalling includes track work.",
+        "Bananas are yellow.",
+        "",
+    ]
+    scores = textrank(sentences)
+    assert scores.shape == (5,)
+    assert scores[4] == 0.0
+    assert scores[3] < min(scores[:3])
+
+
+def test_textrank_without_words():
+    assert np.array_equal(textrank(["", "..."]), np.zeros(2))
+
+
+BODIES = ["Tender for track work.", "Signalling contract awarded.", "Depot construction delayed.",
+          "Board approved the budget.", "Station design revised.", "Ticketing upgrade planned."]
+
+
+def test_repeated_lines_masks_digits():
+    bodies = [f"{HEADER}\n{body}\nPage {n} of 10" for n, body in enumerate(BODIES)]
+    keys = repeated_lines(bodies, share=0.3)
+    assert len(keys) == 2
+
+
+def test_short_document_only_loses_boilerplate():
+    pages = [_page(n, body) for n, body in enumerate(BODIES, start=1)]
+    extract = extract_pages(pages, max_tokens=10000)
+    assert extract['sentences'] is None
+    assert extract['repeated_lines'] == 12
+    assert len(extract['pages']) == len(BODIES)
+    assert all(HEADER not in page for page in extract['pages'])
+    assert extract['pages'][0].startswith("[p1]\n")
+    assert extract['output_tokens'] < extract['input_tokens']
+
+
+def test_long_document_fits_the_budget():
+    topics = ["contract", "payment", "schedule", "penalty", "inspection", "handover"]
+    pages = [_page(n, "\n".join(f"The {topics[i % 6]} clause of part {n}-{i} binds the {topics[n % 6]} team."
+                                for i in range(30)))
+             for n in range(1, 11)]
+    extract = extract_pages(pages, max_tokens=300)
+    assert extract['sentences']
+    assert extract['output_tokens'] <= 300
+    assert sum(count_tokens(page) for page in extract['pages']) <= 300
+    # Selected sentences keep document order
+    positions = [" ".join(pages).index(sentence) for sentence in extract['sentences']]
+    assert positions == sorted(positions)
+
+
+def test_extractive_summary():
+    pages = [_page(n, body) for n, body in enumerate(BODIES, start=1)]
+    summary, extract = extractive_summary(pages, max_tokens=1000)
+    assert "Board approved the budget." in summary
+    assert HEADER not in summary
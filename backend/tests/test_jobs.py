@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import jobs
+import main
+from auth import User, get_current_user
+from jobs import STATUS_COMPLETED, JobManager, QueueFullError
+from search_index import SearchIndex
+
+
+def _extract(file_path, output_dir, file_hash=None, on_page=None, **kwargs):
+    page_texts = {}
+    for page_num in (1, 2):
+        page_texts[page_num] = {'page_num': page_num, 'text': f"page {page_num} text", 'language': 'eng',
+                                'method': 'direct', 'timings': {'total_ms': 1.0}}
+        on_page(page_texts[page_num], 2)
+    return page_texts, "\n\n".join(info['text'] for info in page_texts.values())
+
+
+def _summarize(page_texts, combined_text, output_dir, on_progress=None, section_summaries=None):
+    on_progress(1, 1)
+    return {'overall_summary': "summary"}
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "extract_document_text", _extract)
+    monkeypatch.setattr(jobs, "create_document_summary", _summarize)
+    monkeypatch.setattr(jobs, "get_version_store", lambda: None)
+    monkeypatch.setattr(jobs, "get_duplicate_index", lambda: None)
+    index = SearchIndex(os.path.join(tmp_path, "search.db"))
+    monkeypatch.setattr(jobs, "get_search_index", lambda: index)
+    manager = JobManager(workers=1, max_pending=2)
+    yield manager
+    manager.shutdown(wait=True)
+
+
+def _wait(manager, job):
+    deadline = time.time() + 10
+    while not manager.events_since(job, 0)[1]:
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def test_job_events_follow_the_pipeline(manager, tmp_path):
+    job = manager.submit("alice", "a.pdf", "a.pdf", str(tmp_path))
+    _wait(manager, job)
+    events, finished = manager.events_since(job, 0)
+    assert finished and job.status == STATUS_COMPLETED
+    assert [event['type'] for event in events] == [
+        'status', 'stage', 'page', 'page', 'stage', 'progress', 'summary', 'status'
+    ]
+    assert [event['page_num'] for event in events if event['type'] == 'page'] == [1, 2]
+    # Page texts are dropped from the stream once the job is done
+    assert all('text' not in event for event in events)
+    assert manager.events_since(job, len(events)) == ([], True)
+    assert job.result['summary'] == {'overall_summary': "summary"} and job.progress['ocr']['done'] == 2
+    assert manager.stats()[STATUS_COMPLETED] == 1
+
+
+def test_queue_limit(manager, tmp_path, monkeypatch):
+    release = threading.Event()
+
+    def blocked(*args, **kwargs):
+        release.wait(10)
+        return _extract(*args, **kwargs)
+
+    monkeypatch.setattr(jobs, "extract_document_text", blocked)
+    first = manager.submit("alice", "a.pdf", "a.pdf", str(tmp_path))
+    manager.submit("alice", "b.pdf", "b.pdf", str(tmp_path))
+    with pytest.raises(QueueFullError):
+        manager.submit("alice", "c.pdf", "c.pdf", str(tmp_path))
+    release.set()
+    _wait(manager, first)
+
+
+def test_event_stream(manager, tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "job_manager", manager)
+    main.app.dependency_overrides[get_current_user] = lambda: User(username="alice", email="a@example.com")
+    try:
+        job = manager.submit("alice", "a.pdf", "a.pdf", str(tmp_path))
+        with TestClient(main.app) as client:
+            response = client.get(f"/api/jobs/{job.job_id}/events")
+            assert client.get("/api/jobs/missing/events").status_code == 404
+    finally:
+        main.app.dependency_overrides.clear()
+    assert response.headers['content-type'].startswith("text/event-stream")
+    messages = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    names = [lines[0] for lines in messages]
+    assert names[0] == "event: status" and names[-1] == "event: status"
+    assert names.count("event: page") == 2
+    final = json.loads(messages[-1][1][len("data: "):])
+    assert final['status'] == STATUS_COMPLETED
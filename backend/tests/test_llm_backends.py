@@ -0,0 +1,78 @@
+import pytest
+
+import llm_backends
+from llm_backends import MockBackend, OllamaBackend, OpenAIBackend, close_backends, get_backend
+from mock_llm_server import start_mock_server
+
+MESSAGES = [{"role": "user", "content": "alpha beta gamma"}]
+
+
+@pytest.fixture(autouse=True)
+def clean_env(monkeypatch):
+    for name in ("LLM_BACKEND", "LLM_MAX_CONNECTIONS", "LLM_MODEL", "LLM_API_KEY", "GITHUB_TOKEN",
+                 "LLM_BASE_URL", "GITHUB_MODELS_ENDPOINT", "OLLAMA_HOST", "OLLAMA_MODEL"):
+        monkeypatch.delenv(name, raising=False)
+    yield
+    close_backends()
+
+
+def test_unknown_backend_is_rejected(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "nope")
+    with pytest.raises(ValueError):
+        get_backend()
+
+
+def test_openai_requires_a_key():
+    with pytest.raises(ValueError):
+        get_backend()
+
+
+def test_openai_backend_from_env(monkeypatch):
+    monkeypatch.setenv("LLM_API_KEY", "secret")
+    monkeypatch.setenv("LLM_BASE_URL", "http://127.0.0.1:9/v1")
+    monkeypatch.setenv("LLM_MODEL", "some-model")
+    backend = get_backend()
+    assert isinstance(backend, OpenAIBackend)
+    assert backend.base_url == "http://127.0.0.1:9/v1"
+    assert backend.model == "some-model"
+    assert backend.max_connections == llm_backends.LLMBackend.default_connections
+
+
+def test_backends_are_shared_per_configuration(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "mock")
+    first = get_backend()
+    assert isinstance(first, MockBackend)
+    assert get_backend() is first
+    monkeypatch.setenv("LLM_MAX_CONNECTIONS", "3")
+    other = get_backend()
+    assert other is not first
+    assert other.max_connections == 3
+
+
+def test_ollama_defaults_to_few_connections(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "ollama")
+    backend = get_backend()
+    assert isinstance(backend, OllamaBackend)
+    assert backend.max_connections == OllamaBackend.default_connections
+    assert backend.model == "llama3.1"
+
+
+def test_mock_backend_completes(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "mock")
+    response = get_backend().complete(MESSAGES, 50, 0.3)
+    assert response['text'] == "Summary: alpha beta gamma"
+    assert response['prompt_tokens'] is not None
+
+
+def test_ollama_backend_against_mock_server():
+    server = start_mock_server()
+    host = server.base_url[:-len("/v1")]
+    backend = OllamaBackend(host, "llama3.1", max_connections=1, timeout=5)
+    try:
+        response = backend.complete(MESSAGES, 50, 0.3)
+        assert response['text'] == "Summary: alpha beta gamma"
+        assert response['completion_tokens'] is not None
+    finally:
+        backend.close()
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,66 @@
+import json
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from page_store import (INDEX_FILE, PAGES_FILE, JSONLPageReader, export_page_files, iter_stored_pages,
+                        open_page_store)
+
+PAGES = [{'page_num': n, 'language': 'eng', 'method': 'direct', 'text': f"പേജ് {n}\nline two"} for n in (2, 1, 3)]
+
+
+def _write(kind, output_dir):
+    with open_page_store(kind, output_dir) as store:
+        for page in PAGES:
+            store.write_page(page)
+
+
+@pytest.mark.parametrize("kind", ["jsonl", "files"])
+def test_round_trip(tmp_path, kind):
+    _write(kind, str(tmp_path))
+    pages = list(iter_stored_pages(str(tmp_path)))
+    assert [page['page_num'] for page in pages] == [1, 2, 3]
+    assert pages[0]['text'] == PAGES[1]['text'] and pages[0]['char_count'] == len(PAGES[1]['text'])
+
+
+def test_reader_random_access_and_rebuilt_index(tmp_path):
+    _write("jsonl", str(tmp_path))
+    assert JSONLPageReader(str(tmp_path)).read_page(3)['text'] == PAGES[2]['text']
+    # A writer that died before close leaves no index and maybe a partial line
+    os.remove(os.path.join(tmp_path, INDEX_FILE))
+    with open(os.path.join(tmp_path, PAGES_FILE), 'a', encoding='utf-8') as f:
+        f.write('{"page_num": 4, "te')
+    reader = JSONLPageReader(str(tmp_path))
+    assert reader.page_numbers() == [1, 2, 3]
+    assert reader.read_page(2)['text'] == PAGES[0]['text'] and reader.read_page(4) is None
+
+
+def test_export_matches_files_layout(tmp_path):
+    jsonl_dir, files_dir, export_dir = (os.path.join(tmp_path, name) for name in ("jsonl", "files", "export"))
+    _write("jsonl", jsonl_dir)
+    _write("files", files_dir)
+    assert export_page_files(jsonl_dir, export_dir) == 3
+    assert sorted(os.listdir(export_dir)) == sorted(os.listdir(files_dir))
+    for name in os.listdir(files_dir):
+        with open(os.path.join(files_dir, name), encoding='utf-8') as a, \
+                open(os.path.join(export_dir, name), encoding='utf-8') as b:
+            expected, exported = a.read(), b.read()
+        if name.endswith('.json'):
+            expected, exported = json.loads(expected), json.loads(exported)
+        assert exported == expected
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_ocr_reader_reads_both_layouts(tmp_path):
+    reader = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "ocr_reader.js")
+    script = f"import r from {json.dumps('file://' + reader)}; process.stdout.write(await r(process.argv[1]));"
+    texts = []
+    for kind in ("jsonl", "files"):
+        _write(kind, os.path.join(tmp_path, kind))
+        result = subprocess.run(["node", "--input-type=module", "-e", script, os.path.join(tmp_path, kind)],
+                                capture_output=True, text=True, encoding='utf-8', check=True)
+        texts.append(result.stdout)
+    assert texts[0] == texts[1]
+    assert texts[0].startswith("[p1]\n" + PAGES[1]['text'] + "\n\n[p2]\n")
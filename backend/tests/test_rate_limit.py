@@ -0,0 +1,71 @@
+import time
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+from rate_limit import RateLimiter, TokenBucket, backoff_delay, parse_retry_after
+
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(per_minute=60, capacity=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    # Third request has to wait for one token at 1 token/second
+    assert 0.9 < bucket.reserve() <= 1.0
+
+
+def test_token_bucket_clamps_oversized_requests():
+    bucket = TokenBucket(per_minute=60, capacity=10)
+    assert bucket.reserve(10) == 0.0
+    # Larger than the bucket: waits for a full bucket, not forever
+    assert bucket.reserve(1000) <= 10.0 + 0.01
+
+
+def test_rate_limiter_without_limits_never_waits():
+    limiter = RateLimiter()
+    start = time.monotonic()
+    for _ in range(100):
+        limiter.acquire(10000)
+    assert time.monotonic() - start < 0.1
+
+
+def test_rate_limiter_pause_holds_callers():
+    limiter = RateLimiter()
+    limiter.pause(0.2)
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.19
+
+
+def test_rate_limiter_pause_never_shortens():
+    limiter = RateLimiter()
+    limiter.pause(0.2)
+    limiter.pause(0.01)
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.19
+
+
+def test_parse_retry_after_seconds():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after(" 0.5 ") == 0.5
+    assert parse_retry_after("-3") == 0.0
+
+
+def test_parse_retry_after_http_date():
+    when = datetime.now(timezone.utc) + timedelta(seconds=30)
+    assert 25 < parse_retry_after(format_datetime(when, usegmt=True)) <= 30
+    past = datetime.now(timezone.utc) - timedelta(seconds=30)
+    assert parse_retry_after(format_datetime(past, usegmt=True)) == 0.0
+
+
+def test_parse_retry_after_invalid():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("") is None
+    assert parse_retry_after("soon") is None
+
+
+def test_backoff_delay_is_capped_exponential():
+    for attempt in range(10):
+        for _ in range(50):
+            delay = backoff_delay(attempt, base=1.0, cap=8.0)
+            assert 0.0 <= delay <= min(8.0, 2 ** attempt)
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+from search_index import CHILLUS, VIRAMA, ZWJ, ZWNJ, SearchIndex, build_match_query, normalize_text
+
+PAGES = [
+    {'page_num': 1, 'language': 'mal', 'text': "കൊച്ചിയിൽ മെട്രോ സർവീസ് ആരംഭിച്ചു. അവനെ വിളിച്ചു."},
+    {'page_num': 2, 'language': 'eng', 'text': "Tender KMRL/2024/123 for rolling stock maintenance."},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(os.path.join(tmp_path, "search.db"))
+    index.index_document("doc1", PAGES, owner="alice", filename="circular.pdf")
+    yield index
+    index.close()
+
+
+def _pages(index, query, owner=None):
+    return [(hit['doc_id'], hit['page_num']) for hit in index.search(query, owner=owner)]
+
+
+def test_normalize_text_uses_atomic_chillus():
+    old = "അവ" + "ന" + VIRAMA + ZWJ
+    assert normalize_text(old) == "അവ" + CHILLUS['ന']
+    assert normalize_text("സ" + ZWNJ + "ർ") == "സർ"
+
+
+def test_malayalam_words_are_single_tokens(index):
+    # Vowel signs and virama are token characters, so a word isn't split at them
+    assert _pages(index, "കൊച്ചി") == [("doc1", 1)]
+    assert _pages(index, "ച്ചി") == []
+    assert _pages(index, "മെട്രോ സർവീസ്") == [("doc1", 1)]
+
+
+def test_chillu_terms_match_inflected_forms(index):
+    assert "OR" in build_match_query("അവൻ")
+    assert _pages(index, "അവൻ") == [("doc1", 1)]
+
+
+def test_english_terms_and_operators(index):
+    assert _pages(index, "KMRL/2024/123") == [("doc1", 2)]
+    assert _pages(index, "maint*") == [("doc1", 2)]
+    assert _pages(index, "tender NOT") == []
+    assert build_match_query("  ** ") is None
+    hit, = index.search("rolling")
+    assert "<mark>rolling</mark>" in hit['snippet'] and hit['filename'] == "circular.pdf"
+
+
+def test_owner_filter_and_reindex(index):
+    index.index_document("archive", [{'page_num': 1, 'text': "rolling stock archive"}])
+    assert sorted(_pages(index, "rolling", owner="bob")) == [("archive", 1)]
+    assert len(_pages(index, "rolling", owner="alice")) == 2
+    index.index_document("doc1", PAGES[:1], owner="alice")
+    assert _pages(index, "rolling", owner="alice") == [("archive", 1)]
+    assert index.stats() == {'documents': 2, 'pages': 2}
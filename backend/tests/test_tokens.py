@@ -0,0 +1,73 @@
+import tokens
+from tokens import count_tokens, estimate_tokens_by_script, iter_page_chunks, pack_chunks
+
+
+def words(text):
+    return len(text.split())
+
+
+def test_estimate_counts_malayalam_per_character():
+    assert estimate_tokens_by_script("") == 0
+    assert estimate_tokens_by_script("abcd" * 10) == 10
+    assert estimate_tokens_by_script("മലയാളം") > estimate_tokens_by_script("abcdef")
+
+
+def test_default_counter_is_the_estimate(monkeypatch):
+    monkeypatch.delenv("TOKENIZER", raising=False)
+    monkeypatch.setattr(tokens, "_encoding", None)
+    monkeypatch.setattr(tokens, "_encoding_loaded", False)
+    text = "Kochi Metro Rail Limited. കൊച്ചി മെട്രോ"
+    assert count_tokens(text) == estimate_tokens_by_script(text)
+    assert tokens._get_encoding() is None
+
+
+def test_pack_chunks_fills_the_budget_in_order():
+    paragraphs = [" ".join(f"w{p}_{i}" for i in range(7)) for p in range(20)]
+    chunks = pack_chunks("\n\n".join(paragraphs), max_tokens=30, counter=words)
+    assert all(words(chunk) <= 30 for chunk in chunks)
+    # Paragraphs stay whole, in order, and nothing is lost
+    assert [p for chunk in chunks for p in chunk.split("\n\n")] == paragraphs
+    assert len(chunks) == 5
+
+
+def test_pack_chunks_splits_oversized_paragraphs():
+    paragraph = ". ".join(f"sentence {i} has five words" for i in range(30)) + "."
+    chunks = pack_chunks(paragraph, max_tokens=20, counter=words)
+    assert len(chunks) > 1
+    assert all(words(chunk) <= 20 for chunk in chunks)
+    assert " ".join(" ".join(chunks).split()) == " ".join(paragraph.split())
+
+
+def test_pack_chunks_overlap_repeats_the_previous_tail():
+    paragraphs = [f"para{p} x x x x" for p in range(12)]
+    chunks = pack_chunks("\n\n".join(paragraphs), max_tokens=20, overlap_tokens=5, counter=words)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.split("\n\n")[0] == previous.split("\n\n")[-1]
+
+
+def _pages(count, start=0):
+    return [f"[p{n + 1}]\n" + " ".join(f"page{n}word{i}" for i in range(10)) for n in range(start, start + count)]
+
+
+def test_iter_page_chunks_keeps_pages_whole():
+    pages = _pages(40)
+    chunks = list(iter_page_chunks(iter(pages), max_tokens=60, counter=words))
+    assert all(words(chunk) <= 60 for chunk in chunks)
+    assert [p for chunk in chunks for p in chunk.split("\n\n")] == pages
+
+
+def test_iter_page_chunks_boundaries_follow_content():
+    pages = _pages(80)
+    edited = pages[:2] + ["[p0]\ninserted page with a few words"] + pages[2:]
+    before = list(iter_page_chunks(pages, max_tokens=200, counter=words))
+    after = list(iter_page_chunks(edited, max_tokens=200, counter=words))
+    # Only the chunks up to the next content-defined boundary change
+    assert before[-3:] == after[-3:]
+    assert before[0] != after[0]
+
+
+def test_iter_page_chunks_splits_oversized_pages():
+    big = "[p1]\n" + ". ".join(f"sentence {i} here" for i in range(100))
+    chunks = list(iter_page_chunks([big] + _pages(1, 1), max_tokens=50, counter=words))
+    assert len(chunks) > 2
+    assert all(words(chunk) <= 50 for chunk in chunks)
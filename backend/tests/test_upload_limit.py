@@ -0,0 +1,51 @@
+import asyncio
+
+from main import UploadSizeLimitMiddleware
+
+
+async def _echo_app(scope, receive, send):
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _call(path, chunks, content_length=None, max_bytes=10):
+    app = UploadSizeLimitMiddleware(_echo_app, paths={"/api/upload"}, max_bytes=max_bytes)
+    headers = [(b"content-length", str(content_length).encode())] if content_length is not None else []
+    scope = {"type": "http", "method": "POST", "path": path, "headers": headers}
+    messages = [{"type": "http.request", "body": chunk, "more_body": n < len(chunks) - 1}
+                for n, chunk in enumerate(chunks)]
+    read = []
+    sent = []
+
+    async def receive():
+        if messages:
+            read.append(messages[0])
+            return messages.pop(0)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent[0]["status"], len(read)
+
+
+def test_declared_length_rejected_without_reading():
+    status, read = _call("/api/upload", [b"x" * 20], content_length=20)
+    assert status == 400 and read == 0
+
+
+def test_streamed_body_cut_off_at_limit():
+    status, read = _call("/api/upload", [b"x" * 6] * 5)
+    assert status == 400 and read == 2
+
+
+def test_small_uploads_and_other_paths_pass():
+    assert _call("/api/upload", [b"x" * 5, b"y" * 5], content_length=10) == (200, 2)
+    assert _call("/api/other", [b"x" * 20], content_length=20) == (200, 1)
@@ -0,0 +1,87 @@
+import os
+
+import pymupdf
+import pytest
+
+from jobs import JobManager
+from ocr import DocumentOCR
+from versions import VersionStore, diff_pages, fingerprint_key, page_fingerprint
+
+
+def _record(page_num, key, text=None):
+    return {'page_num': page_num, 'fingerprint': {'text': key, 'render': key}, 'text': text or key}
+
+
+def _pdf(path, bodies):
+    doc = pymupdf.open()
+    for body in bodies:
+        page = doc.new_page()
+        page.insert_text((72, 72), body, fontsize=9)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+BODIES = [f"Page {n}: " + "tender clause text " * 12 for n in range(6)]
+
+
+def test_page_fingerprint_sees_text_and_drawings(tmp_path):
+    path = _pdf(os.path.join(tmp_path, "a.pdf"), BODIES[:2])
+    doc = pymupdf.open(path)
+    first, second = (page_fingerprint(page, page.get_text()) for page in doc)
+    assert first != second
+    assert page_fingerprint(doc[0], doc[0].get_text()) == first
+    # Same text layer, extra drawing
+    doc[0].draw_rect(pymupdf.Rect(100, 300, 200, 400))
+    changed = page_fingerprint(doc[0], doc[0].get_text())
+    assert changed['text'] == first['text'] and changed['render'] != first['render']
+    assert fingerprint_key(None) is None
+
+
+def test_diff_pages_aligns_versions():
+    old = [_record(1, 'a'), _record(2, 'b', 'one\ntwo'), _record(3, 'c'), _record(4, 'd')]
+    new = [_record(1, 'a'), _record(2, 'x', 'one\nthree'), _record(3, 'new'), _record(4, 'c')]
+    diff = diff_pages(old, new)
+    assert (diff['unchanged'], diff['modified'], diff['added'], diff['removed']) == (2, 1, 1, 1)
+    modified = [entry for entry in diff['pages'] if entry['status'] == 'modified']
+    assert modified[0]['old_page'] == 2 and modified[0]['lines_added'] == 1 and modified[0]['lines_removed'] == 1
+    moved = [entry for entry in diff['pages'] if entry['status'] == 'unchanged'][-1]
+    assert (moved['old_page'], moved['new_page']) == (3, 4)
+
+
+def test_unchanged_pages_are_reused(tmp_path):
+    ocr = DocumentOCR(workers=1, engine='pytesseract')
+    first = list(ocr.iter_pdf_pages(_pdf(os.path.join(tmp_path, "v1.pdf"), BODIES),
+                                    os.path.join(tmp_path, "out1"), fingerprint=True))
+    assert all('fingerprint' in page for page in first)
+
+    revised = BODIES[:2] + ["An inserted page " * 10] + BODIES[2:]
+    second = list(ocr.iter_pdf_pages(_pdf(os.path.join(tmp_path, "v2.pdf"), revised),
+                                     os.path.join(tmp_path, "out2"), previous_pages=first))
+    assert [page['page_num'] for page in second] == list(range(1, 8))
+    assert [page['page_num'] for page in second if 'reused_from' not in page] == [3]
+    assert second[3]['reused_from'] == 3 and second[3]['text'] == first[2]['text']
+
+
+def test_store_keeps_page_records_of_recent_versions(tmp_path):
+    store = VersionStore(os.path.join(tmp_path, "versions.db"), keep_pages=2)
+    previous = None
+    for n in range(4):
+        number = store.add_version(f"job{n}", "alice", "tender.pdf", f"hash{n}", [_record(1, 'a')], {}, {}, previous)
+        assert number == n + 1
+        previous = store.get(f"job{n}")
+    assert [len(store.pages(f"job{n}")) for n in range(4)] == [0, 0, 1, 1]
+    assert len(store.history(previous['doc_key'])) == 4
+    assert store.latest_by_name("alice", "tender.pdf")['job_id'] == "job3"
+    assert store.latest_by_name("bob", "tender.pdf") is None
+
+
+def test_no_diff_against_pruned_version():
+    previous = {'job_id': 'job0', 'version': 1, 'page_count': 3}
+    page_texts = {1: {'page_num': 1, 'text': 'a', 'language': 'en', 'method': 'direct',
+                      'fingerprint': {'text': 'a', 'render': 'a'}}}
+    assert JobManager._version_diff(previous, [], page_texts) is None
+    diff = JobManager._version_diff(previous, [_record(1, 'a')], page_texts)
+    assert diff['unchanged'] == 1
+    # A previous version without pages has nothing to prune
+    assert JobManager._version_diff({**previous, 'page_count': 0}, [], page_texts)['added'] == 1
@@ -0,0 +1,261 @@
+import os
+import re
+import hashlib
+import logging
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Calibrated estimate, in tokens per character, used unless TOKENIZER=tiktoken
+# (and as its fallback). Latin text averages ~4 characters per token;
+# Malayalam is split into several byte-level tokens per character.
+TOKENS_PER_CHAR = {
+    'ascii': float(os.getenv("TOKENS_PER_CHAR_ASCII", "0.25")),
+    'malayalam': float(os.getenv("TOKENS_PER_CHAR_MALAYALAM", "1.5")),
+    'other': float(os.getenv("TOKENS_PER_CHAR_OTHER", "1.0"))
+}
+
+MALAYALAM_RE = re.compile('[\u0D00-\u0D7F]')
+NON_ASCII_RE = re.compile('[^\x00-\x7F]')
+
+# Paragraph, sentence (Latin and Indic full stops) and word boundaries
+PARAGRAPH_RE = re.compile(r'\n\s*\n')
+SENTENCE_RE = re.compile(r'(?<=[.!?।॥])\s+|\n')
+WORD_RE = re.compile(r'\s+')
+PAGE_MARKER_RE = re.compile(r'^\[p\d+\]\n', re.MULTILINE)
+
+# Content-defined chunk boundaries: on average one page in this many ends a
+# chunk regardless of the budget (see iter_page_chunks)
+BOUNDARY_PAGES = 8
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """
+    Load the tiktoken encoding once (TOKENIZER_ENCODING, default o200k_base)
+    if TOKENIZER is 'tiktoken', else None (TOKENIZER 'estimate', the default)
+
+    tiktoken downloads encoding files on first use; offline deployments
+    should point TIKTOKEN_CACHE_DIR at a directory bundling them, or the
+    first count blocks until the download times out. None if tiktoken or
+    its encoding files are unavailable.
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        if os.getenv("TOKENIZER", "estimate").lower() != 'tiktoken':
+            return None
+        if not os.getenv("TIKTOKEN_CACHE_DIR"):
+            logger.warning("TOKENIZER=tiktoken without TIKTOKEN_CACHE_DIR: encoding files will be downloaded")
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(os.getenv("TOKENIZER_ENCODING", "o200k_base"))
+        except Exception as e:
+            logger.info(f"tiktoken unavailable ({str(e)}), using calibrated token estimates")
+            _encoding = None
+    return _encoding
+
+
+def estimate_tokens_by_script(text: str) -> int:
+    """
+    Estimate tokens from per-script character counts
+
+    Args:
+        text: Input text
+
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+    malayalam = len(MALAYALAM_RE.findall(text))
+    other = len(NON_ASCII_RE.findall(text)) - malayalam
+    ascii_chars = len(text) - malayalam - other
+    estimate = (
+        ascii_chars * TOKENS_PER_CHAR['ascii']
+        + malayalam * TOKENS_PER_CHAR['malayalam']
+        + other * TOKENS_PER_CHAR['other']
+    )
+    return int(estimate + 0.999)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens with tiktoken if enabled (see _get_encoding), else estimate them per script
+
+    Args:
+        text: Input text
+
+    Returns:
+        Token count
+    """
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens_by_script(text)
+
+
+def _split_oversized(text: str, max_tokens: int, counter: Callable[[str], int]) -> List[Tuple[str, int]]:
+    """
+    Split text that exceeds the budget on sentence boundaries (falling back to
+    words, then characters) and re-merge the parts into budget-sized pieces
+
+    Returns:
+        List of (piece, token count)
+    """
+    for splitter in (SENTENCE_RE, WORD_RE):
+        parts = [p.strip() for p in splitter.split(text) if p.strip()]
+        if len(parts) > 1:
+            break
+    else:
+        # No boundary to split on: cut by characters, sized from the token ratio
+        tokens = counter(text)
+        width = max(1, len(text) * max_tokens // max(tokens, 1))
+        return [(text[i:i + width], counter(text[i:i + width])) for i in range(0, len(text), width)]
+
+    pieces: List[Tuple[str, int]] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            joined = ' '.join(current)
+            pieces.append((joined, counter(joined)))
+        current, current_tokens = [], 0
+
+    for part in parts:
+        tokens = counter(part)
+        if tokens > max_tokens:
+            flush()
+            pieces.extend(_split_oversized(part, max_tokens, counter))
+            continue
+        if current and current_tokens + tokens + 1 > max_tokens:
+            flush()
+        current.append(part)
+        current_tokens += tokens + 1
+    flush()
+    return pieces
+
+
+def pack_chunks(text: str, max_tokens: int, overlap_tokens: int = 0,
+                counter: Optional[Callable[[str], int]] = None) -> List[str]:
+    """
+    Pack text into as few chunks as possible, each close to `max_tokens`
+
+    Paragraphs are kept whole when they fit. Oversized paragraphs are split on
+    sentence boundaries (and sentences on words). With `overlap_tokens`, each
+    chunk starts with the trailing pieces of the previous one, up to that
+    many tokens, to keep context across the boundary.
+
+    Args:
+        text: Text to split
+        max_tokens: Token budget per chunk
+        overlap_tokens: Tokens repeated from the end of the previous chunk
+        counter: Token counter (default: count_tokens)
+
+    Returns:
+        List of chunks
+    """
+    counter = counter or count_tokens
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    separator_tokens = counter('\n\n')
+
+    pieces: List[Tuple[str, int]] = []
+    for para in PARAGRAPH_RE.split(text):
+        if not para.strip():
+            continue
+        tokens = counter(para)
+        if tokens > max_tokens:
+            pieces.extend(_split_oversized(para, max_tokens, counter))
+        else:
+            pieces.append((para, tokens))
+
+    chunks: List[str] = []
+    current: List[Tuple[str, int]] = []
+    current_tokens = 0
+    fresh = 0  # pieces in `current` that aren't overlap from the previous chunk
+    for piece, tokens in pieces:
+        if current and current_tokens + separator_tokens + tokens > max_tokens:
+            chunks.append('\n\n'.join(p for p, _ in current).strip())
+            carried: List[Tuple[str, int]] = []
+            carried_tokens = 0
+            for prev, prev_tokens in reversed(current):
+                if carried_tokens + prev_tokens > overlap_tokens:
+                    break
+                carried.insert(0, (prev, prev_tokens))
+                carried_tokens += prev_tokens + separator_tokens
+            # Keep room for the incoming piece
+            while carried and carried_tokens + tokens > max_tokens:
+                carried_tokens -= carried.pop(0)[1] + separator_tokens
+            current, current_tokens, fresh = carried, carried_tokens, 0
+        if current:
+            current_tokens += separator_tokens
+        current.append((piece, tokens))
+        current_tokens += tokens
+        fresh += 1
+
+    if current and fresh:
+        chunks.append('\n\n'.join(p for p, _ in current).strip())
+
+    return chunks
+
+
+def unmarked_hash(text: str) -> str:
+    """Hash of text without its [pN] page markers, stable when pages are renumbered"""
+    return hashlib.sha256(PAGE_MARKER_RE.sub('', text).encode('utf-8')).hexdigest()
+
+
+def iter_page_chunks(pages: Iterable[str], max_tokens: int,
+                     counter: Optional[Callable[[str], int]] = None) -> Iterator[str]:
+    """
+    Pack whole pages into chunks of at most `max_tokens`, with boundaries
+    that depend on page content rather than position
+
+    Besides closing a chunk when the next page wouldn't fit, a chunk also
+    ends after any page whose content hash falls on 1 in BOUNDARY_PAGES
+    (once the chunk is at least half full). An inserted, removed or edited
+    page then only changes the chunks up to the next such page; the rest of
+    the document is chunked exactly as before, so their summaries can be
+    reused. Pages larger than the budget are split with pack_chunks.
+
+    Pages are consumed lazily and each chunk is yielded as soon as it is
+    complete, so only the chunk being filled is held in memory.
+
+    Args:
+        pages: Page texts (with markers) in document order
+        max_tokens: Token budget per chunk
+        counter: Token counter (default: count_tokens)
+
+    Returns:
+        Iterator of chunks
+    """
+    counter = counter or count_tokens
+    separator_tokens = counter('\n\n')
+
+    current: List[str] = []
+    current_tokens = 0
+    for page in pages:
+        if not page.strip():
+            continue
+        tokens = counter(page)
+        if tokens > max_tokens:
+            if current:
+                yield '\n\n'.join(current).strip()
+                current, current_tokens = [], 0
+            yield from pack_chunks(page, max_tokens, counter=counter)
+            continue
+        if current and current_tokens + separator_tokens + tokens > max_tokens:
+            yield '\n\n'.join(current).strip()
+            current, current_tokens = [], 0
+        if current:
+            current_tokens += separator_tokens
+        current.append(page)
+        current_tokens += tokens
+        if current_tokens * 2 >= max_tokens and int(unmarked_hash(page)[:8], 16) % BOUNDARY_PAGES == 0:
+            yield '\n\n'.join(current).strip()
+            current, current_tokens = [], 0
+    if current:
+        yield '\n\n'.join(current).strip()
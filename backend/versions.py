@@ -0,0 +1,283 @@
+"""
+Document versions: revised uploads of the same document (a tender with an
+addendum, a re-issued drawing register) are linked to the previous version
+and only re-processed where they changed.
+
+- Every PDF page gets a fingerprint: a hash of its text layer plus a hash of
+  a small grayscale render, so edits to scanned pages and to drawings (which
+  have little or no text) are noticed as well as text edits.
+- Pages whose fingerprint matches a page of the previous version reuse its
+  extracted text instead of being rendered and OCR'd again, wherever they
+  moved to in the new version.
+- Map-stage section summaries are kept per version, so only sections that
+  contain changed pages are sent to the LLM again (see llm_summarizer).
+- The fingerprint sequences of the two versions are aligned into a
+  page-level diff.
+
+A new upload is treated as the next version of an explicitly given earlier
+job, or (VERSION_MATCH_FILENAME, on by default) of the latest version the
+same user uploaded under the same file name.
+
+Page records (with their full text) are only kept for the latest
+VERSIONS_KEEP_PAGES (default 3, 0 keeps all) versions of each document;
+older versions keep their result and history entry, but a revision of one
+of them is processed in full.
+"""
+import os
+import json
+import time
+import difflib
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import pymupdf
+
+logger = logging.getLogger(__name__)
+
+# Width in pixels of the render hashed for a page's fingerprint
+FINGERPRINT_WIDTH = 128
+
+
+def page_fingerprint(page, text: str) -> Dict[str, str]:
+    """
+    Fingerprint of a PDF page
+
+    Args:
+        page: PyMuPDF page object
+        text: The page's text layer
+
+    Returns:
+        Dictionary with 'text' and 'render' hashes
+    """
+    # Whitespace differences in the text layer don't change what the page says
+    text_hash = hashlib.blake2b(' '.join(text.split()).encode('utf-8'), digest_size=8).hexdigest()
+    scale = FINGERPRINT_WIDTH / max(page.rect.width, 1)
+    pix = page.get_pixmap(matrix=pymupdf.Matrix(scale, scale), colorspace=pymupdf.csGRAY, alpha=False)
+    render_hash = hashlib.blake2b(pix.samples, digest_size=8).hexdigest()
+    return {'text': text_hash, 'render': render_hash}
+
+
+def fingerprint_key(fingerprint: Optional[Dict[str, str]]) -> Optional[str]:
+    if not fingerprint:
+        return None
+    return f"{fingerprint['text']}:{fingerprint['render']}"
+
+
+def _line_changes(old_text: str, new_text: str) -> Dict[str, int]:
+    added = removed = 0
+    for line in difflib.ndiff(old_text.splitlines(), new_text.splitlines()):
+        if line.startswith('+ '):
+            added += 1
+        elif line.startswith('- '):
+            removed += 1
+    return {'lines_added': added, 'lines_removed': removed}
+
+
+def diff_pages(old_pages: List[Dict], new_pages: List[Dict]) -> Dict:
+    """
+    Page-level diff between two versions, aligning their fingerprint sequences
+
+    Args:
+        old_pages: Previous version's page records ('page_num', 'fingerprint', 'text')
+        new_pages: New version's page records, same keys
+
+    Returns:
+        Dictionary with per-status page counts and 'pages', a list of changes
+        in document order: status ('unchanged', 'modified', 'added' or
+        'removed'), old_page and new_page numbers (None where the page
+        doesn't exist), and line counts for modified pages
+    """
+    old_pages = sorted(old_pages, key=lambda p: p['page_num'])
+    new_pages = sorted(new_pages, key=lambda p: p['page_num'])
+    matcher = difflib.SequenceMatcher(
+        None,
+        [fingerprint_key(p.get('fingerprint')) for p in old_pages],
+        [fingerprint_key(p.get('fingerprint')) for p in new_pages],
+        autojunk=False
+    )
+
+    entries = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            entries += [{'status': 'unchanged', 'old_page': old['page_num'], 'new_page': new['page_num']}
+                        for old, new in zip(old_pages[i1:i2], new_pages[j1:j2])]
+            continue
+        # A replaced run pairs pages up in order; the longer side's extras were added/removed
+        paired = min(i2 - i1, j2 - j1) if tag == 'replace' else 0
+        for old, new in zip(old_pages[i1:i1 + paired], new_pages[j1:j1 + paired]):
+            entries.append({'status': 'modified', 'old_page': old['page_num'], 'new_page': new['page_num'],
+                            **_line_changes(old.get('text', ''), new.get('text', ''))})
+        entries += [{'status': 'removed', 'old_page': old['page_num'], 'new_page': None}
+                    for old in old_pages[i1 + paired:i2]]
+        entries += [{'status': 'added', 'old_page': None, 'new_page': new['page_num']}
+                    for new in new_pages[j1 + paired:j2]]
+
+    counts = {status: 0 for status in ('unchanged', 'modified', 'added', 'removed')}
+    for entry in entries:
+        counts[entry['status']] += 1
+    return {**counts, 'pages': entries}
+
+
+class VersionStore:
+    """
+    Registry of document versions: each version's page records (metadata,
+    text and fingerprint), section summaries and result. Each thread gets its
+    own connection.
+    """
+
+    _COLUMNS = "job_id, doc_key, version, owner, filename, file_hash, page_count, created_at"
+
+    def __init__(self, path: str, keep_pages: int = 3):
+        """
+        Args:
+            path: SQLite database file
+            keep_pages: Number of latest versions per document whose page
+                records are kept (0 keeps all)
+        """
+        self.path = path
+        self.keep_pages = keep_pages
+        self._local = threading.local()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if getattr(self._local, 'conn', None) is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS versions ("
+                " job_id TEXT PRIMARY KEY,"
+                " doc_key TEXT NOT NULL,"
+                " version INTEGER NOT NULL,"
+                " owner TEXT,"
+                " filename TEXT,"
+                " file_hash TEXT,"
+                " page_count INTEGER NOT NULL,"
+                " result TEXT NOT NULL,"
+                " sections TEXT NOT NULL,"
+                " created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS versions_doc ON versions (doc_key, version)")
+            conn.execute("CREATE INDEX IF NOT EXISTS versions_name ON versions (owner, filename, created_at)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS version_pages ("
+                " job_id TEXT NOT NULL,"
+                " page_num INTEGER NOT NULL,"
+                " record TEXT NOT NULL,"
+                " PRIMARY KEY (job_id, page_num))"
+            )
+            self._local.conn = conn
+        return self._local.conn
+
+    @staticmethod
+    def _version(row) -> Dict:
+        return {'job_id': row[0], 'doc_key': row[1], 'version': row[2], 'owner': row[3], 'filename': row[4],
+                'file_hash': row[5], 'page_count': row[6], 'created_at': row[7]}
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        row = self.conn.execute(f"SELECT {self._COLUMNS} FROM versions WHERE job_id = ?", (job_id,)).fetchone()
+        return self._version(row) if row else None
+
+    def latest_by_name(self, owner: Optional[str], filename: str) -> Optional[Dict]:
+        """Most recent version uploaded by `owner` under `filename`"""
+        row = self.conn.execute(
+            f"SELECT {self._COLUMNS} FROM versions WHERE owner IS ? AND filename = ?"
+            " ORDER BY created_at DESC LIMIT 1",
+            (owner, filename)
+        ).fetchone()
+        return self._version(row) if row else None
+
+    def history(self, doc_key: str) -> List[Dict]:
+        """All versions of a document, oldest first"""
+        rows = self.conn.execute(
+            f"SELECT {self._COLUMNS} FROM versions WHERE doc_key = ? ORDER BY version", (doc_key,)
+        ).fetchall()
+        return [self._version(row) for row in rows]
+
+    def pages(self, job_id: str) -> List[Dict]:
+        """Page records of a version, in page order"""
+        rows = self.conn.execute(
+            "SELECT record FROM version_pages WHERE job_id = ? ORDER BY page_num", (job_id,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def result(self, job_id: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT result FROM versions WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def sections(self, job_id: str) -> Dict[str, str]:
+        """Section summaries of a version, keyed by section hash"""
+        row = self.conn.execute("SELECT sections FROM versions WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def add_version(self, job_id: str, owner: Optional[str], filename: Optional[str], file_hash: Optional[str],
+                    pages: List[Dict], result: Dict, sections: Dict[str, str],
+                    previous: Optional[Dict] = None) -> int:
+        """
+        Record a processed document as a new version
+
+        Args:
+            job_id: Job that produced this version
+            owner: Uploader
+            filename: Original file name
+            file_hash: SHA-256 of the file
+            pages: Page records ('page_num', 'fingerprint', 'text' and metadata)
+            result: Job result
+            sections: Section summaries by section hash
+            previous: Version this one revises (from get / latest_by_name), or None
+
+        Returns:
+            Version number (1 for a new document)
+        """
+        doc_key = previous['doc_key'] if previous else job_id
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute(
+                "SELECT COALESCE(MAX(version), 0) + 1 FROM versions WHERE doc_key = ?", (doc_key,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT OR REPLACE INTO versions"
+                " (job_id, doc_key, version, owner, filename, file_hash, page_count, result, sections, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, doc_key, version, owner, filename, file_hash, len(pages),
+                 json.dumps(result, ensure_ascii=False), json.dumps(sections, ensure_ascii=False), time.time())
+            )
+            conn.execute("DELETE FROM version_pages WHERE job_id = ?", (job_id,))
+            conn.executemany(
+                "INSERT INTO version_pages (job_id, page_num, record) VALUES (?, ?, ?)",
+                [(job_id, page['page_num'], json.dumps(page, ensure_ascii=False)) for page in pages]
+            )
+            if self.keep_pages > 0:
+                conn.execute(
+                    "DELETE FROM version_pages WHERE job_id IN"
+                    " (SELECT job_id FROM versions WHERE doc_key = ? AND version <= ?)",
+                    (doc_key, version - self.keep_pages)
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return version
+
+
+_version_store: Optional[VersionStore] = None
+_version_store_lock = threading.Lock()
+
+
+def get_version_store() -> Optional[VersionStore]:
+    """Process-wide version store at VERSIONS_DB_PATH (default versions.db), or None if VERSIONS_ENABLED is false"""
+    global _version_store
+    if os.getenv("VERSIONS_ENABLED", "true").lower() not in ('1', 'true', 'yes'):
+        return None
+    with _version_store_lock:
+        if _version_store is None:
+            _version_store = VersionStore(os.getenv("VERSIONS_DB_PATH", "versions.db"),
+                                          int(os.getenv("VERSIONS_KEEP_PAGES", "3")))
+        return _version_store